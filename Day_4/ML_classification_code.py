@@ -1,15 +1,24 @@
+import os
+
 import pandas as pd
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.multioutput import MultiOutputClassifier
-from sklearn.preprocessing import LabelEncoder
-from sklearn.metrics import classification_report
-import matplotlib.pyplot as plt
-import seaborn as sns
-
-# Load the Excel dataset
+
+from classifier_artifacts import ARTIFACT_DIR, load_classifier, load_flat_forest, save_classifier
+from compact_schema import compact_loaded
+from flat_forest import compare_with_sklearn
+from dataset_io import read_main_dataset
+from feature_pipeline import OnlineFeatures, build_features
+from instrumentation import configure, count, finish, stage
+
+# "train" = fit, evaluate and save a versioned artifact; "tune" = same, but pick the forest size by
+# successive-halving search (rf_tuning.py); "serve" = load the latest artifact (no training)
+MODE = "train"
+
+# Dataset location: .xlsx file or a parquet / feather / timeseries layout written by dataset_io.py
 file_path = 'Indian_Major_Carps_Dataset.xlsx'
-df = pd.read_excel(file_path, sheet_name='Main_Dataset')
+# Optional subset to train on, e.g. TANK_FILTER = [1], DATE_FROM = "2025-06-01", DATE_TO = "2025-06-07"
+TANK_FILTER = None
+DATE_FROM = None
+DATE_TO = None
 
 # Define input features and target outputs
 features = [
@@ -23,46 +32,166 @@ targets = [
     'DO_Status', 'Growth_Condition'
 ]
 
-# Encode categorical input features
-carp_encoder = LabelEncoder()
-df['Carp_Species'] = carp_encoder.fit_transform(df['Carp_Species'])
-
-# Encode categorical output labels
-label_encoders = {}
-for col in targets:
-    if df[col].dtype == 'object':
-        le = LabelEncoder()
-        df[col] = le.fit_transform(df[col])
-        label_encoders[col] = le
-
-# Split dataset into features and labels
-X = df[features]
-y = df[targets]
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-
-# Train Random Forest with MultiOutputClassifier
-model = MultiOutputClassifier(RandomForestClassifier(n_estimators=100, random_state=42))
-model.fit(X_train, y_train)
-
-# Evaluate each output
-y_pred = model.predict(X_test)
-for i, target in enumerate(targets):
-    print(f"\n🎯 Classification Report for: {target}")
-    print(classification_report(y_test.iloc[:, i], y_pred[:, i]))
-
-# Plot feature importance for each target output
-for i, target in enumerate(targets):
-    importances = model.estimators_[i].feature_importances_
-    plt.figure(figsize=(10, 5))
-    sns.barplot(x=importances, y=X.columns, palette='coolwarm')
-    plt.title(f'Feature Importance for: {target}')
-    plt.xlabel('Importance')
-    plt.ylabel('Feature')
-    plt.tight_layout()
-    plt.show()
+# Load into the compact schema (compact_schema.py): float32 readings, int16 Tank_ID, categorical
+# species / labels (LabelEncoder then works on the few categories instead of every row)
+COMPACT_SCHEMA = True
+
+# Add per-tank lag / delta / rolling features (feature_pipeline.py), e.g. the DO slope over the last
+# hour. Predictions then need each reading's Timestamp and the tank's previous readings.
+USE_TREND_FEATURES = False
+
+# Tuning (MODE = "tune"): "shared" = one parameter set for all targets, "per_target" = one search
+# per target. The smallest / fastest forest whose macro F1 reaches the floor on every target wins.
+TUNE_STRATEGY = "shared"
+# Macro-F1 floors: every target must stay within F1_TOLERANCE of the untuned 100-tree forest
+# (MODE = "train") on the validation split, so tuning buys latency without a worse model on any
+# target. F1_FLOORS fixes the floor of a target instead, e.g. {'Tank_Leakage': 0.99}.
+F1_TOLERANCE = 0.02
+F1_FLOORS = {}
+TUNE_WORKERS = os.cpu_count()
+
+# Run trace (instrumentation.py): None = off, "<name>.jsonl" = JSON lines, "<name>.json" = Chrome trace
+TRACE_FILE = None
+PROFILE_STAGE = None    # e.g. "train": also capture that stage with cProfile -> <trace>.train.prof
+
+
+def _is_text_category(column):
+    return isinstance(column.dtype, pd.CategoricalDtype) and column.cat.categories.dtype == object
+
+
+def _label_encode(encoder, column):
+    """encoder.fit_transform(column); a categorical column is encoded through its categories, not row by row."""
+    if not isinstance(column.dtype, pd.CategoricalDtype):
+        return encoder.fit_transform(column)
+    column = column.cat.remove_unused_categories()
+    # Same classes_ and codes as fitting on the rows (LabelEncoder sorts the distinct values)
+    return encoder.fit_transform(column.cat.categories)[column.cat.codes.to_numpy()]
+
+
+def train_classifier(mode=MODE, source=file_path, show_plots=True):
+    """
+    Fit ("train") or tune ("tune") the multi-output Random Forest, evaluate it and
+    save a new artifact version. Returns the artifact dict (as load_classifier would).
+    """
+    # sklearn (and matplotlib for the plots) are only imported when training
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import classification_report
+    from sklearn.model_selection import train_test_split
+    from sklearn.multioutput import MultiOutputClassifier
+    from sklearn.preprocessing import LabelEncoder
+
+    from rf_tuning import tune_random_forest
+
+    # Load only the feature / target columns (pushed down to the file for columnar layouts)
+    stage("load")
+    df = read_main_dataset(source, columns=features + targets + (['Timestamp'] if USE_TREND_FEATURES else []),
+                           tank_ids=TANK_FILTER, start=DATE_FROM, end=DATE_TO)
+    count("rows_loaded", len(df))
+    if COMPACT_SCHEMA:
+        df = compact_loaded(df)
+
+    # Lags / rolling statistics per tank, computed over each tank's time-ordered readings
+    model_features = list(features)
+    trend_pipeline = OnlineFeatures() if USE_TREND_FEATURES else None
+    if trend_pipeline is not None:
+        stage("trend_features")
+        df = df.join(build_features(df, trend_pipeline.channels, trend_pipeline.windows))
+        model_features += trend_pipeline.names
+
+    # Encode categorical input features
+    stage("encode")
+    carp_encoder = LabelEncoder()
+    df['Carp_Species'] = _label_encode(carp_encoder, df['Carp_Species'])
+
+    # Encode categorical output labels
+    label_encoders = {}
+    for col in targets:
+        if df[col].dtype == 'object' or _is_text_category(df[col]):
+            le = LabelEncoder()
+            df[col] = _label_encode(le, df[col])
+            label_encoders[col] = le
+        elif isinstance(df[col].dtype, pd.CategoricalDtype):
+            # Numeric label (Tank_Leakage) is used as is
+            df[col] = df[col].astype(df[col].cat.categories.dtype)
+
+    # Split dataset into features and labels
+    X = df[model_features]
+    y = df[targets]
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+
+    # Train Random Forest with MultiOutputClassifier
+    tuned_params = None
+    stage(mode)
+    if mode == "tune":
+        model, tuned_params, trials = tune_random_forest(X_train, y_train, strategy=TUNE_STRATEGY,
+                                                         f1_floors=F1_FLOORS, f1_tolerance=F1_TOLERANCE,
+                                                         n_workers=TUNE_WORKERS)
+        print("\n🔧 Successive-halving trials (last rung per target group):")
+        last = trials[trials['Rung'] == trials.groupby('Targets')['Rung'].transform('max')]
+        print(last.drop(columns='Error').to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+        for target, params in tuned_params.items():
+            print(f"   {target}: {params}")
+    else:
+        model = MultiOutputClassifier(RandomForestClassifier(n_estimators=100, random_state=42))
+        model.fit(X_train, y_train)
+
+    # Evaluate each output
+    stage("evaluate")
+    y_pred = model.predict(X_test)
+    for i, target in enumerate(targets):
+        print(f"\n🎯 Classification Report for: {target}")
+        print(classification_report(y_test.iloc[:, i], y_pred[:, i]))
+
+    # Persist model + encoders as a new artifact version for serving
+    stage("save_artifact")
+    feature_pipeline = trend_pipeline.config() if trend_pipeline is not None else None
+    version = save_classifier(model, carp_encoder, label_encoders, model_features, targets, ARTIFACT_DIR,
+                              metrics={"tuned_params": tuned_params} if tuned_params else None,
+                              feature_pipeline=feature_pipeline)
+    print(f"\n💾 Classifier saved as '{ARTIFACT_DIR}/{version}'")
+
+    # Flat-array inference path must reproduce sklearn exactly on the test split
+    stage("flat_forest_check")
+    flat_forest = load_flat_forest(ARTIFACT_DIR, version)
+    matches, latency = compare_with_sklearn(model, flat_forest, X_test)
+    print(f"\n⚡ Flat-array forest matches sklearn on test split: {matches}")
+    print(latency.to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+
+    # Plot feature importance for each target output
+    if show_plots:
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+
+        stage("plots")
+        for i, target in enumerate(targets):
+            importances = model.estimators_[i].feature_importances_
+            plt.figure(figsize=(10, 5))
+            sns.barplot(x=importances, y=X.columns, palette='coolwarm')
+            plt.title(f'Feature Importance for: {target}')
+            plt.xlabel('Importance')
+            plt.ylabel('Feature')
+            plt.tight_layout()
+            plt.show()
+
+    return {"model": model, "carp_encoder": carp_encoder, "label_encoders": label_encoders,
+            "features": model_features, "targets": list(targets), "feature_pipeline": feature_pipeline,
+            "version": version}
+
+
+def load_serving_model():
+    """Serving: memory-map the latest trained artifact instead of retraining."""
+    artifact = load_classifier(ARTIFACT_DIR)
+    print(f"✅ Loaded classifier '{artifact['version']}' from '{ARTIFACT_DIR}'")
+    return artifact
+
 
 # Prediction Interface
-def predict_from_input():
+def predict_from_input(artifact=None):
+    """Ask for one reading on the console and print its predicted labels (latest artifact by default)."""
+    artifact = artifact if artifact is not None else load_serving_model()
+    model, carp_encoder = artifact['model'], artifact['carp_encoder']
+    label_encoders, model_features = artifact['label_encoders'], artifact['features']
+
     print("\n🔍 Enter Input Feature Values:")
     user_input = {}
     user_input['Tank_ID'] = int(input("Tank ID (e.g., 1): "))
@@ -82,17 +211,40 @@ def predict_from_input():
     user_input['Hardness_mgL'] = float(input("Hardness (mg/L): "))
     user_input['Soil_Moisture'] = float(input("Soil Moisture: "))
 
+    if artifact.get('feature_pipeline'):
+        # Readings entered earlier with this artifact are the tank's history
+        trend_pipeline = artifact.setdefault('online_features', OnlineFeatures(**artifact['feature_pipeline']))
+        timestamp = input("Timestamp (DD-MM-YYYY HH:MM): ")
+        values = [user_input[c] for c in trend_pipeline.channels]
+        user_input.update(trend_pipeline.update_dict(user_input['Tank_ID'], timestamp, values))
+
     # Prepare input and predict
-    input_df = pd.DataFrame([user_input])
+    input_df = pd.DataFrame([user_input])[model_features]
     prediction = model.predict(input_df)[0]
 
     print("\n📊 Predicted Output Labels:")
-    for label, value in zip(targets, prediction):
+    for label, value in zip(artifact['targets'], prediction):
         if label in label_encoders:
             decoded = label_encoders[label].inverse_transform([value])[0]
         else:
             decoded = value
         print(f"{label}: {decoded}")
 
-# Uncomment this line to test input interface:
-# predict_from_input()
+
+def main(mode=MODE, source=file_path, show_plots=True, trace_file=TRACE_FILE, profile_stage=PROFILE_STAGE):
+    configure(trace_file, profile_stage)
+    if mode in ("train", "tune"):
+        artifact = train_classifier(mode, source, show_plots)
+    else:
+        stage("load_artifact")
+        artifact = load_serving_model()
+    finish()
+
+    # Uncomment this line to test input interface
+    # (for many tanks, serve batched predictions over HTTP with prediction_service.py):
+    # predict_from_input(artifact)
+    return artifact
+
+
+if __name__ == "__main__":
+    main()
@@ -1,164 +1,363 @@
 import os
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
 from pathlib import Path
-from statsmodels.tsa.arima.model import ARIMA
 from datetime import datetime, timedelta
 
+from dataset_io import read_main_dataset
+from batched_forecaster import fit_batched
+from compact_schema import compact_loaded
+from forecast_cache import ForecastCache
+from forecast_backtest import (CANDIDATES, N_FOLDS, SELECTION_FILE, TOLERANCE, backtest, fit_selected,
+                               horizon_report, load_selection, model_report, save_selection, select_models)
+from forecast_engine import fit_series_jobs
+from forecast_plots import plot_job_from_result, render_plots
+from hierarchical_forecaster import HierarchicalForecaster
+from instrumentation import configure, count, finish, stage
+from model_store import ModelStore
+from timeseries_store import TimeSeriesStore, is_timeseries_store
+
 # -----------------------------
 # CONFIGURATION
 # -----------------------------
-EXCEL_FILE = "Indian_Major_Carps_Dataset.xlsx"
+DATA_SOURCE = "Indian_Major_Carps_Dataset.xlsx"   # .xlsx, or a parquet / feather / timeseries dataset directory
+TANK_FILTER = None      # e.g. [1] to forecast a single tank
+DATE_FROM = None        # e.g. "2025-06-01" to only load recent history
+DATE_TO = None
 FORECAST_STEPS = 10
+ARIMA_ORDER = (1, 1, 1)
+# "statsmodels" = ARIMA_ORDER for every series, "batched" = batched_forecaster.py,
+# "selected" = the model the last backtest picked for each series (MODEL_SELECTION_FILE)
+FORECAST_ENGINE = "statsmodels"
+BATCHED_METHOD = "holt"           # batched engine model: "holt" or "ar1_diff"
+PREDICT_MODE = "raw"              # "raw" = step the 30-min model, "hierarchical" = raw/hourly/daily models
+N_WORKERS = os.cpu_count()  # (tank, feature) fits run in a process pool; 1 = serial
+MODEL_STORE_DIR = Path("model_store")   # None = always refit from scratch
+FULL_REFIT_EVERY = "1D"                 # full re-estimation schedule; new readings are appended in between
 TIMESTAMP_COL = "Timestamp"
 TANK_COL = "Tank_ID"
 OUTPUT_DIR = Path("forecast_plots")
+PLOTS_ENABLED = True                # False = no PNGs (production forecast runs)
+PLOT_WORKERS = os.cpu_count()       # plots are rendered headless in a process pool after fitting
 CSV_OUT = "fish_tank_forecasts.csv"
 
+# Backtest (forecast_backtest.py): rolling-origin evaluation of CANDIDATES on every series; the
+# cheapest model within BACKTEST_TOLERANCE of the best RMSE is saved per series for "selected"
+BACKTEST = False                    # True = backtest + model selection instead of the forecast run
+BACKTEST_TOLERANCE = TOLERANCE
+BACKTEST_WORKERS = os.cpu_count()
+BACKTEST_CSV = "forecast_backtest.csv"      # MAE / RMSE per feature, model and horizon step
+MODEL_SELECTION_FILE = SELECTION_FILE
+# Compact schema (compact_schema.py): datetime64 Timestamp (no re-parsing), int16 Tank_ID, float32 readings
+COMPACT_SCHEMA = True
+
+# Numeric readings only (Water_Quality_Index is a categorical label, not a measurement)
 FEATURES_TO_FORECAST = [
     "Temperature_C",
     "Dissolved_Oxygen_mgL",
     "Turbidity_NTU",
-    "Water_Quality_Index",
     "Soil_Moisture"
 ]
 
-OUTPUT_DIR.mkdir(exist_ok=True)
+# Run trace (instrumentation.py): None = off, "<name>.jsonl" = JSON lines, "<name>.json" = Chrome trace
+TRACE_FILE = None
+PROFILE_STAGE = None    # e.g. "fit": also capture that stage with cProfile -> <trace>.fit.prof
+
 
 # -----------------------------
 # LOAD & PREPROCESS DATA
 # -----------------------------
-df = pd.read_excel(EXCEL_FILE)
+def load_history(source=DATA_SOURCE):
+    """
+    Readings of FEATURES_TO_FORECAST with parsed timestamps, time-ordered.
+    Returns (df, ts_store); ts_store is the TimeSeriesStore when source is one, else None.
+    """
+    stage("load")
+    df = read_main_dataset(
+        source,
+        columns=[TIMESTAMP_COL, TANK_COL] + FEATURES_TO_FORECAST,
+        tank_ids=TANK_FILTER,
+        start=DATE_FROM,
+        end=DATE_TO
+    )
+    count("rows_loaded", len(df))
+    if COMPACT_SCHEMA:
+        df = compact_loaded(df)
+
+    # A timeseries store (timeseries_store.py) already returns parsed, time-ordered readings per tank
+    ts_store = TimeSeriesStore(source, readonly=True) if is_timeseries_store(source) else None
+
+    if ts_store is None:
+        # Parse timestamp with day-first format (compact / columnar data is already datetime64)
+        if not pd.api.types.is_datetime64_any_dtype(df[TIMESTAMP_COL]):
+            stage("parse_timestamps")
+            df[TIMESTAMP_COL] = pd.to_datetime(
+                df[TIMESTAMP_COL],
+                format="%d-%m-%Y %H:%M",
+                errors="raise"
+            )
+
+        # Sort
+        df = df.sort_values(by=TIMESTAMP_COL)
 
-# Parse timestamp with day-first format
-df[TIMESTAMP_COL] = pd.to_datetime(
-    df[TIMESTAMP_COL],
-    format="%d-%m-%Y %H:%M",
-    errors="raise"
-)
+    print(f"\n• Data covers: {df[TIMESTAMP_COL].min()} → {df[TIMESTAMP_COL].max()}")
+    print(f"• Forecasted features: {', '.join(FEATURES_TO_FORECAST)}")
+    return df, ts_store
 
-# Sort
-df = df.sort_values(by=TIMESTAMP_COL)
 
-print(f"\n• Data covers: {df[TIMESTAMP_COL].min()} → {df[TIMESTAMP_COL].max()}")
-print(f"• Forecasted features: {', '.join(FEATURES_TO_FORECAST)}")
+def collect_jobs(df, ts_store=None):
+    """Independent (tank_id, feature, series) jobs with enough history to fit."""
+    stage("collect_jobs")
+    if ts_store is not None:
+        # Series straight from the memory-mapped tank segments (no groupby / sort)
+        tank_groups = [
+            (tank_id, pd.DataFrame({f: ts_store.series(tank_id, f, DATE_FROM, DATE_TO)
+                                    for f in FEATURES_TO_FORECAST if f in ts_store.schema}))
+            for tank_id in ts_store.tank_ids(TANK_FILTER)
+        ]
+    else:
+        tank_groups = ((tank_id, group.set_index(TIMESTAMP_COL)) for tank_id, group in df.groupby(TANK_COL))
+
+    jobs = []
+    for tank_id, group in tank_groups:
+
+        for feature in FEATURES_TO_FORECAST:
+            if feature not in group.columns:
+                print(f"❌ Feature '{feature}' not found. Skipping.")
+                continue
+
+            if not pd.api.types.is_numeric_dtype(group[feature]):
+                print(f"❌ Feature '{feature}' is not numeric and cannot be forecast. Skipping.")
+                continue
+
+            series = group[feature].dropna()
+
+            if len(series) < 20:
+                print(f"⚠  Too few data points for {feature} in tank {tank_id}. Skipping.")
+                continue
+
+            jobs.append((tank_id, feature, series))
+    return jobs
+
 
 # -----------------------------
 # FORECASTING LOOP
 # -----------------------------
-all_forecasts = []
+def run_forecasts(source=DATA_SOURCE, engine=FORECAST_ENGINE, plots_enabled=PLOTS_ENABLED, csv_out=CSV_OUT):
+    """
+    Fit every (tank, feature) series, save the forecasts CSV (and plots).
+    Returns (df, models) with models[(tank_id, feature)] = (series, model_fit).
+    """
+    df, ts_store = load_history(source)
+    jobs = collect_jobs(df, ts_store)
 
-# Store model and data for user input predictions
-models = {}  # key: (tank_id, feature)
+    all_forecasts = []
 
-for tank_id, group in df.groupby(TANK_COL):
-    group = group.set_index(TIMESTAMP_COL)
+    # Store model and data for user input predictions
+    models = {}  # key: (tank_id, feature)
 
-    for feature in FEATURES_TO_FORECAST:
-        if feature not in group.columns:
-            print(f"❌ Feature '{feature}' not found. Skipping.")
-            continue
+    stage("fit", engine=engine)
+    model_labels = {}
+    if engine == "batched":
+        # All tanks of a feature estimated at once with vectorized NumPy
+        print(f"• Fitting {len(jobs)} series with the batched '{BATCHED_METHOD}' engine")
+        results = fit_batched(df, FEATURES_TO_FORECAST, BATCHED_METHOD, TIMESTAMP_COL, TANK_COL,
+                              forecast_steps=FORECAST_STEPS)
+        model_label = f"batched {BATCHED_METHOD}"
+    elif engine == "selected":
+        # Per-series model from the last backtest (ARIMA_ORDER where a series has none)
+        selection = load_selection(MODEL_SELECTION_FILE)
+        default = next((c for c in CANDIDATES if c.order == tuple(ARIMA_ORDER)), CANDIDATES[0])
+        model_labels = {(t, f): selection.get((t, f), default).label for t, f, _ in jobs}
+        print(f"• Fitting {len(jobs)} series with their backtest-selected models "
+              f"({len(selection)} selections in '{MODEL_SELECTION_FILE}'):")
+        for label, n in pd.Series(list(model_labels.values()), dtype=object).value_counts().items():
+            print(f"   {n} x {label}")
+        store = ModelStore(MODEL_STORE_DIR, FULL_REFIT_EVERY) if MODEL_STORE_DIR else None
+        results = fit_selected(jobs, selection, FORECAST_STEPS, n_workers=N_WORKERS, store=store, default=default)
+        model_label = "selected"
+    else:
+        # Fit all jobs (in a process pool when N_WORKERS > 1)
+        print(f"• Fitting {len(jobs)} ARIMA models with {N_WORKERS or os.cpu_count()} worker(s)")
+        store = ModelStore(MODEL_STORE_DIR, FULL_REFIT_EVERY) if MODEL_STORE_DIR else None
+        results = fit_series_jobs(jobs, FORECAST_STEPS, n_workers=N_WORKERS, order=ARIMA_ORDER, store=store)
+        modes = pd.Series([r.mode for r in results if r.ok], dtype=object).value_counts().to_dict()
+        print(f"• Models: {modes.get('fit', 0)} refit, {modes.get('append', 0)} updated with new readings, "
+              f"{modes.get('cached', 0)} unchanged")
+        model_label = f"ARIMA({','.join(map(str, ARIMA_ORDER))})"
 
-        series = group[feature].dropna()
+    stage("collect_forecasts")
+    failed = []
+    plot_jobs = []
+    for res in results:
+        tank_id, feature, series = res.tank_id, res.feature, res.series
 
-        if len(series) < 20:
-            print(f"⚠  Too few data points for {feature} in tank {tank_id}. Skipping.")
+        if not res.ok:
+            print(f"❌ Error with {feature} in tank {tank_id}: {res.error}")
+            failed.append(res)
             continue
 
-        try:
-            model = ARIMA(series, order=(1, 1, 1))
-            model_fit = model.fit()
-
-            # Save model
-            models[(tank_id, feature)] = (series, model_fit)
-
-            # Forecast
-            inferred_freq = pd.infer_freq(series.index[:20]) or "30T"
-            forecast = model_fit.forecast(steps=FORECAST_STEPS)
-            forecast_index = pd.date_range(start=series.index[-1], periods=FORECAST_STEPS + 1, freq=inferred_freq)[1:]
-
-            for i in range(FORECAST_STEPS):
-                all_forecasts.append({
-                    "Tank_ID": tank_id,
-                    "Feature": feature,
-                    "Forecast_Time": forecast_index[i],
-                    "Forecast_Value": forecast.iloc[i]
-                })
-
-            # Plot
-            plt.figure(figsize=(10, 5))
-            plt.plot(series.index, series.values, label="Observed")
-            plt.plot(forecast_index, forecast.values, "r--o", label="Forecast")
-            plt.title(f"{feature} – Tank {tank_id} (ARIMA(1,1,1))")
-            plt.xlabel("Timestamp")
-            plt.ylabel(feature)
-            plt.grid(True)
-            plt.legend()
-            plt.tight_layout()
-
-            filename = f"{feature}_Tank{tank_id}.png".replace(" ", "")
-            plt.savefig(OUTPUT_DIR / filename)
-            plt.close()
+        model_fit, forecast, forecast_index = res.model_fit, res.forecast, res.forecast_index
+
+        # Save model
+        models[(tank_id, feature)] = (series, model_fit)
+
+        for i in range(FORECAST_STEPS):
+            all_forecasts.append({
+                "Tank_ID": tank_id,
+                "Feature": feature,
+                "Forecast_Time": forecast_index[i],
+                "Forecast_Value": forecast.iloc[i]
+            })
+
+        if plots_enabled:
+            plot_jobs.append(plot_job_from_result(res, model_labels.get((tank_id, feature), model_label)))
+
+    if failed:
+        print(f"\n⚠  {len(failed)} of {len(results)} fits failed: "
+              + ", ".join(f"{r.feature}/Tank {r.tank_id}" for r in failed))
+
+    # PLOTS (separate, optional stage)
+    if plots_enabled:
+        stage("plots")
+        rendered, unchanged = render_plots(plot_jobs, OUTPUT_DIR, n_workers=PLOT_WORKERS)
+        for filename in rendered:
             print(f"✅ Saved plot: {filename}")
+        if unchanged:
+            print(f"• {unchanged} plot(s) unchanged since last run – skipped")
+        count("plots_rendered", len(rendered))
+
+    # SAVE FORECASTS TO CSV
+    stage("save_csv")
+    forecast_df = pd.DataFrame(all_forecasts)
+    forecast_df.to_csv(csv_out, index=False)
+    print(f"\n📄 All forecasts saved to: {csv_out}")
+    return df, models
 
-        except Exception as e:
-            print(f"❌ Error with {feature} in tank {tank_id}: {e}")
 
 # -----------------------------
-# SAVE FORECASTS TO CSV
+# BACKTEST & MODEL SELECTION
 # -----------------------------
-forecast_df = pd.DataFrame(all_forecasts)
-forecast_df.to_csv(CSV_OUT, index=False)
-print(f"\n📄 All forecasts saved to: {CSV_OUT}")
+def run_backtest(source=DATA_SOURCE, tolerance=BACKTEST_TOLERANCE, selection_file=MODEL_SELECTION_FILE):
+    """
+    Rolling-origin backtest of every candidate model on every (tank, feature) series.
+    Prints MAE / RMSE per horizon and fit time per model, saves the per-horizon table
+    (BACKTEST_CSV) and the cheapest model within tolerance per series (selection_file).
+    Returns the selection DataFrame.
+    """
+    df, ts_store = load_history(source)
+    jobs = collect_jobs(df, ts_store)
+
+    stage("backtest")
+    print(f"• Backtesting {len(CANDIDATES)} models on {len(jobs)} series "
+          f"({N_FOLDS} folds, horizon {FORECAST_STEPS}) with {BACKTEST_WORKERS or os.cpu_count()} worker(s)")
+    fits, errors = backtest(jobs, horizon=FORECAST_STEPS, n_workers=BACKTEST_WORKERS)
+
+    stage("report")
+    by_horizon = horizon_report(errors)
+    by_horizon.to_csv(BACKTEST_CSV, index=False)
+    print("\n📊 RMSE per horizon step (readings ahead):")
+    print(by_horizon.pivot_table(index=["Feature", "Model"], columns="Horizon", values="RMSE", sort=False)
+          .to_string(float_format=lambda v: f"{v:.3f}"))
+    print("\n📊 Accuracy and fit time per model (mean over tanks, folds and horizons):")
+    print(model_report(fits, errors).to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+    print(f"📄 Per-horizon MAE / RMSE saved to: {BACKTEST_CSV}")
+
+    # Cheapest model within tolerance of the best RMSE, per series
+    stage("select")
+    selection = select_models(fits, errors, tolerance=tolerance)
+    save_selection(selection, selection_file)
+    print(f"\n✅ Model per series (cheapest within {tolerance:.0%} of the best RMSE):")
+    print(selection.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+    baseline = fits[fits["Model"] == CANDIDATES[0].label].groupby(["Tank_ID", "Feature"])["Fit_Seconds"].mean()
+    if len(selection) and baseline.sum() > 0:
+        print(f"⚡ Fit time per full refit: {selection['Fit_Seconds'].sum():.2f} s selected vs "
+              f"{baseline.sum():.2f} s with {CANDIDATES[0].label} for every series")
+    print(f"💾 Selection saved to '{selection_file}' (FORECAST_ENGINE = \"selected\" uses it)")
+    return selection
+
 
 # -----------------------------
 # USER INPUT PREDICTION SECTION
 # -----------------------------
-def predict_at(series, model_fit, ts_point):
-    last_time = series.index[-1]
-    step = pd.infer_freq(series.index[:10]) or "30T"
-    step = pd.Timedelta(step)
-
-    if ts_point <= last_time:
-        # Past timestamp – get closest available data
-        try:
-            return series.asof(ts_point)
-        except Exception:
-            return np.nan
-    else:
-        delta_steps = int(np.ceil((ts_point - last_time) / step))
-        if delta_steps <= 0:
-            return series.iloc[-1]
-        forecast = model_fit.forecast(steps=delta_steps)
-        return forecast.iloc[-1]
-
-# Ask user for time
-try:
-    user_input = input("\nEnter ANY timestamp (DD-MM-YYYY HH:MM) ➜ ")
-    user_time = datetime.strptime(user_input, "%d-%m-%Y %H:%M")
-except Exception:
-    print("❌ Invalid format. Use DD-MM-YYYY HH:MM")
-    exit()
-
-# Generate other target times
-now = datetime.now().replace(second=0, microsecond=0)
-future_times = {
-    "User time": user_time,
-    "Now + 30 min": now + timedelta(minutes=30),
-    "Tomorrow same time": now + timedelta(days=1),
-    "Next month same time": now + pd.DateOffset(months=1)
-}
-
-for tank_id in df[TANK_COL].unique():
-    for label, target_time in future_times.items():
-        print(f"\nTank {tank_id} | {label} ({target_time.strftime('%d-%m-%Y %H:%M')})")
+# Forecast paths are computed once per model, out to the furthest requested time
+forecast_cache = ForecastCache()
+
+
+def predict_at(series, model_fit, ts_point, key=None):
+    """Value at ts_point (a timestamp or a vector of timestamps), answered from forecast_cache."""
+    return forecast_cache.predict_at(series, model_fit, ts_point, key=key)
+
+
+def print_predictions(models, tank_ids, user_time, predict_mode=PREDICT_MODE):
+    """Predicted values of every tank at user_time, now + 30 min, tomorrow and next month."""
+    # Generate other target times
+    now = datetime.now().replace(second=0, microsecond=0)
+    future_times = {
+        "User time": user_time,
+        "Now + 30 min": now + timedelta(minutes=30),
+        "Tomorrow same time": now + timedelta(days=1),
+        "Next month same time": now + pd.DateOffset(months=1)
+    }
+
+    target_times = pd.DatetimeIndex([pd.Timestamp(t) for t in future_times.values()])
+
+    hierarchical = {}
+    if predict_mode == "hierarchical":
+        # One model per resolution; each target time is answered by the finest one whose horizon covers it
+        for key, (series, _) in models.items():
+            try:
+                hierarchical[key] = HierarchicalForecaster(series, order=ARIMA_ORDER).fit()
+            except Exception as e:
+                print(f"❌ Hierarchical model failed for {key[1]} in tank {key[0]}: {e}")
+
+    for tank_id in tank_ids:
+        # One vectorized query per (tank, feature) covering every target time
+        predictions = {}
         for feature in FEATURES_TO_FORECAST:
             key = (tank_id, feature)
-            if key not in models:
-                print(f"  {feature}: [No model]")
-                continue
+            if predict_mode == "hierarchical" and key in hierarchical:
+                predictions[feature] = hierarchical[key].predict_at(target_times)
+            elif predict_mode != "hierarchical" and key in models:
+                series, model_fit = models[key]
+                predictions[feature] = predict_at(series, model_fit, target_times, key=key)
+
+        for i, (label, target_time) in enumerate(future_times.items()):
+            print(f"\nTank {tank_id} | {label} ({target_time.strftime('%d-%m-%Y %H:%M')})")
+            for feature in FEATURES_TO_FORECAST:
+                if feature not in predictions:
+                    print(f"  {feature}: [No model]")
+                    continue
+
+                print(f"  {feature}: {predictions[feature][i]:.2f}")
+
+
+def main(source=DATA_SOURCE, engine=FORECAST_ENGINE, plots_enabled=PLOTS_ENABLED, user_time=None,
+         trace_file=TRACE_FILE, profile_stage=PROFILE_STAGE, backtest_only=BACKTEST):
+    """
+    Batch forecast, then predictions at user_time ('DD-MM-YYYY HH:MM'; asked for when None).
+    backtest_only: run the backtest / model selection instead.
+    """
+    configure(trace_file, profile_stage)
+    if backtest_only:
+        run_backtest(source)
+        finish()
+        return
+    df, models = run_forecasts(source, engine, plots_enabled)
+    # Trace covers the batch run; the interactive part below waits on the user
+    finish()
+
+    # Ask user for time
+    try:
+        if user_time is None:
+            user_time = input("\nEnter ANY timestamp (DD-MM-YYYY HH:MM) ➜ ")
+        user_time = datetime.strptime(user_time, "%d-%m-%Y %H:%M")
+    except Exception:
+        print("❌ Invalid format. Use DD-MM-YYYY HH:MM")
+        return
+
+    print_predictions(models, df[TANK_COL].unique(), user_time)
+
 
-            series, model_fit = models[key]
-            val = predict_at(series, model_fit, pd.Timestamp(target_time))
-            print(f"  {feature}: {val:.2f}")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
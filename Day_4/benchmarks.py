@@ -0,0 +1,373 @@
+"""
+Repeatable benchmark suite for every stage of the pipeline.
+
+Stage groups and the axis they scale along:
+
+    generate    rows   generate_dataset_vectorized (3 tanks, rows / 3 timestamps), and
+                       the row-by-row loop generator (generate_indian_carp_dataset,
+                       mode="loop") on the same shape up to LOOP_MAX_ROWS
+    farm        tanks  generate_farm (READINGS_PER_TANK readings per tank)
+    io          rows   Excel round-trip (save_dataset + read_main_dataset), plus
+                       parquet and feather for comparison
+    classifier  rows   RandomForest train (100 trees, 80% split, as in
+                       ML_classification_code.py) and predict on the rest
+    forecast    tanks  ARIMA fit/forecast of every (tank, feature) series with
+                       fit_series_jobs, then predict_at for TARGET_OFFSETS
+
+Each (group, scale) case runs in a fresh interpreter; setup (building the
+input data) is not timed. Every stage runs --repeats times (fewer once its
+runs add up to REPEAT_BUDGET_S). For every stage the median wall time (and
+the fastest), the case process's RSS before the stage and its peak while the
+stage ran (sampled every RSS_SAMPLE_S; worker processes are not included),
+and throughput (rows/s or series/s) are written to
+BENCH_DIR/results-<time>.json. With a baseline file (--save-baseline writes
+one), median-time or peak-RSS increases above --threshold are flagged as
+regressions and the exit status is 1; timings under MIN_COMPARED_SECONDS are
+too noisy to compare.
+
+Cases the data format cannot hold (Excel above 1,048,575 rows) or that only
+the slow reference code would run (the loop generator above LOOP_MAX_ROWS)
+are recorded as "skipped"; cases running longer than --timeout as "timeout".
+
+Run:  python benchmarks.py [--groups generate io] [--rows 6000 600000] [--tanks 3 100]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from instrumentation import current_rss_mb
+
+# -----------------------------
+# CONFIGURATION
+# -----------------------------
+ROW_SCALES = (6_000, 600_000, 6_000_000)
+TANK_SCALES = (3, 100, 1000)
+GROUPS = {"generate": "rows", "farm": "tanks", "io": "rows", "classifier": "rows", "forecast": "tanks"}
+REPEATS = 5                       # the median is recorded and compared
+REPEAT_BUDGET_S = 120             # stop repeating a stage once its runs add up to this
+CASE_TIMEOUT_S = 1800
+REGRESSION_THRESHOLD = 0.20       # flag > 20% slower / more memory than the baseline
+MIN_COMPARED_SECONDS = 0.5        # shorter timings are mostly noise and are not compared
+RSS_SAMPLE_S = 0.02
+BENCH_DIR = Path("benchmarks")
+BASELINE_FILE = BENCH_DIR / "baseline.json"
+
+READINGS_PER_TANK = 2000          # forecast / farm cases (the original 6000-row dataset per tank)
+EXCEL_MAX_ROWS = 1_048_575
+LOOP_MAX_ROWS = 600_000           # row-by-row generator: ~35k rows/s, a Python dict per row
+FORECAST_FEATURES = ["Temperature_C", "Dissolved_Oxygen_mgL", "Turbidity_NTU", "Soil_Moisture"]
+FORECAST_STEPS = 10
+TARGET_OFFSETS = (timedelta(minutes=30), timedelta(days=1), timedelta(days=30))
+CLASSIFIER_FEATURES = [
+    'Tank_ID', 'Carp_Species', 'Temperature_C', 'Dissolved_Oxygen_mgL',
+    'pH', 'Ammonia_mgL', 'Nitrate_mgL', 'Turbidity_NTU',
+    'Alkalinity_mgL', 'Hardness_mgL', 'Soil_Moisture'
+]
+CLASSIFIER_TARGETS = ['Tank_Leakage', 'Temperature_Status', 'Water_Quality_Index', 'DO_Status', 'Growth_Condition']
+
+
+class _RssPeak:
+    """Highest RSS of this process from start() to stop(), sampled by a background thread."""
+
+    def __init__(self, interval_s=RSS_SAMPLE_S):
+        self.interval_s = interval_s
+        self.before = self.peak = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="bench-rss", daemon=True)
+
+    def _sample(self):
+        rss = current_rss_mb()
+        if rss is not None:
+            self.peak = rss if self.peak is None else max(self.peak, rss)
+
+    def _loop(self):
+        while not self._stop.wait(self.interval_s):
+            self._sample()
+
+    def start(self):
+        self.before = current_rss_mb()
+        self._sample()
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+        return self
+
+
+def _measure(stage, fn, items, unit, repeats):
+    """Run fn up to repeats times; returns (stage record, last result)."""
+    times, result = [], None
+    rss = _RssPeak().start()
+    for _ in range(max(1, repeats)):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+        if sum(times) >= REPEAT_BUDGET_S:
+            break
+    rss.stop()
+    median = statistics.median(times)
+    return {"stage": stage, "status": "ok", "seconds": median, "seconds_min": min(times), "repeats": len(times),
+            "rss_before_mb": rss.before, "peak_rss_mb": rss.peak,
+            "items": items, "unit": unit, "throughput": items / max(median, 1e-12)}, result
+
+
+# -----------------------------
+# STAGE GROUPS (run inside the case process)
+# -----------------------------
+def _rows_frame(rows):
+    from carp_generator import generate_dataset_vectorized
+
+    return generate_dataset_vectorized(n_timestamps=max(1, rows // 3))
+
+
+def _farm_frame(tanks, workdir):
+    from dataset_io import read_main_dataset
+    from farm_generator import INTERVAL_MINUTES, generate_farm
+
+    generate_farm(workdir / "farm", n_tanks=tanks, period_days=READINGS_PER_TANK * INTERVAL_MINUTES / 1440)
+    return read_main_dataset(workdir / "farm")
+
+
+def bench_generate(rows, workdir, repeats):
+    from carp_generator import generate_dataset_vectorized
+    from dataset_creation_code import generate_indian_carp_dataset
+
+    n = max(1, rows // 3)
+    record, _ = _measure("generate", lambda: generate_dataset_vectorized(n_timestamps=n), n * 3, "rows", repeats)
+    if n * 3 > LOOP_MAX_ROWS:
+        loop = {"stage": "generate_loop", "status": "skipped",
+                "reason": f"{n * 3} rows is above LOOP_MAX_ROWS for the row-by-row generator"}
+    else:
+        loop, _ = _measure("generate_loop", lambda: generate_indian_carp_dataset("loop", False, n_timestamps=n),
+                           n * 3, "rows", repeats)
+    return [record, loop]
+
+
+def bench_farm(tanks, workdir, repeats):
+    from farm_generator import INTERVAL_MINUTES, generate_farm
+
+    period = READINGS_PER_TANK * INTERVAL_MINUTES / 1440
+    record, _ = _measure("generate_farm", lambda: generate_farm(workdir / "farm", n_tanks=tanks, period_days=period),
+                         tanks * READINGS_PER_TANK, "rows", repeats)
+    return [record]
+
+
+def bench_io(rows, workdir, repeats):
+    import pandas as pd
+
+    from dataset_io import read_main_dataset, save_dataset
+
+    df = _rows_frame(rows)
+    sidecar = pd.DataFrame({"Parameter": ["-"]})
+    records = []
+    for fmt in ("excel", "parquet", "feather"):
+        stage = f"{fmt}_roundtrip"
+        if fmt == "excel" and len(df) > EXCEL_MAX_ROWS:
+            records.append({"stage": stage, "status": "skipped",
+                            "reason": f"{len(df)} rows exceed the Excel sheet limit"})
+            continue
+        name = str(workdir / f"bench_{fmt}")
+
+        def roundtrip():
+            return read_main_dataset(save_dataset(df, sidecar, sidecar, fmt=fmt, name=name))
+
+        record, back = _measure(stage, roundtrip, len(df), "rows", repeats)
+        if len(back) != len(df):
+            raise RuntimeError(f"{stage}: wrote {len(df)} rows, read {len(back)}")
+        records.append(record)
+    return records
+
+
+def bench_classifier(rows, workdir, repeats):
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.model_selection import train_test_split
+    from sklearn.multioutput import MultiOutputClassifier
+
+    df = _rows_frame(rows)
+    # Category codes stand in for the script's LabelEncoders (same sorted-class codes)
+    for col in ['Carp_Species'] + CLASSIFIER_TARGETS:
+        if df[col].dtype == object:
+            df[col] = df[col].astype("category").cat.codes
+    X_train, X_test, y_train, y_test = train_test_split(
+        df[CLASSIFIER_FEATURES], df[CLASSIFIER_TARGETS], test_size=0.2, random_state=42)
+
+    def train():
+        return MultiOutputClassifier(RandomForestClassifier(n_estimators=100, random_state=42)).fit(X_train, y_train)
+
+    train_record, model = _measure("rf_train", train, len(X_train), "rows", repeats)
+    predict_record, _ = _measure("rf_predict", lambda: model.predict(X_test), len(X_test), "rows", repeats)
+    return [train_record, predict_record]
+
+
+def bench_forecast(tanks, workdir, repeats):
+    import pandas as pd
+
+    from forecast_cache import ForecastCache
+    from forecast_engine import fit_series_jobs
+
+    df = _farm_frame(tanks, workdir)
+    df["Timestamp"] = pd.to_datetime(df["Timestamp"], format="%d-%m-%Y %H:%M")
+    jobs = []
+    for tank_id, group in df.sort_values("Timestamp").groupby("Tank_ID"):
+        group = group.set_index("Timestamp")
+        jobs += [(tank_id, f, group[f].astype(float)) for f in FORECAST_FEATURES]
+
+    fit_record, results = _measure("arima_fit", lambda: fit_series_jobs(jobs, FORECAST_STEPS, n_workers=os.cpu_count()),
+                                   len(jobs), "series", repeats)
+    fitted = [r for r in results if r.ok]
+    if len(fitted) < len(jobs):
+        fit_record["failed"] = len(jobs) - len(fitted)
+
+    def predict_all():
+        cache = ForecastCache()
+        for r in fitted:
+            last = r.series.index[-1]
+            cache.predict_at(r.series, r.model_fit, [last + d for d in TARGET_OFFSETS], key=(r.tank_id, r.feature))
+
+    predict_record, _ = _measure("predict_at", predict_all, len(fitted), "series", repeats)
+    return [fit_record, predict_record]
+
+
+BENCHES = {"generate": bench_generate, "farm": bench_farm, "io": bench_io,
+           "classifier": bench_classifier, "forecast": bench_forecast}
+
+
+def run_case(group, scale, repeats=REPEATS):
+    """One (group, scale) case in this process; returns its stage records."""
+    with tempfile.TemporaryDirectory(prefix="carp_bench_") as tmp:
+        records = BENCHES[group](scale, Path(tmp), repeats)
+    axis = GROUPS[group]
+    return [{"group": group, "axis": axis, "scale": scale, **r} for r in records]
+
+
+# -----------------------------
+# DRIVER (one subprocess per case)
+# -----------------------------
+def _case_in_subprocess(group, scale, repeats, timeout):
+    cmd = [sys.executable, str(Path(__file__).resolve()), "--run-case", group, str(scale), "--repeats", str(repeats)]
+    base = {"group": group, "axis": GROUPS[group], "scale": scale}
+    try:
+        proc = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout,
+                              cwd=Path(__file__).resolve().parent)
+    except subprocess.TimeoutExpired:
+        return [{**base, "stage": group, "status": "timeout", "reason": f"over {timeout} s"}]
+    if proc.returncode != 0:
+        error = (proc.stderr.strip().splitlines() or ["no output"])[-1]
+        return [{**base, "stage": group, "status": "error", "reason": error}]
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """Records whose time or peak RSS grew more than threshold against the baseline."""
+    def key(r):
+        return r["group"], r["stage"], r["scale"]
+
+    before = {key(r): r for r in baseline.get("results", []) if r.get("status") == "ok"}
+    regressions = []
+    for r in results:
+        old = before.get(key(r))
+        if r.get("status") != "ok" or old is None:
+            continue
+        for metric in ("seconds", "peak_rss_mb"):
+            if metric == "seconds" and max(old[metric], r[metric]) < MIN_COMPARED_SECONDS:
+                continue
+            if old.get(metric) and r.get(metric) is not None:
+                ratio = r[metric] / old[metric]
+                r[f"{metric}_vs_baseline"] = ratio
+                if ratio > 1 + threshold:
+                    regressions.append({"stage": r["stage"], "scale": r["scale"], "metric": metric,
+                                        "baseline": old[metric], "current": r[metric], "ratio": ratio})
+    return regressions
+
+
+def run_suite(groups=tuple(GROUPS), row_scales=ROW_SCALES, tank_scales=TANK_SCALES, repeats=REPEATS,
+              timeout=CASE_TIMEOUT_S, baseline=BASELINE_FILE, threshold=REGRESSION_THRESHOLD, out_dir=BENCH_DIR):
+    """Run every case, write the results JSON and compare with the baseline. Returns (report, path)."""
+    results = []
+    for group in groups:
+        for scale in (row_scales if GROUPS[group] == "rows" else tank_scales):
+            print(f"• {group} @ {scale} {GROUPS[group]} ...", flush=True)
+            for r in _case_in_subprocess(group, scale, repeats, timeout):
+                results.append(r)
+                if r["status"] == "ok":
+                    rss = f"{r['peak_rss_mb']:.0f} MB" if r.get("peak_rss_mb") is not None else "n/a"
+                    print(f"   {r['stage']:<18} {r['seconds']:9.3f} s  {rss:>9}  "
+                          f"{r['throughput']:14,.0f} {r['unit']}/s")
+                else:
+                    print(f"   {r['stage']:<18} {r['status']}: {r.get('reason', '')}")
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "host": {"python": platform.python_version(), "platform": platform.platform(),
+                 "cpu_count": os.cpu_count()},
+        "results": results,
+    }
+    baseline = Path(baseline) if baseline else None
+    if baseline is not None and baseline.exists():
+        report["baseline"] = str(baseline)
+        report["regressions"] = compare(results, json.loads(baseline.read_text()), threshold)
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    path = out_dir / f"results-{datetime.now():%Y%m%d-%H%M%S}.json"
+    path.write_text(json.dumps(report, indent=2))
+    return report, path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark generation, I/O, training, forecasting and inference.")
+    parser.add_argument("--groups", nargs="+", choices=list(GROUPS), default=list(GROUPS))
+    parser.add_argument("--rows", nargs="+", type=int, default=list(ROW_SCALES))
+    parser.add_argument("--tanks", nargs="+", type=int, default=list(TANK_SCALES))
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--timeout", type=float, default=CASE_TIMEOUT_S, help="seconds per case")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE)
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    parser.add_argument("--save-baseline", action="store_true", help="also write the results as the new baseline")
+    parser.add_argument("--run-case", nargs=2, metavar=("GROUP", "SCALE"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_case:
+        group, scale = args.run_case
+        print(json.dumps(run_case(group, int(scale), args.repeats)))
+        return 0
+
+    report, path = run_suite(args.groups, args.rows, args.tanks, args.repeats, args.timeout,
+                             args.baseline, args.threshold)
+    print(f"\n💾 Results saved to '{path}'")
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(report, indent=2))
+        print(f"💾 Baseline updated: '{args.baseline}'")
+
+    regressions = report.get("regressions")
+    if regressions is None:
+        if args.save_baseline:
+            print("• No earlier baseline to compare against; this run is the baseline now")
+        else:
+            print("• No baseline to compare against (use --save-baseline)")
+        return 0
+    if not regressions:
+        print(f"✅ No regressions above {args.threshold:.0%} against '{args.baseline}'")
+        return 0
+    print(f"❌ {len(regressions)} regression(s) above {args.threshold:.0%}:")
+    for r in regressions:
+        print(f"   {r['stage']} @ {r['scale']}: {r['metric']} {r['baseline']:.3f} -> {r['current']:.3f} "
+              f"(x{r['ratio']:.2f})")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
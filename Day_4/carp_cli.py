@@ -0,0 +1,214 @@
+"""
+One command line for the whole pipeline.
+
+    python carp_cli.py generate  [--mode loop|vectorized|farm] [--format excel|parquet|feather|timeseries]
+    python carp_cli.py train     [--tune] [--data PATH] [--no-plots]
+    python carp_cli.py forecast  [--data PATH] [--engine statsmodels|batched|selected] [--at "DD-MM-YYYY HH:MM"]
+    python carp_cli.py backtest  [--data PATH] [--tolerance 0.05]
+    python carp_cli.py predict   [--reading JSON | --reading -]   (no reading = console prompts)
+    python carp_cli.py serve     [--ingest] [--host H] [--port P]
+    python carp_cli.py import-time
+
+Options left out fall back to the settings at the top of each script.
+Every subcommand wraps the functions of the existing scripts
+(dataset_creation_code.main, ML_classification_code.train_classifier /
+predict_from_input, ML_future_trend_prediction_code.run_forecasts /
+predict_at / run_backtest, prediction_service.run, ingestion_server.run). This module only
+imports the standard library; pandas, sklearn, statsmodels, matplotlib and the
+rest are imported inside the subcommand that needs them, so `--help` or a
+`predict` call does not pay for a forecasting stack.
+
+`import-time` measures the cost of importing this module (and, for reference,
+of each subcommand's modules) in fresh interpreters and fails when the CLI
+itself exceeds IMPORT_BUDGET_MS.
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+IMPORT_BUDGET_MS = 100
+IMPORT_RUNS = 5
+HERE = Path(__file__).resolve().parent
+
+# Modules each subcommand imports (for the import-time report)
+SUBCOMMAND_MODULES = {
+    "generate": ["dataset_creation_code"],
+    "train": ["ML_classification_code", "sklearn.ensemble", "rf_tuning"],
+    "forecast": ["ML_future_trend_prediction_code", "statsmodels.tsa.arima.model"],
+    "backtest": ["ML_future_trend_prediction_code", "statsmodels.tsa.arima.model"],
+    "predict": ["prediction_service", "ML_classification_code"],
+    "serve": ["prediction_service", "ingestion_server"],
+}
+
+
+# -----------------------------
+# SUBCOMMANDS
+# -----------------------------
+def cmd_generate(args):
+    import dataset_creation_code as creation
+
+    creation.main(mode=args.mode or creation.GENERATION_MODE, output_format=args.format or creation.OUTPUT_FORMAT,
+                  farm_tanks=args.tanks or creation.FARM_TANKS, trace_file=args.trace or creation.TRACE_FILE)
+    return 0
+
+
+def cmd_train(args):
+    import ML_classification_code as classification
+
+    classification.main(mode="tune" if args.tune else "train", source=args.data or classification.file_path,
+                        show_plots=not args.no_plots, trace_file=args.trace or classification.TRACE_FILE)
+    return 0
+
+
+def cmd_forecast(args):
+    import ML_future_trend_prediction_code as trend
+
+    trend.main(source=args.data or trend.DATA_SOURCE, engine=args.engine or trend.FORECAST_ENGINE,
+               plots_enabled=trend.PLOTS_ENABLED and not args.no_plots, user_time=args.at,
+               trace_file=args.trace or trend.TRACE_FILE)
+    return 0
+
+
+def cmd_backtest(args):
+    import ML_future_trend_prediction_code as trend
+    from instrumentation import configure, finish
+
+    configure(args.trace or trend.TRACE_FILE)
+    trend.run_backtest(source=args.data or trend.DATA_SOURCE,
+                       tolerance=trend.BACKTEST_TOLERANCE if args.tolerance is None else args.tolerance)
+    finish()
+    return 0
+
+
+def cmd_predict(args):
+    if args.reading is None:
+        import ML_classification_code as classification
+
+        classification.predict_from_input()
+        return 0
+
+    from classifier_artifacts import ARTIFACT_DIR, load_classifier, load_flat_forest
+    from prediction_service import CarpPredictor
+
+    payload = json.loads(sys.stdin.read() if args.reading == "-" else args.reading)
+    readings = payload if isinstance(payload, list) else [payload]
+    artifact_dir = args.artifacts or ARTIFACT_DIR
+    artifact = load_classifier(artifact_dir)
+    predictor = CarpPredictor(artifact, load_flat_forest(artifact_dir, artifact["version"]))
+    try:
+        rows = predictor.encode_batch(readings)
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+    results = predictor.predict_batch(rows)
+    print(json.dumps(results if isinstance(payload, list) else results[0], indent=2))
+    return 0
+
+
+def cmd_serve(args):
+    if args.ingest:
+        import ingestion_server
+
+        ingestion_server.run(host=args.host or ingestion_server.HOST, port=args.port or ingestion_server.PORT)
+    else:
+        import prediction_service
+
+        prediction_service.run(host=args.host or prediction_service.HOST, port=args.port or prediction_service.PORT,
+                               artifact_dir=args.artifacts or prediction_service.ARTIFACT_DIR)
+    return 0
+
+
+# -----------------------------
+# IMPORT-TIME BUDGET
+# -----------------------------
+def _import_ms(statement, runs=IMPORT_RUNS):
+    """Best-of-runs wall time (ms) of a fresh interpreter running statement, minus an empty one."""
+    def best(code):
+        times = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, "-c", code], cwd=HERE, check=True)
+            times.append(time.perf_counter() - start)
+        return min(times) * 1000
+
+    return best(statement) - best("pass")
+
+
+def cmd_import_time(args):
+    cli_ms = _import_ms("import carp_cli; carp_cli.build_parser()")
+    ok = cli_ms <= args.budget_ms
+    print(f"{'✅' if ok else '❌'} carp_cli startup: {cli_ms:.0f} ms (budget {args.budget_ms:.0f} ms)")
+    if args.all:
+        print("• Deferred imports per subcommand:")
+        for name, modules in SUBCOMMAND_MODULES.items():
+            ms = _import_ms("; ".join(f"import {m}" for m in modules), runs=1)
+            print(f"   {name:<10} {ms:8.0f} ms  ({', '.join(modules)})")
+    return 0 if ok else 1
+
+
+# -----------------------------
+# PARSER
+# -----------------------------
+def build_parser():
+    parser = argparse.ArgumentParser(prog="carp_cli", description="Indian Major Carps hatchery pipeline")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("generate", help="generate the synthetic dataset")
+    p.add_argument("--mode", choices=["loop", "vectorized", "farm"])
+    p.add_argument("--format", choices=["excel", "parquet", "feather", "timeseries"],
+                   help="output layout (farm mode always writes parquet shards)")
+    p.add_argument("--tanks", type=int, help="farm mode: number of tanks")
+    p.add_argument("--trace", help="run trace file (.jsonl or Chrome-trace .json)")
+    p.set_defaults(func=cmd_generate)
+
+    p = sub.add_parser("train", help="train, evaluate and save the classifier")
+    p.add_argument("--tune", action="store_true", help="successive-halving forest search (rf_tuning.py)")
+    p.add_argument("--data")
+    p.add_argument("--no-plots", action="store_true")
+    p.add_argument("--trace")
+    p.set_defaults(func=cmd_train)
+
+    p = sub.add_parser("forecast", help="fit per-(tank, feature) forecasts and save them")
+    p.add_argument("--data")
+    p.add_argument("--engine", choices=["statsmodels", "batched", "selected"],
+                   help="selected = per-series models picked by the last backtest")
+    p.add_argument("--at", help="'DD-MM-YYYY HH:MM' to predict at (asked for when omitted)")
+    p.add_argument("--no-plots", action="store_true")
+    p.add_argument("--trace")
+    p.set_defaults(func=cmd_forecast)
+
+    p = sub.add_parser("backtest", help="rolling-origin backtest of candidate models; picks one per series")
+    p.add_argument("--data")
+    p.add_argument("--tolerance", type=float, help="accepted RMSE increase over the best model (0.05 = 5%%)")
+    p.add_argument("--trace")
+    p.set_defaults(func=cmd_backtest)
+
+    p = sub.add_parser("predict", help="classify readings with the latest artifact")
+    p.add_argument("--reading", help="JSON reading or list of readings, '-' = stdin; omitted = console prompts")
+    p.add_argument("--artifacts")
+    p.set_defaults(func=cmd_predict)
+
+    p = sub.add_parser("serve", help="HTTP prediction service (or --ingest: ThingSpeak-compatible ingestion)")
+    p.add_argument("--ingest", action="store_true")
+    p.add_argument("--host")
+    p.add_argument("--port", type=int)
+    p.add_argument("--artifacts")
+    p.set_defaults(func=cmd_serve)
+
+    p = sub.add_parser("import-time", help="check the CLI startup cost against IMPORT_BUDGET_MS")
+    p.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    p.add_argument("--all", action="store_true", help="also time each subcommand's deferred imports")
+    p.set_defaults(func=cmd_import_time)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+"""
+Vectorized, chunked generator for the Indian Major Carps dataset.
+
+Same rules as generate_indian_carp_dataset() in dataset_creation_code.py, but
+every parameter is drawn as a NumPy array per tank and the clipping, leakage
+and label rules are applied on whole arrays. Rows are produced in fixed-size
+chunks so very long histories can be streamed in bounded memory. With
+compact=True the chunks are built in the compact schema (compact_schema.py):
+no timestamp strings are formatted and labels are categorical codes.
+"""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from compact_schema import label_categorical, species_categorical, to_compact
+from threshold_rules import RULES
+
+# -----------------------------
+# CONFIGURATION
+# -----------------------------
+# Carp species characteristics
+CARP_SPECIES = {
+    1: 'Rohu',  # Surface and column feeder
+    2: 'Catla',  # Surface feeder
+    3: 'Mrigal'  # Bottom feeder
+}
+
+# Species-specific base values (temperature, DO, pH, turbidity)
+SPECIES_BASELINES = {
+    'Rohu': {'temperature': 28.0, 'do': 6.5, 'ph': 7.8, 'turbidity': 25},
+    'Catla': {'temperature': 27.5, 'do': 7.0, 'ph': 7.5, 'turbidity': 30},
+    'Mrigal': {'temperature': 27.0, 'do': 6.0, 'ph': 7.3, 'turbidity': 35},
+}
+
+START_TIME = datetime(2025, 6, 1, 0, 0, 0)
+INTERVAL_MINUTES = 30
+N_TIMESTAMPS = 3000
+TANK_IDS = (1, 2, 3)
+CHUNK_ROWS = 300_000
+SEED = 42
+
+COLUMNS = [
+    'Timestamp', 'Entry_ID', 'Tank_ID', 'Carp_Species', 'Temperature_C',
+    'Dissolved_Oxygen_mgL', 'pH', 'Ammonia_mgL', 'Nitrate_mgL', 'Turbidity_NTU',
+    'Alkalinity_mgL', 'Hardness_mgL', 'Soil_Moisture', 'Water_Flow_Lmin',
+    'Feeding_Frequency', 'Tank_Leakage', 'Temperature_Status',
+    'Water_Quality_Index', 'DO_Status', 'Growth_Condition'
+]
+
+
+# -----------------------------
+# PARAMETER DRAWS (one tank)
+# -----------------------------
+def _draw_tank(rng, species, n):
+    """Draw n readings for one tank, clipped exactly like the row generator."""
+    base = SPECIES_BASELINES[species]
+
+    params = {
+        'temperature': np.clip(rng.normal(base['temperature'], 1.5, n), 22, 35),
+        'dissolved_oxygen': np.clip(rng.normal(base['do'], 1.2, n), 3, 12),
+        'ph': np.clip(rng.normal(base['ph'], 0.4, n), 6.0, 9.5),
+        'ammonia': np.minimum(rng.exponential(0.12, n), 1.0),
+        'nitrate': np.minimum(rng.exponential(6, n), 40),
+        'turbidity': np.clip(rng.normal(base['turbidity'], 8, n), 5, 80),
+        'alkalinity': np.clip(rng.normal(100, 20, n), 40, 200),
+        'hardness': np.clip(rng.normal(110, 25, n), 30, 250),
+        'soil_moisture': np.clip(rng.normal(3800, 120, n), 3500, 4100),
+        'water_flow': np.clip(rng.normal(150, 25, n), 100, 200),
+        'feeding_freq': rng.integers(2, 5, n),
+    }
+
+    # Tank Leakage: soil above 4000, or above 3950 with a 25% chance
+    soil = params['soil_moisture']
+    leak = (soil > 4000) | ((soil > 3950) & (rng.random(n) < 0.25))
+    params['soil_moisture'] = np.where(leak, rng.uniform(4000, 4100, n), soil)
+    params['tank_leakage'] = leak.astype(int)
+
+    return params
+
+
+def _interleave(per_tank):
+    """(n_tanks, n) -> timestamp-major order: t0/tank1, t0/tank2, ..., t1/tank1"""
+    return np.stack(per_tank, axis=1).ravel()
+
+
+# -----------------------------
+# CHUNKED GENERATION
+# -----------------------------
+def iter_dataset_chunks(n_timestamps=N_TIMESTAMPS, tank_ids=TANK_IDS, chunk_rows=CHUNK_ROWS,
+                        seed=SEED, start_time=START_TIME, interval_minutes=INTERVAL_MINUTES, compact=False):
+    """
+    Yield the dataset as DataFrames of at most chunk_rows rows.
+    Each chunk covers whole timestamps, so every tank appears in every chunk.
+    compact=True: chunks in the compact schema (same values, draws and labels).
+    """
+    rng = np.random.default_rng(seed)
+    tank_ids = list(tank_ids)
+    n_tanks = len(tank_ids)
+    step = max(1, chunk_rows // n_tanks)
+    start = np.datetime64(start_time, 'm')
+    interval = np.timedelta64(interval_minutes, 'm')
+    species = [CARP_SPECIES[t] for t in tank_ids]
+
+    for t0 in range(0, n_timestamps, step):
+        t1 = min(t0 + step, n_timestamps)
+        n = t1 - t0
+
+        draws = [_draw_tank(rng, CARP_SPECIES[tank_id], n) for tank_id in tank_ids]
+        cols = {key: _interleave([d[key] for d in draws]) for key in draws[0]}
+
+        labels = RULES.label_arrays(
+            as_codes=compact,
+            temperature=cols['temperature'], dissolved_oxygen=cols['dissolved_oxygen'],
+            ph=cols['ph'], ammonia=cols['ammonia'], nitrate=cols['nitrate'],
+            turbidity=cols['turbidity']
+        )
+
+        times = start + np.arange(t0, t1) * interval
+        if compact:
+            stamps = times.astype('datetime64[ns]')
+            labels = {label: label_categorical(label, codes) for label, codes in labels.items()}
+            tank_species = species_categorical(species)
+        else:
+            # Format each timestamp once, then repeat it for every tank
+            stamps = pd.DatetimeIndex(times).strftime('%d-%m-%Y %H:%M').to_numpy()
+            tank_species = np.asarray(species, dtype=object)
+
+        chunk = pd.DataFrame({
+            'Timestamp': np.repeat(stamps, n_tanks),
+            'Entry_ID': np.arange(t0 * n_tanks + 1, t1 * n_tanks + 1),
+            'Tank_ID': np.tile(tank_ids, n),
+            'Carp_Species': tank_species.take(np.tile(np.arange(n_tanks), n)),
+            'Temperature_C': np.round(cols['temperature'], 1),
+            'Dissolved_Oxygen_mgL': np.round(cols['dissolved_oxygen'], 1),
+            'pH': np.round(cols['ph'], 1),
+            'Ammonia_mgL': np.round(cols['ammonia'], 3),
+            'Nitrate_mgL': np.round(cols['nitrate'], 1),
+            'Turbidity_NTU': np.round(cols['turbidity'], 1),
+            'Alkalinity_mgL': np.round(cols['alkalinity'], 1),
+            'Hardness_mgL': np.round(cols['hardness'], 1),
+            'Soil_Moisture': cols['soil_moisture'].astype(int),
+            'Water_Flow_Lmin': np.round(cols['water_flow'], 1),
+            'Feeding_Frequency': cols['feeding_freq'],
+            'Tank_Leakage': cols['tank_leakage'],
+            'Temperature_Status': labels['Temperature_Status'],
+            'Water_Quality_Index': labels['Water_Quality_Index'],
+            'DO_Status': labels['DO_Status'],
+            'Growth_Condition': labels['Growth_Condition']
+        }, columns=COLUMNS)
+        yield to_compact(chunk) if compact else chunk
+
+
+def generate_dataset_vectorized(**kwargs):
+    """Whole dataset in one DataFrame (use iter_dataset_chunks for large runs)."""
+    return pd.concat(iter_dataset_chunks(**kwargs), ignore_index=True)
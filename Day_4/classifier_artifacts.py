@@ -0,0 +1,97 @@
+"""
+Versioned artifacts for the multi-output Random Forest classifier.
+
+Training writes the fitted model, carp_encoder and label_encoders (plus the
+feature / target lists and the trend-feature settings, see feature_pipeline.py) to classifier_artifacts/<version>/ and points
+classifier_artifacts/LATEST at it. Serving loads an artifact with joblib's
+mmap_mode="r": the stored NumPy arrays are mapped from the file (shared through
+the OS page cache by every worker) instead of being read and unpickled, so a
+cold start takes milliseconds instead of a full training run.
+
+Note: sklearn's Tree copies its node arrays into private buffers when it is
+unpickled, so each process still holds its own copy of the tree nodes. The
+flat-array export (flat_forest.py) saved next to the model is mapped directly
+and shared by every process.
+"""
+import json
+from datetime import datetime
+from pathlib import Path
+
+import joblib
+
+from flat_forest import FLAT_DIR, FlatForest
+
+ARTIFACT_DIR = Path("classifier_artifacts")
+LATEST_FILE = "LATEST"
+MODEL_FILE = "model.joblib"
+META_FILE = "meta.json"
+
+
+def save_classifier(model, carp_encoder, label_encoders, features, targets, root=ARTIFACT_DIR,
+                    version=None, metrics=None, feature_pipeline=None):
+    """
+    Write a new artifact version and mark it as latest. Returns the version name.
+    feature_pipeline: OnlineFeatures.config() when the model uses per-tank trend features.
+    Versions are timestamped to the microsecond; an existing version directory is an
+    error (FileExistsError), never overwritten.
+    """
+    import sklearn
+
+    root = Path(root)
+    version = version or datetime.now().strftime("v%Y%m%d-%H%M%S-%f")
+    out = root / version
+    root.mkdir(parents=True, exist_ok=True)
+    out.mkdir(exist_ok=False)
+
+    # Uncompressed so the arrays can be memory-mapped on load
+    joblib.dump({
+        "model": model,
+        "carp_encoder": carp_encoder,
+        "label_encoders": label_encoders,
+        "features": list(features),
+        "targets": list(targets),
+        "feature_pipeline": feature_pipeline,
+    }, out / MODEL_FILE, compress=0)
+    FlatForest.from_sklearn(model).save(out / FLAT_DIR)
+
+    (out / META_FILE).write_text(json.dumps({
+        "version": version,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "sklearn_version": sklearn.__version__,
+        "features": list(features),
+        "targets": list(targets),
+        "feature_pipeline": feature_pipeline,
+        "metrics": metrics or {},
+    }, indent=2))
+    # Written aside and renamed, so a reader never sees a half-written LATEST
+    tmp = root / f"{LATEST_FILE}.{version}.tmp"
+    tmp.write_text(version)
+    tmp.replace(root / LATEST_FILE)
+    return version
+
+
+def latest_version(root=ARTIFACT_DIR):
+    path = Path(root) / LATEST_FILE
+    if not path.exists():
+        raise FileNotFoundError(f"No classifier artifact under '{root}'. Train first.")
+    return path.read_text().strip()
+
+
+def load_classifier(root=ARTIFACT_DIR, version=None, mmap=True):
+    """
+    dict with model, carp_encoder, label_encoders, features, targets, version
+    (and feature_pipeline for artifacts trained with trend features).
+    mmap=True maps the stored arrays read-only instead of copying them in.
+    """
+    root = Path(root)
+    version = version or latest_version(root)
+    artifact = joblib.load(root / version / MODEL_FILE, mmap_mode="r" if mmap else None)
+    artifact["version"] = version
+    return artifact
+
+
+def load_flat_forest(root=ARTIFACT_DIR, version=None, mmap=True):
+    """Flat node arrays of an artifact (see flat_forest.py), memory-mapped by default."""
+    root = Path(root)
+    version = version or latest_version(root)
+    return FlatForest.load(root / version / FLAT_DIR, mmap=mmap)
@@ -0,0 +1,179 @@
+"""
+Compact in-memory schema for long sensor histories.
+
+    Timestamp                   datetime64[ns]  int64 nanoseconds since the epoch
+    Entry_ID                    int64
+    Tank_ID                     int16
+    Carp_Species                category        SPECIES_CATEGORIES
+    measurements                float32
+    Feeding_Frequency           int8
+    Tank_Leakage                category        (0, 1)
+    Temperature / DO status,    category        threshold_rules label tables
+    Water_Quality_Index,
+    Growth_Condition
+
+The legacy frames hold Timestamp as 'DD-MM-YYYY HH:MM' strings that every
+consumer re-parses, and the species / label columns as one Python string
+object per row. In the compact schema a timestamp is 8 bytes and needs no
+parsing, a categorical cell is a 1-byte code and a measurement 4 bytes.
+
+Categories are fixed and sorted, so every chunk, shard and file gets the same
+codes (pd.concat and Arrow keep the columns categorical) and the codes are the
+ones sklearn's LabelEncoder assigns: the classifier encodes a categorical
+column from its few categories instead of from every row. float32 is also the
+precision the random forest splits on, so the fitted model is unchanged.
+
+The generators build frames in this schema directly (compact=True);
+to_compact() converts any frame read by dataset_io.read_main_dataset().
+Parquet, Feather and the timeseries store keep the compact types on disk; the
+Excel workbook is written in the legacy representation (to_legacy()).
+"""
+import numpy as np
+import pandas as pd
+
+from threshold_rules import RULES
+
+# -----------------------------
+# SCHEMA
+# -----------------------------
+TIMESTAMP_COL = "Timestamp"
+TIMESTAMP_FORMAT = "%d-%m-%Y %H:%M"
+
+# Species with baselines in carp_generator.py (sorted = LabelEncoder order)
+SPECIES_CATEGORIES = ('Catla', 'Mrigal', 'Rohu')
+TEXT_LABELS = ('Temperature_Status', 'Water_Quality_Index', 'DO_Status', 'Growth_Condition')
+
+MEASUREMENTS = (
+    'Temperature_C', 'Dissolved_Oxygen_mgL', 'pH', 'Ammonia_mgL', 'Nitrate_mgL', 'Turbidity_NTU',
+    'Alkalinity_mgL', 'Hardness_mgL', 'Soil_Moisture', 'Water_Flow_Lmin'
+)
+# Decimals the generators round each reading to (0 = integral, written back as int64)
+MEASUREMENT_DECIMALS = {**{c: 1 for c in MEASUREMENTS}, 'Ammonia_mgL': 3, 'Soil_Moisture': 0}
+
+COMPACT_DTYPES = {
+    TIMESTAMP_COL: np.dtype('datetime64[ns]'),
+    'Entry_ID': np.dtype('int64'),
+    'Tank_ID': np.dtype('int16'),
+    'Carp_Species': pd.CategoricalDtype(sorted(SPECIES_CATEGORIES)),
+    **{c: np.dtype('float32') for c in MEASUREMENTS},
+    'Feeding_Frequency': np.dtype('int8'),
+    'Tank_Leakage': pd.CategoricalDtype([0, 1]),
+    **{label: pd.CategoricalDtype(sorted(RULES.label_table(label))) for label in TEXT_LABELS},
+}
+
+
+def label_categorical(label, codes):
+    """threshold_rules codes of a text label -> Categorical in the compact categories (no strings built)."""
+    dtype = COMPACT_DTYPES[label]
+    remap = dtype.categories.get_indexer(RULES.label_table(label))
+    return pd.Categorical.from_codes(remap[np.asarray(codes)], dtype=dtype)
+
+
+def species_categorical(species):
+    """Species names (one per row) -> Categorical in the compact categories."""
+    return _to_category(pd.Series(species), 'Carp_Species').array
+
+
+# -----------------------------
+# CONVERSION
+# -----------------------------
+def _to_category(s, column):
+    dtype = COMPACT_DTYPES[column]
+    out = s.astype(dtype)
+    lost = out.isna() & s.notna()
+    if lost.any():
+        raise ValueError(f"{column}: values outside the compact categories: "
+                         f"{sorted(map(str, s[lost].unique()))}")
+    return out
+
+
+def to_compact(df):
+    """Copy of df with every known column in COMPACT_DTYPES (other columns are kept as they are)."""
+    out = {}
+    for column in df.columns:
+        s = df[column]
+        dtype = COMPACT_DTYPES.get(column)
+        if dtype is None or s.dtype == dtype:
+            out[column] = s
+        elif column == TIMESTAMP_COL:
+            # Legacy strings are parsed here, once
+            out[column] = s if pd.api.types.is_datetime64_any_dtype(s) else pd.to_datetime(s, format=TIMESTAMP_FORMAT)
+        elif isinstance(dtype, pd.CategoricalDtype):
+            out[column] = _to_category(s, column)
+        elif dtype.kind == 'i' and s.isna().any():
+            # Integer columns a source does not report keep pandas' NA (Int8 / Int16 / Int64)
+            out[column] = s.astype(dtype.name.capitalize())
+        else:
+            out[column] = s.astype(dtype)
+    return pd.DataFrame(out, index=df.index)
+
+
+def decimal_float64(s):
+    """float32 Series -> float64 of each value's shortest decimal (27.1, not 27.100000381469727)."""
+    return s.astype(str).astype('float64')
+
+
+def legacy_float(s, column):
+    """
+    float32 reading -> the float64 the generator wrote: rounded back to the column's
+    MEASUREMENT_DECIMALS (28.7, not 28.700000762939453), int64 for integral readings.
+    """
+    decimals = MEASUREMENT_DECIMALS.get(column)
+    if decimals is None:
+        return decimal_float64(s)
+    s = s.astype('float64').round(decimals)
+    if decimals == 0 and not s.isna().any():
+        s = s.astype('int64')
+    return s
+
+
+def to_legacy(df):
+    """
+    The pre-compact representation: Timestamp strings, object labels, 64-bit numbers
+    with the generator's decimals. Used for the Excel layout, console output and to
+    report how much the compact schema saves.
+    """
+    out = {}
+    for column in df.columns:
+        s = df[column]
+        if column == TIMESTAMP_COL and pd.api.types.is_datetime64_any_dtype(s):
+            s = s.dt.strftime(TIMESTAMP_FORMAT)
+        elif isinstance(s.dtype, pd.CategoricalDtype):
+            s = s.astype(s.cat.categories.dtype)
+        elif s.dtype == np.float32:
+            s = legacy_float(s, column)
+        elif pd.api.types.is_integer_dtype(s) and not pd.api.types.is_extension_array_dtype(s):
+            s = s.astype('int64')
+        out[column] = s
+    return pd.DataFrame(out, index=df.index)
+
+
+# -----------------------------
+# MEMORY
+# -----------------------------
+def memory_mb(df):
+    """Deep memory use (object strings counted) in MB."""
+    return df.memory_usage(deep=True, index=False).sum() / 1024 ** 2
+
+
+def memory_report(before, after):
+    """Per-column dtype and deep memory of two versions of a frame, plus a TOTAL row."""
+    def _mb(s):
+        return s.memory_usage(deep=True, index=False) / 1024 ** 2
+
+    rows = [{"Column": c, "Before": str(before[c].dtype), "Before_MB": _mb(before[c]),
+             "After": str(after[c].dtype), "After_MB": _mb(after[c])}
+            for c in after.columns if c in before.columns]
+    rows.append({"Column": "TOTAL", "Before": "", "Before_MB": memory_mb(before), "After": "",
+                 "After_MB": memory_mb(after)})
+    return pd.DataFrame(rows)
+
+
+def compact_loaded(df):
+    """to_compact() on a freshly loaded frame, printing the memory before and after."""
+    before = memory_mb(df)
+    df = to_compact(df)
+    after = memory_mb(df)
+    print(f"• Memory: {before:.2f} MB → {after:.2f} MB with the compact schema "
+          f"({before / after if after else 1:.1f}x smaller)")
+    return df
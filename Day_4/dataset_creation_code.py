@@ -1,46 +1,65 @@
+import os
+
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import random
 
-# Set random seed for reproducibility
-np.random.seed(42)
-random.seed(42)
+from carp_generator import CARP_SPECIES, N_TIMESTAMPS, generate_dataset_vectorized
+from compact_schema import memory_report, to_compact, to_legacy
+from threshold_rules import RULES
+from dataset_io import save_dataset, save_sidecars
+from farm_generator import FARM_DIR, generate_farm
+from instrumentation import configure, count, finish, stage
+
+# "loop" = original row-by-row generator, "vectorized" = NumPy engine in carp_generator.py,
+# "farm" = FARM_TANKS tanks generated in parallel shards straight to parquet (farm_generator.py)
+GENERATION_MODE = "loop"
+
+# Farm mode only: species mix, period and sampling interval (seed 42, one RNG stream per tank)
+FARM_TANKS = 1000
+FARM_SPECIES_MIX = {'Rohu': 0.4, 'Catla': 0.3, 'Mrigal': 0.3}
+FARM_PERIOD_DAYS = 62.5
+FARM_INTERVAL_MINUTES = 30
+FARM_WORKERS = os.cpu_count()
+
+# "excel" = Indian_Major_Carps_Dataset.xlsx, "parquet" = partitioned by Tank_ID (Date row groups),
+# "feather" = single Arrow file for fast local reloads,
+# "timeseries" = memory-mapped per-tank segments with rolling aggregates (see dataset_io.py)
+OUTPUT_FORMAT = "excel"
 
+# Compact schema (compact_schema.py): datetime64 Timestamp, float32 readings, int16 Tank_ID and
+# categorical species / labels in memory and in the parquet / feather / farm files
+COMPACT_SCHEMA = True
 
-def generate_indian_carp_dataset():
+# Run trace (instrumentation.py): None = off, "<name>.jsonl" = JSON lines, "<name>.json" = Chrome trace
+TRACE_FILE = None
+PROFILE_STAGE = None    # e.g. "generate": also capture that stage with cProfile -> <trace>.generate.prof
+
+
+def generate_indian_carp_dataset(mode=GENERATION_MODE, compact=COMPACT_SCHEMA, n_timestamps=N_TIMESTAMPS):
     """
     Generate comprehensive fish hatchery dataset for Indian Major Carps
     Based on specific requirements for Rohu, Catla, and Mrigal
-    6000 rows total: 2000 rows per tank
+    n_timestamps readings per tank (3 tanks; 3000 by default)
     """
 
-    # Indian Major Carps Optimal Thresholds
-    THRESHOLDS = {
-        'temperature': {'optimal': (26, 30), 'acceptable': (24, 32), 'critical': (22, 35)},
-        'dissolved_oxygen': {'optimal': (5, 8), 'acceptable': (4, 9), 'critical': (3, 12)},
-        'ph': {'optimal': (7.0, 8.5), 'acceptable': (6.5, 9.0), 'critical': (6.0, 9.5)},
-        'ammonia': {'optimal': (0, 0.1), 'acceptable': (0, 0.5), 'critical': (0, 1.0)},
-        'nitrate': {'optimal': (0, 10), 'acceptable': (0, 25), 'critical': (0, 40)},
-        'turbidity': {'optimal': (15, 40), 'acceptable': (10, 60), 'critical': (5, 80)},
-        'alkalinity': {'optimal': (80, 120), 'acceptable': (60, 150), 'critical': (40, 200)},
-        'hardness': {'optimal': (75, 150), 'acceptable': (50, 200), 'critical': (30, 250)}
-    }
-
-    # Carp species characteristics
-    CARP_SPECIES = {
-        1: 'Rohu',  # Surface and column feeder
-        2: 'Catla',  # Surface feeder
-        3: 'Mrigal'  # Bottom feeder
-    }
+    if mode == "vectorized":
+        # Same distributions and rules, drawn as arrays per tank (seed 42)
+        return generate_dataset_vectorized(n_timestamps=n_timestamps, compact=compact)
+
+    # Set random seed for reproducibility
+    np.random.seed(42)
+    random.seed(42)
 
     # Generate timestamps (every 2 minutes for comprehensive coverage)
     start_time = datetime(2025, 6, 1, 0, 0, 0)
     timestamps = []
-    for i in range(3000):
+    for i in range(n_timestamps):
         timestamps.append(start_time + timedelta(minutes=i * 30))
 
     dataset = []
+    raw_params = []
     entry_id = 1
 
     for timestamp in timestamps:
@@ -113,99 +132,9 @@ def generate_indian_carp_dataset():
             else:
                 tank_leakage = 0
 
-            # 2. Temperature Status
-            if THRESHOLDS['temperature']['optimal'][0] <= temperature <= THRESHOLDS['temperature']['optimal'][1]:
-                temp_status = "Optimal"
-            elif THRESHOLDS['temperature']['acceptable'][0] <= temperature <= THRESHOLDS['temperature']['acceptable'][
-                1]:
-                temp_status = "Acceptable"
-            else:
-                temp_status = "Critical"
-
-            # 3. Water Quality Index (based on multiple parameters)
-            quality_score = 0
-
-            # Temperature score
-            if THRESHOLDS['temperature']['optimal'][0] <= temperature <= THRESHOLDS['temperature']['optimal'][1]:
-                quality_score += 4
-            elif THRESHOLDS['temperature']['acceptable'][0] <= temperature <= THRESHOLDS['temperature']['acceptable'][
-                1]:
-                quality_score += 2
-
-            # DO score
-            if THRESHOLDS['dissolved_oxygen']['optimal'][0] <= dissolved_oxygen <= \
-                    THRESHOLDS['dissolved_oxygen']['optimal'][1]:
-                quality_score += 4
-            elif THRESHOLDS['dissolved_oxygen']['acceptable'][0] <= dissolved_oxygen <= \
-                    THRESHOLDS['dissolved_oxygen']['acceptable'][1]:
-                quality_score += 2
-
-            # pH score
-            if THRESHOLDS['ph']['optimal'][0] <= ph <= THRESHOLDS['ph']['optimal'][1]:
-                quality_score += 3
-            elif THRESHOLDS['ph']['acceptable'][0] <= ph <= THRESHOLDS['ph']['acceptable'][1]:
-                quality_score += 1
-
-            # Ammonia score
-            if ammonia <= THRESHOLDS['ammonia']['optimal'][1]:
-                quality_score += 3
-            elif ammonia <= THRESHOLDS['ammonia']['acceptable'][1]:
-                quality_score += 1
-
-            # Nitrate score
-            if nitrate <= THRESHOLDS['nitrate']['optimal'][1]:
-                quality_score += 2
-            elif nitrate <= THRESHOLDS['nitrate']['acceptable'][1]:
-                quality_score += 1
-
-            if quality_score >= 14:
-                water_quality = "Excellent"
-            elif quality_score >= 10:
-                water_quality = "Good"
-            elif quality_score >= 6:
-                water_quality = "Fair"
-            else:
-                water_quality = "Poor"
-
-            # 4. DO Status
-            if THRESHOLDS['dissolved_oxygen']['optimal'][0] <= dissolved_oxygen <= \
-                    THRESHOLDS['dissolved_oxygen']['optimal'][1]:
-                do_status = "Optimal"
-            elif THRESHOLDS['dissolved_oxygen']['acceptable'][0] <= dissolved_oxygen <= \
-                    THRESHOLDS['dissolved_oxygen']['acceptable'][1]:
-                do_status = "Acceptable"
-            else:
-                do_status = "Critical"
-
-            # 5. Growth Condition (based on overall parameters)
-            growth_factors = 0
-
-            if temp_status == "Optimal":
-                growth_factors += 3
-            elif temp_status == "Acceptable":
-                growth_factors += 1
-
-            if do_status == "Optimal":
-                growth_factors += 3
-            elif do_status == "Acceptable":
-                growth_factors += 1
-
-            if water_quality in ["Excellent", "Good"]:
-                growth_factors += 2
-            elif water_quality == "Fair":
-                growth_factors += 1
-
-            if THRESHOLDS['turbidity']['optimal'][0] <= turbidity <= THRESHOLDS['turbidity']['optimal'][1]:
-                growth_factors += 1
-
-            if growth_factors >= 8:
-                growth_condition = "Excellent"
-            elif growth_factors >= 6:
-                growth_condition = "Good"
-            elif growth_factors >= 4:
-                growth_condition = "Fair"
-            else:
-                growth_condition = "Poor"
+            # 2-5. Temperature / DO status, Water Quality Index and Growth Condition
+            # are labelled for all rows at once by threshold_rules (on unrounded values)
+            raw_params.append((temperature, dissolved_oxygen, ph, ammonia, nitrate, turbidity))
 
             # Round values
             temperature = round(temperature, 1)
@@ -221,7 +150,7 @@ def generate_indian_carp_dataset():
 
             # Create row
             row = {
-                'Timestamp': timestamp.strftime('%d-%m-%Y %H:%M'),
+                'Timestamp': timestamp if compact else timestamp.strftime('%d-%m-%Y %H:%M'),
                 'Entry_ID': entry_id,
                 'Tank_ID': tank_id,
                 'Carp_Species': species,
@@ -236,22 +165,17 @@ def generate_indian_carp_dataset():
                 'Soil_Moisture': soil_moisture,
                 'Water_Flow_Lmin': water_flow,
                 'Feeding_Frequency': feeding_freq,
-                'Tank_Leakage': tank_leakage,
-                'Temperature_Status': temp_status,
-                'Water_Quality_Index': water_quality,
-                'DO_Status': do_status,
-                'Growth_Condition': growth_condition
+                'Tank_Leakage': tank_leakage
             }
 
             dataset.append(row)
             entry_id += 1
 
-    return pd.DataFrame(dataset)
-
-
-# Generate the dataset
-print("Generating Indian Major Carps Dataset...")
-df = generate_indian_carp_dataset()
+    df = pd.DataFrame(dataset)
+    labels = RULES.label_block(raw_params)
+    for label in ['Temperature_Status', 'Water_Quality_Index', 'DO_Status', 'Growth_Condition']:
+        df[label] = labels[label]
+    return to_compact(df) if compact else df
 
 
 # Create separate sheets for thresholds and main data
@@ -311,41 +235,86 @@ def create_species_info():
     return pd.DataFrame(species_data)
 
 
-# Generate additional sheets
-threshold_df = create_threshold_sheet()
-species_df = create_species_info()
-
-# Display information
-print(f"\nDataset Shape: {df.shape}")
-print(f"Total Rows: {len(df)}")
-print("\nSpecies Distribution:")
-print(df['Carp_Species'].value_counts())
-
-print("\nClassification Distributions:")
-print("\n1. Tank Leakage:", df['Tank_Leakage'].value_counts().to_dict())
-print("2. Temperature Status:", df['Temperature_Status'].value_counts().to_dict())
-print("3. Water Quality Index:", df['Water_Quality_Index'].value_counts().to_dict())
-print("4. DO Status:", df['DO_Status'].value_counts().to_dict())
-print("5. Growth Condition:", df['Growth_Condition'].value_counts().to_dict())
-
-# Save to Excel with multiple sheets
-with pd.ExcelWriter('Indian_Major_Carps_Dataset.xlsx', engine='openpyxl') as writer:
-    df.to_excel(writer, sheet_name='Main_Dataset', index=False)
-    threshold_df.to_excel(writer, sheet_name='Parameter_Thresholds', index=False)
-    species_df.to_excel(writer, sheet_name='Species_Information', index=False)
-
-print("\n✅ Excel file saved as 'Indian_Major_Carps_Dataset.xlsx'")
-print("📊 Contains 3 sheets:")
-print("   - Main_Dataset: Complete 6000-row dataset")
-print("   - Parameter_Thresholds: Optimal ranges for each parameter")
-print("   - Species_Information: Details about each carp species")
-
-# Show sample data
-print("\n=== SAMPLE DATA ===")
-sample_data = df.head(9)  # 3 rows per species
-print(sample_data[['Timestamp', 'Tank_ID', 'Carp_Species', 'Temperature_C', 'Dissolved_Oxygen_mgL',
-                   'pH', 'Growth_Condition', 'Water_Quality_Index']].to_string(index=False))
-
-print("\n=== PARAMETER STATISTICS ===")
-numeric_cols = ['Temperature_C', 'Dissolved_Oxygen_mgL', 'pH', 'Ammonia_mgL', 'Nitrate_mgL', 'Turbidity_NTU']
-print(df[numeric_cols].describe())
\ No newline at end of file
+def main(mode=GENERATION_MODE, output_format=OUTPUT_FORMAT, farm_tanks=FARM_TANKS, compact=COMPACT_SCHEMA,
+         trace_file=TRACE_FILE, profile_stage=PROFILE_STAGE):
+    """
+    Generate the dataset in the chosen mode and save it with the threshold / species tables.
+    Returns the path to point read_main_dataset() at.
+    """
+    configure(trace_file, profile_stage)
+
+    # Generate the dataset (farm mode writes its shards below)
+    if mode != "farm":
+        print("Generating Indian Major Carps Dataset...")
+        stage("generate", mode=mode)
+        df = generate_indian_carp_dataset(mode, compact)
+        count("rows_generated", len(df))
+        if compact:
+            print("\n📦 Memory, original schema → compact schema:")
+            print(memory_report(to_legacy(df), df).to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+
+    # Generate additional sheets
+    stage("sidecar_tables")
+    threshold_df = create_threshold_sheet()
+    species_df = create_species_info()
+
+    if mode == "farm":
+        print(f"Generating a {farm_tanks}-tank farm with {FARM_WORKERS} workers...")
+        stage("generate", mode="farm")
+        shards = generate_farm(FARM_DIR, n_tanks=farm_tanks, species_mix=FARM_SPECIES_MIX,
+                               period_days=FARM_PERIOD_DAYS, interval_minutes=FARM_INTERVAL_MINUTES,
+                               n_workers=FARM_WORKERS, compact=compact)
+        count("rows_generated", int(shards['Rows'].sum()))
+        stage("save")
+        # Species notes without the 3-tank layout; each farm row carries its tank's species
+        save_sidecars(FARM_DIR, threshold_df, species_df.drop(columns='Tank_ID'))
+        output_path = FARM_DIR
+        print(f"\n✅ {shards['Rows'].sum()} rows in {len(shards)} shards saved under '{FARM_DIR}/main/'")
+        print(f"📊 Slowest shard: {shards['Seconds'].max():.2f} s "
+              f"({shards['Rows'].sum() / shards['Seconds'].sum():,.0f} rows/s per worker)")
+    else:
+        # Display information
+        print(f"\nDataset Shape: {df.shape}")
+        print(f"Total Rows: {len(df)}")
+        print("\nSpecies Distribution:")
+        print(df['Carp_Species'].value_counts())
+
+        print("\nClassification Distributions:")
+        print("\n1. Tank Leakage:", df['Tank_Leakage'].value_counts().to_dict())
+        print("2. Temperature Status:", df['Temperature_Status'].value_counts().to_dict())
+        print("3. Water Quality Index:", df['Water_Quality_Index'].value_counts().to_dict())
+        print("4. DO Status:", df['DO_Status'].value_counts().to_dict())
+        print("5. Growth Condition:", df['Growth_Condition'].value_counts().to_dict())
+
+        # Save main data + threshold / species tables in the configured layout
+        stage("save", fmt=output_format)
+        output_path = save_dataset(df, threshold_df, species_df, fmt=output_format)
+
+        if output_format == "excel":
+            print(f"\n✅ Excel file saved as '{output_path}'")
+            print("📊 Contains 3 sheets:")
+            print("   - Main_Dataset: Complete 6000-row dataset")
+            print("   - Parameter_Thresholds: Optimal ranges for each parameter")
+            print("   - Species_Information: Details about each carp species")
+        else:
+            print(f"\n✅ {output_format.capitalize()} dataset saved under '{output_path}/'")
+            print("📊 Contains:")
+            print("   - main: Complete dataset" + (" (partitioned by Tank_ID, time-ordered row groups)" if output_format == "parquet" else ""))
+            print("   - Parameter_Thresholds / Species_Information sidecar tables")
+
+        # Show sample data
+        print("\n=== SAMPLE DATA ===")
+        sample_data = to_legacy(df.head(9))  # 3 rows per species, shown with the original decimals
+        print(sample_data[['Timestamp', 'Tank_ID', 'Carp_Species', 'Temperature_C', 'Dissolved_Oxygen_mgL',
+                           'pH', 'Growth_Condition', 'Water_Quality_Index']].to_string(index=False))
+
+        print("\n=== PARAMETER STATISTICS ===")
+        numeric_cols = ['Temperature_C', 'Dissolved_Oxygen_mgL', 'pH', 'Ammonia_mgL', 'Nitrate_mgL', 'Turbidity_NTU']
+        print(to_legacy(df[numeric_cols]).describe())
+
+    finish()
+    return output_path
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""
+Columnar storage for the Indian Major Carps dataset.
+
+Layouts written by save_dataset():
+    excel   : <name>.xlsx with Main_Dataset / Parameter_Thresholds / Species_Information sheets
+    parquet : <name>/main/Tank_ID=<id>/part-*.parquet, time-ordered, with a Date column
+              <name>/Parameter_Thresholds.parquet, <name>/Species_Information.parquet
+    feather : <name>/main.feather (+ the same sidecar tables as .feather)
+    timeseries: <name>/ memory-mapped per-tank segments (timeseries_store.py)
+              (+ the same sidecar tables as .feather)
+
+Multi-tank farms from farm_generator.py are written shard by shard as
+<name>/main/part-<shard>.parquet (Date kept as a column) and read back the
+same way as the parquet layout.
+
+Frames in the compact schema (compact_schema.py) keep their dtypes in the
+parquet / feather layouts; the Excel workbook is always written with the
+original 'DD-MM-YYYY HH:MM' timestamps and text labels.
+
+Saving a layout removes the main-dataset files of the other layouts from the
+same directory (clear_other_layouts()), so changing OUTPUT_FORMAT never leaves
+stale data for read_main_dataset() to pick up.
+
+read_main_dataset() reads any of them with column projection, and for the
+columnar layouts pushes tank / date filters down to the partition and row-group
+level, so loading one tank or one week does not touch the rest of the data.
+Within a tank, rows are written in time order in row groups of ROW_GROUP_ROWS;
+a date filter skips every row group whose Date statistics are out of range.
+"""
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from compact_schema import to_legacy
+
+# -----------------------------
+# CONFIGURATION
+# -----------------------------
+DATASET_NAME = "Indian_Major_Carps_Dataset"
+MAIN_SHEET = "Main_Dataset"
+SIDECARS = ("Parameter_Thresholds", "Species_Information")
+TIMESTAMP_COL = "Timestamp"
+TIMESTAMP_FORMAT = "%d-%m-%Y %H:%M"
+TANK_COL = "Tank_ID"
+DATE_COL = "Date"
+PARTITION_COLS = [TANK_COL]
+ROW_GROUP_ROWS = 16_384         # ~ 11 months of one tank at 30-minute readings
+
+# Main-dataset files of each directory layout (relative to the dataset root)
+LAYOUT_FILES = {
+    "parquet": ("main",),
+    "feather": ("main.feather",),
+    "timeseries": ("store.json", "Tank_*"),
+}
+
+
+def _date_key(timestamps):
+    """
+    'DD-MM-YYYY HH:MM' strings -> 'YYYY-MM-DD' partition keys (string slicing, no parsing);
+    datetime64 timestamps (compact schema) are truncated to the day.
+    """
+    if pd.api.types.is_datetime64_any_dtype(timestamps):
+        days = timestamps.to_numpy(dtype="datetime64[ns]").astype("datetime64[D]")
+        return pd.Series(np.datetime_as_string(days), index=timestamps.index)
+    ts = timestamps.astype(str)
+    return ts.str[6:10] + "-" + ts.str[3:5] + "-" + ts.str[0:2]
+
+
+# -----------------------------
+# WRITE
+# -----------------------------
+def clear_other_layouts(root, fmt):
+    """Remove the main-dataset and sidecar files that a layout other than fmt left in root."""
+    root = Path(root)
+    for layout, patterns in LAYOUT_FILES.items():
+        if layout == fmt:
+            continue
+        for pattern in patterns:
+            for path in root.glob(pattern):
+                if path.is_dir():
+                    shutil.rmtree(path)
+                else:
+                    path.unlink()
+    # parquet keeps .parquet sidecars, feather / timeseries keep .feather ones
+    stale = ".feather" if fmt == "parquet" else ".parquet"
+    for sheet in SIDECARS:
+        (root / f"{sheet}{stale}").unlink(missing_ok=True)
+
+
+def write_parquet_dataset(chunks, root):
+    """
+    Write DataFrame chunks as a hive-partitioned Parquet dataset (one directory per Tank_ID).
+    Each tank's rows keep their time order, so the Date statistics of every row group
+    cover a narrow, increasing range that date filters can prune on.
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    main_dir = Path(root) / "main"
+    if main_dir.exists():
+        shutil.rmtree(main_dir)
+
+    if isinstance(chunks, pd.DataFrame):
+        chunks = [chunks]
+
+    rows = 0
+    for i, chunk in enumerate(chunks):
+        chunk = chunk.assign(**{DATE_COL: _date_key(chunk[TIMESTAMP_COL])})
+        ds.write_dataset(
+            pa.Table.from_pandas(chunk, preserve_index=False),
+            main_dir,
+            format="parquet",
+            partitioning=PARTITION_COLS,
+            partitioning_flavor="hive",
+            basename_template=f"part-{i}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+            min_rows_per_group=ROW_GROUP_ROWS,
+            max_rows_per_group=ROW_GROUP_ROWS,
+        )
+        rows += len(chunk)
+    return rows
+
+
+def write_feather(df, path):
+    """Single Arrow IPC (Feather v2) file for fast local reloads."""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    df.reset_index(drop=True).to_feather(path, compression="lz4")
+
+
+def write_timeseries_store(chunks, root):
+    """Append DataFrame chunks to a fresh per-tank time-series store at root."""
+    from timeseries_store import STORE_META, TimeSeriesStore
+
+    root = Path(root)
+    for old in root.glob("Tank_*"):
+        shutil.rmtree(old)
+    (root / STORE_META).unlink(missing_ok=True)
+    store = TimeSeriesStore(root)
+    if isinstance(chunks, pd.DataFrame):
+        chunks = [chunks]
+    rows = sum(store.append_frame(chunk, TIMESTAMP_COL, TANK_COL, TIMESTAMP_FORMAT) for chunk in chunks)
+    store.flush()
+    return rows
+
+
+def save_sidecars(root, threshold_df, species_df, fmt="parquet"):
+    """Parameter_Thresholds / Species_Information tables next to a parquet or feather main dataset."""
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    for sheet, table in zip(SIDECARS, (threshold_df, species_df)):
+        if fmt == "parquet":
+            table.to_parquet(root / f"{sheet}.parquet", index=False)
+        else:
+            write_feather(table, root / f"{sheet}.feather")
+
+
+def save_dataset(df, threshold_df, species_df, fmt="excel", name=DATASET_NAME):
+    """
+    Save the main dataset plus the threshold / species tables in the chosen layout.
+    df may also be an iterable of chunks for the parquet and timeseries layouts.
+    Returns the path that read_main_dataset() should be pointed at.
+    """
+    if fmt == "excel":
+        path = Path(f"{name}.xlsx")
+        with pd.ExcelWriter(path, engine='openpyxl') as writer:
+            # The workbook keeps the original 'DD-MM-YYYY HH:MM' / text layout
+            to_legacy(df).to_excel(writer, sheet_name=MAIN_SHEET, index=False)
+            for sheet, table in zip(SIDECARS, (threshold_df, species_df)):
+                table.to_excel(writer, sheet_name=sheet, index=False)
+        return path
+
+    if fmt not in LAYOUT_FILES:
+        raise ValueError(f"Unknown output format: {fmt}")
+    root = Path(name)
+    root.mkdir(parents=True, exist_ok=True)
+    clear_other_layouts(root, fmt)
+    if fmt == "parquet":
+        write_parquet_dataset(df, root)
+    elif fmt == "feather":
+        write_feather(df, root / "main.feather")
+    else:
+        write_timeseries_store(df, root)
+    save_sidecars(root, threshold_df, species_df, "parquet" if fmt == "parquet" else "feather")
+    return root
+
+
+# -----------------------------
+# READ
+# -----------------------------
+def _arrow_filter(ds, tank_ids, start, end, has_date):
+    expr = None
+
+    def _and(e):
+        return e if expr is None else expr & e
+
+    if tank_ids is not None:
+        expr = _and(ds.field(TANK_COL).isin(list(tank_ids)))
+    # Row-group (or, for older Date-partitioned datasets, partition) pruning on the
+    # Date key; exact timestamps are trimmed afterwards
+    if has_date and start is not None:
+        expr = _and(ds.field(DATE_COL) >= pd.Timestamp(start).strftime("%Y-%m-%d"))
+    if has_date and end is not None:
+        expr = _and(ds.field(DATE_COL) <= pd.Timestamp(end).strftime("%Y-%m-%d"))
+    return expr
+
+
+def _trim_time(df, start, end):
+    if start is None and end is None:
+        return df
+    ts = df[TIMESTAMP_COL]
+    if not pd.api.types.is_datetime64_any_dtype(ts):
+        ts = pd.to_datetime(ts, format=TIMESTAMP_FORMAT)
+    mask = pd.Series(True, index=df.index)
+    if start is not None:
+        mask &= ts >= pd.Timestamp(start)
+    if end is not None:
+        mask &= ts <= pd.Timestamp(end)
+    return df[mask]
+
+
+def read_main_dataset(source, columns=None, tank_ids=None, start=None, end=None):
+    """
+    Load the main dataset from an .xlsx file, a feather / parquet / timeseries layout
+    or a sensor CSV (any format known to sensor_schema.py, Timestamp as datetime64).
+
+    columns  : only these columns are read (Timestamp is added when a time window is given)
+    tank_ids : keep only these tanks
+    start/end: keep readings inside [start, end]
+    """
+    source = Path(source)
+    read_cols = None
+    if columns is not None:
+        read_cols = list(columns)
+        if (start is not None or end is not None) and TIMESTAMP_COL not in read_cols:
+            read_cols.append(TIMESTAMP_COL)
+
+    if source.suffix in (".xlsx", ".xls"):
+        df = pd.read_excel(source, sheet_name=MAIN_SHEET, usecols=read_cols)
+        if tank_ids is not None:
+            df = df[df[TANK_COL].isin(list(tank_ids))]
+    elif source.suffix == ".csv":
+        from sensor_schema import load_canonical
+
+        # Main_Dataset, Kaggle or ThingSpeak CSV, converted once and cached (sensor_schema.py)
+        df = load_canonical(source)
+        if tank_ids is not None:
+            df = df[df[TANK_COL].isin(list(tank_ids))]
+    elif (source / "store.json").exists():
+        from timeseries_store import TimeSeriesStore
+
+        # Time range is cut by binary search on each tank segment; Timestamp comes back as datetime64
+        df = TimeSeriesStore(source, readonly=True).read_frame(columns, tank_ids, start, end)
+        start = end = None
+    else:
+        import pyarrow.dataset as ds
+
+        if source.is_dir() and (source / "main.feather").exists():
+            source = source / "main.feather"
+        if source.suffix == ".feather":
+            dataset, partitioned = ds.dataset(source, format="feather"), False
+        else:
+            main_dir = source / "main" if (source / "main").is_dir() else source
+            dataset, partitioned = ds.dataset(main_dir, format="parquet", partitioning="hive"), True
+
+        expr = _arrow_filter(ds, tank_ids, start, end, DATE_COL in dataset.schema.names)
+        df = dataset.to_table(columns=read_cols, filter=expr).to_pandas()
+        if DATE_COL in df.columns and (columns is None or DATE_COL not in columns):
+            df = df.drop(columns=DATE_COL)
+        if TANK_COL in df.columns:
+            df[TANK_COL] = df[TANK_COL].astype("int64")
+        if columns is None and partitioned:
+            # Partition keys come back last; restore the written column and row order
+            written = [c["name"] for c in (dataset.schema.pandas_metadata or {}).get("columns", [])]
+            df = df[[c for c in written if c in df.columns]]
+            if "Entry_ID" in df.columns:
+                df = df.sort_values("Entry_ID", kind="stable")
+
+    df = _trim_time(df, start, end)
+    if columns is not None:
+        df = df[list(columns)]
+    return df.reset_index(drop=True)
+
+
+def read_sidecar(source, name):
+    """Parameter_Thresholds / Species_Information table for any layout."""
+    source = Path(source)
+    if source.suffix in (".xlsx", ".xls"):
+        return pd.read_excel(source, sheet_name=name)
+    if source.suffix == ".feather":
+        source = source.parent
+    if (source / f"{name}.feather").exists():
+        return pd.read_feather(source / f"{name}.feather")
+    return pd.read_parquet(source / f"{name}.parquet")
@@ -0,0 +1,200 @@
+"""
+Sharded, multi-core generator for synthetic farms of many tanks.
+
+Same parameter distributions, leakage and label rules as carp_generator.py,
+but for any number of tanks, a configurable species mix, period and sampling
+interval:
+
+    seed ─┬─ SeedSequence(seed)                  -> species of every tank (SPECIES_MIX)
+          └─ SeedSequence(seed, spawn_key=(id,)) -> all readings of tank <id>
+
+Every tank draws from its own stream, so a tank's readings depend only on the
+root seed, its ID and the period - not on how tanks are grouped into shards or
+how many worker processes run them. The output is bit-identical at any worker
+count.
+
+Tanks are split into shards of TANKS_PER_SHARD; each shard runs in a pool
+worker and writes straight to its own file, main/part-<shard>.parquet (one row
+group per tank, tank-major rows, plus the Date key column), so the parent
+process never holds the farm in memory. The directory is read back with
+dataset_io.read_main_dataset() like the partitioned parquet layout.
+
+compact=True writes the shards in the compact schema (compact_schema.py):
+timestamp, int16 Tank_ID, float32 readings and dictionary-encoded labels.
+"""
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from carp_generator import COLUMNS, SPECIES_BASELINES, _draw_tank
+from compact_schema import label_categorical, species_categorical, to_compact
+from dataset_io import DATE_COL, clear_other_layouts
+from forecast_engine import pool_context
+from threshold_rules import RULES
+
+# -----------------------------
+# CONFIGURATION
+# -----------------------------
+N_TANKS = 1000
+SPECIES_MIX = {'Rohu': 1 / 3, 'Catla': 1 / 3, 'Mrigal': 1 / 3}
+START_TIME = datetime(2025, 6, 1, 0, 0, 0)
+PERIOD_DAYS = 62.5                  # 3000 readings at the 30-minute interval, like the 3-tank dataset
+INTERVAL_MINUTES = 30
+SEED = 42
+TANKS_PER_SHARD = 50
+N_WORKERS = os.cpu_count()
+FARM_DIR = Path("Indian_Major_Carps_Farm")
+
+
+def assign_species(tank_ids, species_mix=SPECIES_MIX, seed=SEED):
+    """
+    Species per tank: exact shares of the mix (largest remainder), in an order
+    shuffled by the root seed. Computed once in the parent and passed to the shards.
+    """
+    names = list(species_mix)
+    weights = np.asarray([species_mix[s] for s in names], dtype=float)
+    if (weights < 0).any() or weights.sum() <= 0:
+        raise ValueError(f"Invalid species mix: {species_mix}")
+    unknown = set(names) - set(SPECIES_BASELINES)
+    if unknown:
+        raise ValueError(f"No baselines for species: {sorted(unknown)}")
+
+    n = len(tank_ids)
+    exact = weights / weights.sum() * n
+    counts = np.floor(exact).astype(int)
+    counts[np.argsort(-(exact - counts), kind="stable")[:n - counts.sum()]] += 1
+    species = np.repeat(np.asarray(names, dtype=object), counts)
+    np.random.default_rng(np.random.SeedSequence(seed)).shuffle(species)
+    return dict(zip(tank_ids, species))
+
+
+def tank_rng(seed, tank_id):
+    """Independent stream of one tank (child <tank_id> of the root SeedSequence)."""
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(int(tank_id),)))
+
+
+def n_readings(period_days=PERIOD_DAYS, interval_minutes=INTERVAL_MINUTES):
+    return int(round(period_days * 24 * 60 / interval_minutes))
+
+
+# -----------------------------
+# ONE SHARD (runs in a worker)
+# -----------------------------
+def _tank_frame(tank_id, position, species, stamps, dates, n_tanks, seed, compact=False):
+    n = len(stamps)
+    d = _draw_tank(tank_rng(seed, tank_id), species, n)
+    labels = RULES.label_arrays(
+        as_codes=compact,
+        temperature=d['temperature'], dissolved_oxygen=d['dissolved_oxygen'], ph=d['ph'],
+        ammonia=d['ammonia'], nitrate=d['nitrate'], turbidity=d['turbidity']
+    )
+    if compact:
+        labels = {label: label_categorical(label, codes) for label, codes in labels.items()}
+        species = species_categorical([species]).take(np.zeros(n, dtype=np.intp))
+    else:
+        species = np.full(n, species, dtype=object)
+    frame = pd.DataFrame({
+        'Timestamp': stamps,
+        # Timestamp-major numbering across the whole farm, as in the 3-tank dataset
+        'Entry_ID': np.arange(n, dtype=np.int64) * n_tanks + position + 1,
+        'Tank_ID': np.full(n, tank_id, dtype=np.int64),
+        'Carp_Species': species,
+        'Temperature_C': np.round(d['temperature'], 1),
+        'Dissolved_Oxygen_mgL': np.round(d['dissolved_oxygen'], 1),
+        'pH': np.round(d['ph'], 1),
+        'Ammonia_mgL': np.round(d['ammonia'], 3),
+        'Nitrate_mgL': np.round(d['nitrate'], 1),
+        'Turbidity_NTU': np.round(d['turbidity'], 1),
+        'Alkalinity_mgL': np.round(d['alkalinity'], 1),
+        'Hardness_mgL': np.round(d['hardness'], 1),
+        'Soil_Moisture': d['soil_moisture'].astype(np.int64),
+        'Water_Flow_Lmin': np.round(d['water_flow'], 1),
+        'Feeding_Frequency': d['feeding_freq'].astype(np.int64),
+        'Tank_Leakage': d['tank_leakage'].astype(np.int64),
+        'Temperature_Status': labels['Temperature_Status'],
+        'Water_Quality_Index': labels['Water_Quality_Index'],
+        'DO_Status': labels['DO_Status'],
+        'Growth_Condition': labels['Growth_Condition'],
+        DATE_COL: dates,
+    }, columns=COLUMNS + [DATE_COL])
+    return to_compact(frame) if compact else frame
+
+
+def generate_shard(shard, tanks, n_tanks, main_dir, seed=SEED, start_time=START_TIME,
+                   n_timestamps=None, interval_minutes=INTERVAL_MINUTES, compact=False):
+    """
+    tanks: [(tank_id, position in the farm, species)]. Writes main_dir/part-<shard>.parquet.
+    Returns (shard, rows, seconds).
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    start = time.perf_counter()
+    n_timestamps = n_timestamps if n_timestamps is not None else n_readings()
+    times = pd.DatetimeIndex(np.datetime64(start_time, 'm')
+                             + np.arange(n_timestamps) * np.timedelta64(interval_minutes, 'm'))
+    stamps = times.to_numpy(dtype="datetime64[ns]") if compact else times.strftime('%d-%m-%Y %H:%M').to_numpy()
+    dates = times.strftime('%Y-%m-%d').to_numpy()
+
+    rows = 0
+    path = Path(main_dir) / f"part-{shard:05d}.parquet"
+    tmp = path.with_suffix(".tmp")
+    writer = None
+    try:
+        for tank_id, position, species in tanks:
+            table = pa.Table.from_pandas(
+                _tank_frame(tank_id, position, species, stamps, dates, n_tanks, seed, compact), preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(tmp, table.schema, compression="snappy")
+            writer.write_table(table)
+            rows += table.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+    tmp.replace(path)       # a shard file is either complete or absent
+    return shard, rows, time.perf_counter() - start
+
+
+# -----------------------------
+# WHOLE FARM
+# -----------------------------
+def generate_farm(root=FARM_DIR, n_tanks=N_TANKS, species_mix=SPECIES_MIX, start_time=START_TIME,
+                  period_days=PERIOD_DAYS, interval_minutes=INTERVAL_MINUTES, seed=SEED,
+                  tanks_per_shard=TANKS_PER_SHARD, n_workers=N_WORKERS, tank_ids=None, compact=False):
+    """
+    Generate tanks 1..n_tanks (or the given tank_ids) into root/main/part-*.parquet.
+    Returns a DataFrame with one row per shard (tanks, rows, seconds).
+    """
+    tank_ids = list(tank_ids) if tank_ids is not None else list(range(1, n_tanks + 1))
+    species = assign_species(tank_ids, species_mix, seed)
+    n_timestamps = n_readings(period_days, interval_minutes)
+
+    main_dir = Path(root) / "main"
+    if main_dir.exists():
+        shutil.rmtree(main_dir)
+    main_dir.mkdir(parents=True)
+    clear_other_layouts(root, "parquet")
+
+    tanks = [(t, i, species[t]) for i, t in enumerate(tank_ids)]
+    shards = [tanks[i:i + tanks_per_shard] for i in range(0, len(tanks), tanks_per_shard)]
+    kwargs = dict(n_tanks=len(tank_ids), main_dir=main_dir, seed=seed, start_time=start_time,
+                  n_timestamps=n_timestamps, interval_minutes=interval_minutes, compact=compact)
+
+    n_workers = n_workers or os.cpu_count() or 1
+    ctx = pool_context() if n_workers > 1 and len(shards) > 1 else None
+    if ctx is None:
+        done = [generate_shard(i, shard, **kwargs) for i, shard in enumerate(shards)]
+    else:
+        with ProcessPoolExecutor(max_workers=min(n_workers, len(shards)), mp_context=ctx) as pool:
+            futures = [pool.submit(generate_shard, i, shard, **kwargs) for i, shard in enumerate(shards)]
+            done = [f.result() for f in as_completed(futures)]
+
+    summary = pd.DataFrame(done, columns=["Shard", "Rows", "Seconds"]).sort_values("Shard", ignore_index=True)
+    summary.insert(1, "Tanks", [len(shards[i]) for i in summary["Shard"]])
+    return summary
@@ -0,0 +1,200 @@
+"""
+Per-tank lag / delta / rolling features for the classifier.
+
+For every channel in FEATURE_CHANNELS and every window in WINDOWS - counted in
+readings, not time, and named by that count ("3r" = the current reading and
+the 2 before it, whatever their spacing):
+
+    <channel>_lag1, <channel>_delta1                 previous reading, change since it
+    <channel>_{mean,std,min,max}_<window>            over the window (current reading included)
+    <channel>_slope_<window>                         least-squares trend, units per hour
+
+Training: build_features() gathers the window of every reading of every tank
+at once (rows sorted by tank and time, window indices clipped at the tank's
+first reading) and computes all features with vectorized NumPy, in bounded
+row chunks.
+
+Serving: OnlineFeatures keeps a ring buffer of the last readings per tank and
+computes the features of each new reading from it. Both paths build the same
+window arrays (NaN where a tank has fewer readings than the window) and pass
+them through the same _window_features() kernel, so a reading gets bit-for-bit
+the same features online as in training. (pandas' rolling() keeps running
+sums whose rounding depends on the whole history, which a ring buffer cannot
+reproduce exactly.) Readings enter both paths rounded to float32, the
+precision of the compact schema, so a model trained on float32 columns sees
+the same features for a float64 reading at serving time.
+"""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+FEATURE_CHANNELS = ("Soil_Moisture", "Dissolved_Oxygen_mgL", "Turbidity_NTU")
+WINDOWS = {"3r": 3, "12r": 12}     # name -> readings; artifacts keep their own map (OnlineFeatures.config())
+STATS = ("mean", "std", "min", "max", "slope")
+TIMESTAMP_COL = "Timestamp"
+TANK_COL = "Tank_ID"
+TIMESTAMP_FORMAT = "%d-%m-%Y %H:%M"
+CHUNK_ROWS = 200_000
+NS_PER_HOUR = 3_600_000_000_000
+VALUE_DTYPE = np.float32        # precision readings are rounded to (compact_schema.py) before the float64 math
+
+
+def feature_names(channels=FEATURE_CHANNELS, windows=WINDOWS):
+    names = []
+    for c in channels:
+        names += [f"{c}_lag1", f"{c}_delta1"]
+        for w in windows:
+            names += [f"{c}_{stat}_{w}" for stat in STATS]
+    return names
+
+
+def _history_length(windows):
+    return max(max(windows.values()), 2)
+
+
+def _window_features(hours, values, windows):
+    """
+    hours : (n, L) time of each slot relative to the current reading, in hours (last slot = 0)
+    values: (n, L, n_channels) readings in the same slots, oldest first; NaN = no reading
+    -> (n, n_features) in feature_names() order
+    """
+    # (n, n_channels, L), contiguous: every reduction runs along the last axis, in the
+    # same order whatever n is
+    x_all = np.ascontiguousarray(values.transpose(0, 2, 1))
+    current = x_all[:, :, -1]
+    lag = np.where(np.isnan(x_all[:, :, -2]), current, x_all[:, :, -2])
+    per_channel = [lag, current - lag]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for w in windows.values():
+            x = x_all[:, :, -w:]
+            t = np.broadcast_to(hours[:, None, -w:], x.shape)
+            present = ~np.isnan(x)
+            count = present.sum(axis=2)
+            mean = np.where(present, x, 0.0).sum(axis=2) / count
+            t_mean = np.where(present, t, 0.0).sum(axis=2) / count
+            xc = np.where(present, x - mean[:, :, None], 0.0)
+            tc = np.where(present, t - t_mean[:, :, None], 0.0)
+            den = (tc * tc).sum(axis=2)
+            slope = np.where(den > 0, (tc * xc).sum(axis=2) / np.where(den > 0, den, 1.0), 0.0)
+            per_channel += [mean, np.sqrt((xc * xc).sum(axis=2) / count),
+                            np.where(present, x, np.inf).min(axis=2), np.where(present, x, -np.inf).max(axis=2), slope]
+    # Stack to (n, n_channels, n_per_channel) -> channel-major columns
+    return np.stack(per_channel, axis=2).reshape(len(x_all), -1)
+
+
+def _as_ns(timestamps, timestamp_format=TIMESTAMP_FORMAT):
+    ts = pd.Series(timestamps)
+    if not pd.api.types.is_datetime64_any_dtype(ts):
+        ts = pd.to_datetime(ts, format=timestamp_format)
+    return ts.to_numpy(dtype="datetime64[ns]").view(np.int64)
+
+
+# -----------------------------
+# TRAINING (vectorized over all tanks)
+# -----------------------------
+def build_features(df, channels=FEATURE_CHANNELS, windows=WINDOWS, timestamp_col=TIMESTAMP_COL,
+                   tank_col=TANK_COL, timestamp_format=TIMESTAMP_FORMAT, chunk_rows=CHUNK_ROWS):
+    """Feature frame aligned with df.index (any row order; each tank is ordered by time here)."""
+    ts = _as_ns(df[timestamp_col].to_numpy(), timestamp_format)
+    tanks = df[tank_col].to_numpy()
+    order = np.lexsort((ts, tanks))
+    ts, tanks = ts[order], tanks[order]
+    vals = df[list(channels)].to_numpy(dtype=VALUE_DTYPE).astype(np.float64)[order]
+
+    n = len(df)
+    L = _history_length(windows)
+    # First row of each row's tank, to stop windows at the tank boundary
+    first = np.r_[True, tanks[1:] != tanks[:-1]] if n else np.zeros(0, dtype=bool)
+    tank_start = np.maximum.accumulate(np.where(first, np.arange(n), 0)) if n else np.zeros(0, dtype=np.int64)
+
+    feats = np.empty((n, len(feature_names(channels, windows))))
+    offsets = np.arange(L) - (L - 1)
+    for lo in range(0, n, chunk_rows):
+        rows = np.arange(lo, min(lo + chunk_rows, n))
+        idx = rows[:, None] + offsets
+        valid = idx >= tank_start[rows][:, None]
+        idx = np.where(valid, idx, 0)
+        hours = np.where(valid, (ts[idx] - ts[rows][:, None]) / NS_PER_HOUR, np.nan)
+        window = np.where(valid[:, :, None], vals[idx], np.nan)
+        feats[rows] = _window_features(hours, window, windows)
+
+    out = np.empty_like(feats)
+    out[order] = feats
+    return pd.DataFrame(out, index=df.index, columns=feature_names(channels, windows))
+
+
+# -----------------------------
+# SERVING (incremental, per-tank ring buffers)
+# -----------------------------
+class OnlineFeatures:
+    """Last readings per tank in fixed-size ring buffers; update() returns the new reading's features."""
+
+    def __init__(self, channels=FEATURE_CHANNELS, windows=WINDOWS):
+        self.channels = list(channels)
+        self.windows = dict(windows)
+        self.names = feature_names(self.channels, self.windows)
+        self.length = _history_length(self.windows)
+        self._buffers = {}      # tank_id -> [times (L,), values (L, n_channels), readings seen]
+
+    def config(self):
+        """Constructor arguments; windows maps each name to its length in readings."""
+        return {"channels": self.channels, "windows": self.windows}
+
+    def update(self, tank_id, timestamp, values):
+        """values: one reading per channel (NaN = not reported). Returns (n_features,)."""
+        ts = pd.Timestamp(parse_reading_time(timestamp) if isinstance(timestamp, str) else timestamp).value
+        buf = self._buffers.get(tank_id)
+        if buf is None:
+            buf = self._buffers[tank_id] = [np.zeros(self.length, dtype=np.int64),
+                                            np.full((self.length, len(self.channels)), np.nan), 0]
+        times, ring, seen = buf
+        if seen and ts < times[(seen - 1) % self.length]:
+            raise ValueError(f"Tank {tank_id}: readings must arrive in time order")
+        times[seen % self.length] = ts
+        ring[seen % self.length] = np.asarray(values, dtype=VALUE_DTYPE)
+        seen += 1
+        buf[2] = seen
+
+        # Oldest -> newest, padded with NaN like a tank's first readings in training
+        k = min(seen, self.length)
+        slots = (np.arange(seen - k, seen) % self.length)
+        hours = np.full((1, self.length), np.nan)
+        window = np.full((1, self.length, len(self.channels)), np.nan)
+        hours[0, self.length - k:] = (times[slots] - ts) / NS_PER_HOUR
+        window[0, self.length - k:] = ring[slots]
+        return _window_features(hours, window, self.windows)[0]
+
+    def update_dict(self, tank_id, timestamp, values):
+        return dict(zip(self.names, self.update(tank_id, timestamp, values)))
+
+    def update_batch(self, readings):
+        """
+        [(tank_id, timestamp, values), ...] in order -> list of feature dicts.
+        All or nothing: if any reading fails (e.g. out of time order), every tank's
+        history is restored to what it was before the call.
+        """
+        saved = {}
+        for tank_id, _, _ in readings:
+            if tank_id not in saved:
+                buf = self._buffers.get(tank_id)
+                saved[tank_id] = None if buf is None else [buf[0].copy(), buf[1].copy(), buf[2]]
+        try:
+            return [self.update_dict(*reading) for reading in readings]
+        except Exception:
+            for tank_id, buf in saved.items():
+                if buf is None:
+                    self._buffers.pop(tank_id, None)
+                else:
+                    self._buffers[tank_id] = buf
+            raise
+
+
+def parse_reading_time(value, timestamp_format=TIMESTAMP_FORMAT):
+    """Reading timestamp given as 'DD-MM-YYYY HH:MM' (dataset format) or ISO 8601."""
+    if isinstance(value, str):
+        try:
+            return datetime.strptime(value, timestamp_format)
+        except ValueError:
+            return datetime.fromisoformat(value)
+    return pd.Timestamp(value).to_pydatetime()
@@ -0,0 +1,259 @@
+"""
+Rolling-origin backtesting and per-series model selection for the forecaster.
+
+For every (tank, feature) series, N_FOLDS forecast origins are placed
+FOLD_STEP readings apart, the last one HORIZON readings before the end:
+
+    history ............................. | origin 3 | +HORIZON
+    history ...................... | origin 2 | +HORIZON
+    history ............... | origin 1 | +HORIZON
+
+Every candidate in CANDIDATES is fitted on the history before an origin
+(expanding window, capped at MAX_TRAIN readings when set) and forecasts the
+next HORIZON readings. The (series, fold) jobs are independent and run in a
+process pool; each job fits all candidates, so their fit times are measured
+side by side in the same worker.
+
+Reports: MAE / RMSE per feature, model and horizon step, and per model the
+mean fit time. select_models() then picks, for each (tank, feature), the
+cheapest candidate (lowest mean fit time) whose RMSE is within TOLERANCE of
+the best candidate's RMSE; a candidate that failed in any fold is not
+eligible. The selection is saved as JSON and read back by the forecaster's
+"selected" engine (ML_future_trend_prediction_code.py), so production runs
+fit the fastest model that is still good enough for each series.
+"""
+import json
+import os
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from batched_forecaster import METHODS, fit_ar1_diff, fit_holt, fit_series, model_fit_from_params
+from forecast_engine import fit_series_jobs, pool_context
+from instrumentation import count, record_span
+
+# -----------------------------
+# CONFIGURATION
+# -----------------------------
+HORIZON = 10            # readings ahead (the forecaster's FORECAST_STEPS)
+N_FOLDS = 3
+FOLD_STEP = 48          # readings between origins (one day at the 30-minute interval)
+MIN_TRAIN = 100         # folds with less history than this are dropped
+MAX_TRAIN = None        # e.g. 1000: fit on the last 1000 readings only (rolling window)
+TOLERANCE = 0.05        # accept up to 5% higher RMSE than the best candidate
+SELECTION_FILE = Path("model_selection.json")
+
+
+@dataclass(frozen=True)
+class ModelSpec:
+    engine: str             # "arima" or a batched_forecaster method ("holt", "ar1_diff")
+    order: tuple = None     # ARIMA (p, d, q)
+
+    @property
+    def label(self):
+        return f"ARIMA({','.join(map(str, self.order))})" if self.engine == "arima" else f"batched {self.engine}"
+
+    def to_dict(self):
+        return {"engine": self.engine, "order": list(self.order) if self.order is not None else None}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d["engine"], tuple(d["order"]) if d.get("order") is not None else None)
+
+
+CANDIDATES = (
+    ModelSpec("arima", (1, 1, 1)),      # the forecaster's fixed default
+    ModelSpec("arima", (0, 1, 1)),
+    ModelSpec("arima", (1, 1, 0)),
+    ModelSpec("arima", (1, 0, 0)),
+    ModelSpec("arima", (1, 0, 1)),
+    ModelSpec("holt"),
+    ModelSpec("ar1_diff"),
+)
+
+
+# -----------------------------
+# ONE FIT
+# -----------------------------
+def fit_forecast(spec, values, steps):
+    """Fit spec on a 1-D history and return its next `steps` values as an ndarray."""
+    if spec.engine == "arima":
+        from statsmodels.tsa.arima.model import ARIMA
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            return np.asarray(ARIMA(values, order=spec.order).fit().forecast(steps), dtype=float)
+    if spec.engine not in METHODS:
+        raise ValueError(f"Unknown model engine: {spec.engine}")
+    params = (fit_ar1_diff if spec.engine == "ar1_diff" else fit_holt)(values[None, :])
+    return model_fit_from_params(spec.engine, params, 0).forecast(steps).to_numpy()
+
+
+# -----------------------------
+# ONE (SERIES, FOLD) JOB (runs in a worker)
+# -----------------------------
+def evaluate_fold(tank_id, feature, values, origin, horizon=HORIZON, candidates=CANDIDATES, max_train=MAX_TRAIN):
+    """
+    Fit every candidate on values[:origin] and score it on values[origin:origin + horizon].
+    Never raises: a failing candidate is reported with its error message.
+    Returns (rows, (started, seconds, pid)); one row per candidate.
+    """
+    started, t0 = time.time(), time.perf_counter()
+    train = values[max(0, origin - max_train) if max_train else 0:origin]
+    actual = values[origin:origin + horizon]
+    rows = []
+    for spec in candidates:
+        fit_start = time.perf_counter()
+        try:
+            errors, error = fit_forecast(spec, train, len(actual)) - actual, None
+        except Exception as e:
+            errors, error = np.full(len(actual), np.nan), str(e)
+        rows.append({"Tank_ID": tank_id, "Feature": feature, "Origin": origin, "Model": spec.label,
+                     "Fit_Seconds": time.perf_counter() - fit_start, "Errors": errors, "Error": error})
+    return rows, (started, time.perf_counter() - t0, os.getpid())
+
+
+def fold_origins(n, horizon=HORIZON, n_folds=N_FOLDS, fold_step=FOLD_STEP, min_train=MIN_TRAIN):
+    """Forecast origins of a series of n readings, oldest first."""
+    origins = [n - horizon - k * fold_step for k in range(n_folds)]
+    return sorted(o for o in origins if o >= min_train)
+
+
+# -----------------------------
+# WHOLE BACKTEST
+# -----------------------------
+def backtest(jobs, candidates=CANDIDATES, horizon=HORIZON, n_folds=N_FOLDS, fold_step=FOLD_STEP,
+             min_train=MIN_TRAIN, max_train=MAX_TRAIN, n_workers=None):
+    """
+    jobs: list of (tank_id, feature, series) as for forecast_engine.fit_series_jobs.
+    Returns (fits, errors):
+        fits   one row per (tank, feature, fold, model): Fold, Origin, Fit_Seconds, Error
+        errors one row per (tank, feature, fold, model, horizon step): Forecast_Error (forecast - actual)
+    """
+    fold_jobs = []
+    for tank_id, feature, series in jobs:
+        values = series.to_numpy(dtype=float)
+        fold_jobs += [(tank_id, feature, values, origin)
+                      for origin in fold_origins(len(values), horizon, n_folds, fold_step, min_train)]
+
+    n_workers = n_workers or os.cpu_count() or 1
+    ctx = pool_context() if n_workers > 1 and len(fold_jobs) > 1 else None
+    if ctx is None:
+        done = [evaluate_fold(*job, horizon, candidates, max_train) for job in fold_jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=min(n_workers, len(fold_jobs)), mp_context=ctx) as pool:
+            futures = [pool.submit(evaluate_fold, *job, horizon, candidates, max_train) for job in fold_jobs]
+            done = [f.result() for f in as_completed(futures)]
+
+    rows = []
+    for fold_rows, (started, seconds, pid) in done:
+        record_span("backtest_fold", started, seconds, pid=pid, tank_id=fold_rows[0]["Tank_ID"],
+                    feature=fold_rows[0]["Feature"], origin=fold_rows[0]["Origin"])
+        rows += fold_rows
+    count("backtest_fits", len(rows))
+
+    fits = pd.DataFrame(rows, columns=["Tank_ID", "Feature", "Origin", "Model", "Fit_Seconds", "Errors", "Error"])
+    fits = fits.sort_values(["Tank_ID", "Feature", "Origin", "Model"], ignore_index=True, kind="stable")
+    fits.insert(2, "Fold", fits.groupby(["Tank_ID", "Feature", "Model"]).cumcount())
+
+    errors = fits[["Tank_ID", "Feature", "Fold", "Model", "Errors"]].explode("Errors", ignore_index=True)
+    errors.insert(4, "Horizon", errors.groupby(["Tank_ID", "Feature", "Fold", "Model"]).cumcount() + 1)
+    errors = errors.rename(columns={"Errors": "Forecast_Error"}).astype({"Forecast_Error": float})
+    return fits.drop(columns="Errors"), errors
+
+
+# -----------------------------
+# REPORTS
+# -----------------------------
+def _mae_rmse(errors, by):
+    err = errors.assign(Abs=errors["Forecast_Error"].abs(), Sq=errors["Forecast_Error"] ** 2)
+    out = err.groupby(by, sort=False).agg(MAE=("Abs", "mean"), Sq=("Sq", "mean")).reset_index()
+    out["RMSE"] = np.sqrt(out.pop("Sq"))
+    return out
+
+
+def horizon_report(errors):
+    """MAE / RMSE per feature, model and horizon step (over all tanks and folds)."""
+    return _mae_rmse(errors.dropna(subset=["Forecast_Error"]), ["Feature", "Model", "Horizon"])
+
+
+def model_report(fits, errors):
+    """Per feature and model: MAE / RMSE over all horizons, mean fit seconds and failed fits."""
+    acc = _mae_rmse(errors.dropna(subset=["Forecast_Error"]), ["Feature", "Model"])
+    cost = fits.groupby(["Feature", "Model"], sort=False).agg(
+        Fit_Seconds=("Fit_Seconds", "mean"), Failed=("Error", lambda e: int(e.notna().sum()))).reset_index()
+    return acc.merge(cost, on=["Feature", "Model"], how="right")
+
+
+def select_models(fits, errors, candidates=CANDIDATES, tolerance=TOLERANCE):
+    """
+    Cheapest candidate per (tank, feature) whose RMSE is within tolerance of the best one.
+    Returns one row per series: Model, RMSE, Fit_Seconds, Best_Model, Best_RMSE, Best_Fit_Seconds.
+    """
+    keys = ["Tank_ID", "Feature", "Model"]
+    failed = fits.groupby(keys)["Error"].apply(lambda e: e.notna().any()).rename("Failed").reset_index()
+    scores = _mae_rmse(errors, keys).merge(
+        fits.groupby(keys)["Fit_Seconds"].mean().reset_index(), on=keys).merge(failed, on=keys)
+    scores = scores[~scores["Failed"]]
+
+    rows = []
+    for (tank_id, feature), group in scores.groupby(["Tank_ID", "Feature"], sort=True):
+        best = group.loc[group["RMSE"].idxmin()]
+        eligible = group[group["RMSE"] <= best["RMSE"] * (1 + tolerance)]
+        pick = eligible.loc[eligible["Fit_Seconds"].idxmin()]
+        rows.append({"Tank_ID": tank_id, "Feature": feature, "Model": pick["Model"], "RMSE": pick["RMSE"],
+                     "Fit_Seconds": pick["Fit_Seconds"], "Best_Model": best["Model"], "Best_RMSE": best["RMSE"],
+                     "Best_Fit_Seconds": best["Fit_Seconds"]})
+    return pd.DataFrame(rows, columns=["Tank_ID", "Feature", "Model", "RMSE", "Fit_Seconds", "Best_Model",
+                                       "Best_RMSE", "Best_Fit_Seconds"])
+
+
+# -----------------------------
+# SELECTION FILE
+# -----------------------------
+def save_selection(selection, path=SELECTION_FILE, candidates=CANDIDATES):
+    """{"<tank>|<feature>": ModelSpec dict} for every selected series."""
+    by_label = {spec.label: spec for spec in candidates}
+    data = {f"{row.Tank_ID}|{row.Feature}": by_label[row.Model].to_dict() for row in selection.itertuples()}
+    Path(path).write_text(json.dumps(data, indent=2))
+    return path
+
+
+def load_selection(path=SELECTION_FILE):
+    """(tank_id, feature) -> ModelSpec; tank ids come back as int. Empty when there is no file."""
+    path = Path(path)
+    if not path.exists():
+        return {}
+    selection = {}
+    for key, spec in json.loads(path.read_text()).items():
+        tank_id, feature = key.split("|", 1)
+        selection[(int(tank_id), feature)] = ModelSpec.from_dict(spec)
+    return selection
+
+
+# -----------------------------
+# PRODUCTION FITS
+# -----------------------------
+def fit_selected(jobs, selection, forecast_steps, n_workers=None, store=None, default=CANDIDATES[0]):
+    """
+    Fit every (tank_id, feature, series) job with its selected ModelSpec (default when the
+    series has none). ARIMA jobs run through forecast_engine.fit_series_jobs (process pool,
+    ModelStore per order); batched methods are fitted in-process. Results are in job order.
+    """
+    specs = [selection.get((t, f), default) for t, f, _ in jobs]
+    results = [None] * len(jobs)
+
+    arima = [i for i, spec in enumerate(specs) if spec.engine == "arima"]
+    fitted = fit_series_jobs([jobs[i] for i in arima], forecast_steps, n_workers=n_workers,
+                             orders=[specs[i].order for i in arima], store=store) if arima else []
+    for i, res in zip(arima, fitted):
+        results[i] = res
+    for i, spec in enumerate(specs):
+        if spec.engine != "arima":
+            results[i] = fit_series(*jobs[i], spec.engine, forecast_steps)
+    return results
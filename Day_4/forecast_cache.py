@@ -0,0 +1,74 @@
+"""
+Single-pass multi-horizon forecast cache for predict_at.
+
+For every model the forecast path is computed once, out to the largest horizon
+requested so far, and every later query is answered by indexing into it.
+Queries can be a single timestamp or a whole vector of timestamps. A cached
+path is dropped when the model for its key is replaced (refit) or evicted.
+"""
+import numpy as np
+import pandas as pd
+from pandas.tseries.frequencies import to_offset
+
+DEFAULT_FREQ = "30T"
+
+
+def series_step(series):
+    """Sampling interval of a series as a Timedelta."""
+    freq = pd.infer_freq(series.index[:10]) or DEFAULT_FREQ
+    return pd.Timedelta(to_offset(freq))
+
+
+class ForecastCache:
+    """Forecast paths keyed by (tank_id, feature) – or by model identity when no key is given."""
+
+    def __init__(self):
+        self._paths = {}
+
+    def __len__(self):
+        return len(self._paths)
+
+    def evict(self, key=None):
+        """Drop one cached path, or all of them."""
+        if key is None:
+            self._paths.clear()
+        else:
+            self._paths.pop(key, None)
+
+    def forecast_path(self, key, model_fit, steps):
+        """First `steps` forecast values for model_fit, computed at most once per horizon."""
+        entry = self._paths.get(key)
+        if entry is not None and entry["model"] is not model_fit:
+            # Model was refit / replaced since the path was computed
+            entry = None
+        if entry is None or len(entry["values"]) < steps:
+            values = np.asarray(model_fit.forecast(steps=steps), dtype=float)
+            entry = {"model": model_fit, "values": values}
+            self._paths[key] = entry
+        return entry["values"][:steps]
+
+    def predict_at(self, series, model_fit, ts_points, key=None):
+        """
+        Value of the series at each timestamp: the last observation at or before it
+        for past timestamps, the cached forecast for future ones.
+        Returns a scalar for a scalar timestamp and an ndarray for a vector.
+        """
+        scalar = np.ndim(ts_points) == 0
+        ts = pd.DatetimeIndex([ts_points] if scalar else ts_points)
+        key = key if key is not None else id(model_fit)
+
+        last_time = series.index[-1]
+        out = np.full(len(ts), np.nan)
+
+        past = ts <= last_time
+        if past.any():
+            # Past timestamp – get closest available data
+            out[past] = series.asof(ts[past]).to_numpy(dtype=float)
+
+        future = ~past
+        if future.any():
+            delta_steps = np.ceil(((ts[future] - last_time) / series_step(series)).to_numpy()).astype(int)
+            path = self.forecast_path(key, model_fit, int(delta_steps.max()))
+            out[future] = path[delta_steps - 1]
+
+        return out[0] if scalar else out
@@ -0,0 +1,140 @@
+"""
+Per-(tank, feature) ARIMA fitting, serial or spread across a process pool.
+
+Every (tank, feature) series is an independent, CPU-bound job. fit_series_jobs()
+runs them in a ProcessPoolExecutor and returns one ForecastJobResult per job in
+submission order; a failing job is reported in its result instead of stopping
+the batch. With a ModelStore, jobs whose stored model still matches the
+history only append the new readings instead of refitting.
+"""
+import multiprocessing
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from instrumentation import count, record_span
+
+ARIMA_ORDER = (1, 1, 1)
+DEFAULT_FREQ = "30T"
+
+
+@dataclass
+class ForecastJobResult:
+    tank_id: object
+    feature: str
+    series: pd.Series
+    model_fit: object = None
+    forecast: pd.Series = None
+    forecast_index: pd.DatetimeIndex = None
+    mode: str = "fit"        # "fit" (full estimation), "append" (new readings only), "cached"
+    error: str = None
+    details: str = field(default=None, repr=False)
+    started: float = field(default=None, repr=False)     # epoch seconds, in the worker
+    seconds: float = None
+    pid: int = field(default=None, repr=False)
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+def fit_arima_job(tank_id, feature, series, forecast_steps, order=ARIMA_ORDER, previous=None):
+    """
+    Fit one ARIMA model and forecast forecast_steps ahead. Never raises.
+    previous = (model_fit, n_obs): reuse that model and only append series[n_obs:]
+    to its state, keeping the estimated parameters.
+    The result carries its wall time and worker pid for the run trace.
+    """
+    started, t0 = time.time(), time.perf_counter()
+    result = _fit_arima_job(tank_id, feature, series, forecast_steps, order, previous)
+    result.started, result.seconds, result.pid = started, time.perf_counter() - t0, os.getpid()
+    return result
+
+
+def _fit_arima_job(tank_id, feature, series, forecast_steps, order, previous):
+    try:
+        if previous is not None:
+            model_fit, n_obs = previous
+            new_obs = series.iloc[n_obs:]
+            mode = "cached"
+            if len(new_obs):
+                model_fit = model_fit.append(new_obs, refit=False)
+                mode = "append"
+        else:
+            # Imported here so pool workers only pay for statsmodels when they fit
+            from statsmodels.tsa.arima.model import ARIMA
+
+            model_fit = ARIMA(series, order=order).fit()
+            mode = "fit"
+
+        inferred_freq = pd.infer_freq(series.index[:20]) or DEFAULT_FREQ
+        forecast = model_fit.forecast(steps=forecast_steps)
+        forecast_index = pd.date_range(start=series.index[-1], periods=forecast_steps + 1,
+                                       freq=inferred_freq)[1:]
+        return ForecastJobResult(tank_id, feature, series, model_fit, forecast, forecast_index, mode)
+    except Exception as e:
+        return ForecastJobResult(tank_id, feature, series, error=str(e),
+                                 details=traceback.format_exc())
+
+
+def pool_context():
+    """
+    'fork' where available (workers start with the parent's imports); elsewhere the
+    platform default ('spawn'), which is safe now that the scripts only run under
+    their __main__ guard and workers just import the modules they need.
+    """
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context()
+
+
+def fit_series_jobs(jobs, forecast_steps, n_workers=1, order=ARIMA_ORDER, store=None, orders=None):
+    """
+    jobs: list of (tank_id, feature, series).
+    store: optional ModelStore; stored models are reused / extended and new ones saved.
+    orders: optional ARIMA order per job (e.g. picked by forecast_backtest.py), else order for all.
+    Returns a list of ForecastJobResult in the same order as jobs.
+    """
+    orders = list(orders) if orders is not None else [order] * len(jobs)
+    previous = [store.lookup(t, f, o, s) if store is not None else None for (t, f, s), o in zip(jobs, orders)]
+
+    n_workers = n_workers or os.cpu_count() or 1
+    ctx = pool_context() if n_workers > 1 else None
+
+    if ctx is None or len(jobs) <= 1:
+        results = [fit_arima_job(t, f, s, forecast_steps, o, prev)
+                   for (t, f, s), o, prev in zip(jobs, orders, previous)]
+    else:
+        results = [None] * len(jobs)
+        with ProcessPoolExecutor(max_workers=min(n_workers, len(jobs)), mp_context=ctx) as pool:
+            futures = {
+                pool.submit(fit_arima_job, t, f, s, forecast_steps, orders[i], previous[i]): i
+                for i, (t, f, s) in enumerate(jobs)
+            }
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    results[i] = future.result()
+                except Exception as e:
+                    # Worker crashed (e.g. killed / unpicklable result)
+                    tank_id, feature, series = jobs[i]
+                    results[i] = ForecastJobResult(tank_id, feature, series, error=f"worker failed: {e}")
+
+    # One span per (tank, feature) fit, timed in whichever process ran it
+    for res in results:
+        if res.seconds is not None:
+            record_span("arima_fit", res.started, res.seconds, pid=res.pid, tank_id=res.tank_id,
+                        feature=res.feature, mode=res.mode, ok=res.ok)
+        count("fits_failed" if not res.ok else f"fits_{res.mode}")
+
+    if store is not None:
+        for res, o in zip(results, orders):
+            if res.ok and res.mode != "cached":
+                store.save(res.tank_id, res.feature, o, res.series, res.model_fit,
+                           full_fit=res.mode == "fit")
+        store.flush()
+    return results
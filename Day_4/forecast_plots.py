@@ -0,0 +1,109 @@
+"""
+Deferred, parallel rendering of the forecast plots.
+
+Plotting runs as its own stage after all models are fitted: every
+(tank, feature) plot is described by a small PlotJob, rendered with the
+headless Agg backend across a process pool, and skipped when the observed and
+forecast data behind the PNG are unchanged since the last run (digests are kept
+in OUTPUT_DIR/.plot_digests.json).
+"""
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from forecast_engine import pool_context
+
+DIGEST_FILE = ".plot_digests.json"
+
+
+@dataclass
+class PlotJob:
+    tank_id: object
+    feature: str
+    title: str
+    observed_index: np.ndarray
+    observed_values: np.ndarray
+    forecast_index: np.ndarray
+    forecast_values: np.ndarray
+
+    @property
+    def filename(self):
+        return f"{self.feature}_Tank{self.tank_id}.png".replace(" ", "")
+
+    def digest(self):
+        h = hashlib.sha1(self.title.encode())
+        for arr in (self.observed_index, self.observed_values, self.forecast_index, self.forecast_values):
+            h.update(np.ascontiguousarray(arr).tobytes())
+        return h.hexdigest()
+
+
+def plot_job_from_result(res, model_label):
+    """PlotJob for a successful forecast_engine.ForecastJobResult."""
+    return PlotJob(
+        res.tank_id, res.feature, f"{res.feature} – Tank {res.tank_id} ({model_label})",
+        res.series.index.to_numpy(), res.series.to_numpy(dtype=float),
+        np.asarray(res.forecast_index), np.asarray(res.forecast, dtype=float),
+    )
+
+
+def render_plot(job, output_dir):
+    """Render one PNG with the headless backend (safe inside pool workers). None on failure."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    try:
+        _draw(plt, job, output_dir)
+    except Exception as e:
+        print(f"❌ Plot failed for {job.feature} in tank {job.tank_id}: {e}")
+        plt.close("all")
+        return None
+    return job.filename
+
+
+def _draw(plt, job, output_dir):
+    plt.figure(figsize=(10, 5))
+    plt.plot(job.observed_index, job.observed_values, label="Observed")
+    plt.plot(job.forecast_index, job.forecast_values, "r--o", label="Forecast")
+    plt.title(job.title)
+    plt.xlabel("Timestamp")
+    plt.ylabel(job.feature)
+    plt.grid(True)
+    plt.legend()
+    plt.tight_layout()
+    plt.savefig(Path(output_dir) / job.filename)
+    plt.close()
+
+
+def render_plots(jobs, output_dir, n_workers=1):
+    """Render every changed plot; returns (rendered filenames, number skipped as unchanged)."""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(exist_ok=True)
+    digest_path = output_dir / DIGEST_FILE
+    digests = json.loads(digest_path.read_text()) if digest_path.exists() else {}
+
+    todo = []
+    for job in jobs:
+        digest = job.digest()
+        if digests.get(job.filename) == digest and (output_dir / job.filename).exists():
+            continue
+        todo.append((job, digest))
+
+    n_workers = n_workers or os.cpu_count() or 1
+    ctx = pool_context() if n_workers > 1 and len(todo) > 1 else None
+    if ctx is None:
+        rendered = [render_plot(job, output_dir) for job, _ in todo]
+    else:
+        with ProcessPoolExecutor(max_workers=min(n_workers, len(todo)), mp_context=ctx) as pool:
+            rendered = list(pool.map(render_plot, [job for job, _ in todo], [output_dir] * len(todo)))
+
+    for (job, digest), filename in zip(todo, rendered):
+        if filename is not None:
+            digests[job.filename] = digest
+    digest_path.write_text(json.dumps(digests, indent=2))
+    return [f for f in rendered if f is not None], len(jobs) - len(todo)
@@ -0,0 +1,89 @@
+"""
+Resolution-aware forecasting for long horizons.
+
+A tank series is resampled to hourly and daily means and one model is fitted
+per resolution. Each query goes to the finest resolution whose horizon limit
+covers it ("Now + 30 min" -> raw 30-minute model, "Next month" -> daily model;
+the daily model has no limit), so a month-ahead query costs ~30 daily steps
+instead of ~1,500 raw steps.
+The raw model is fitted on its recent history only (see RESOLUTIONS).
+"""
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from forecast_cache import ForecastCache
+
+ARIMA_ORDER = (1, 1, 1)
+MIN_POINTS = 20
+
+# name, resample rule (None = raw), longest horizon it answers, history used to fit it
+RESOLUTIONS = [
+    ("raw", None, pd.Timedelta(hours=6), pd.Timedelta(days=7)),
+    ("hourly", "1h", pd.Timedelta(days=3), pd.Timedelta(days=60)),
+    ("daily", "1D", None, None),
+]
+
+
+def _fit_arima(series, order):
+    from statsmodels.tsa.arima.model import ARIMA
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return ARIMA(series, order=order).fit()
+
+
+class HierarchicalForecaster:
+    """One model per resolution for a single (tank, feature) series."""
+
+    def __init__(self, series, order=ARIMA_ORDER, resolutions=RESOLUTIONS):
+        self.series = series.sort_index()
+        self.order = order
+        self.resolutions = resolutions
+        self.levels = {}    # name -> (resampled series, model_fit, max_horizon)
+        self.cache = ForecastCache()
+
+    def fit(self):
+        last_time = self.series.index[-1]
+        for name, rule, max_horizon, history in self.resolutions:
+            level = self.series
+            if history is not None:
+                level = level[level.index > last_time - history]
+            if rule is not None:
+                level = level.resample(rule).mean().dropna()
+            if len(level) < MIN_POINTS:
+                continue
+            self.levels[name] = (level, _fit_arima(level, self.order), max_horizon)
+        if not self.levels:
+            raise ValueError("series too short for any resolution")
+        return self
+
+    def resolution_for(self, horizon):
+        """Finest fitted resolution whose horizon limit covers `horizon` (else the coarsest fitted one)."""
+        fitted = [name for name, *_ in self.resolutions if name in self.levels]
+        for name in fitted:
+            max_horizon = self.levels[name][2]
+            if max_horizon is None or horizon <= max_horizon:
+                return name
+        return fitted[-1]
+
+    def predict_at(self, ts_points):
+        """Scalar or vector of timestamps -> forecast values, each from its resolution."""
+        scalar = np.ndim(ts_points) == 0
+        ts = pd.DatetimeIndex([ts_points] if scalar else ts_points)
+        last_time = self.series.index[-1]
+        out = np.full(len(ts), np.nan)
+
+        past = ts <= last_time
+        if past.any():
+            out[past] = self.series.asof(ts[past]).to_numpy(dtype=float)
+
+        chosen = np.array([self.resolution_for(t - last_time) if not p else "" for t, p in zip(ts, past)])
+        for name in set(chosen) - {""}:
+            level, model_fit, _ = self.levels[name]
+            mask = chosen == name
+            # Coarse levels end at their own last bucket, so steps are counted from there
+            out[mask] = self.cache.predict_at(level, model_fit, ts[mask], key=name)
+
+        return out[0] if scalar else out
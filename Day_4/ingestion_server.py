@@ -0,0 +1,340 @@
+"""
+Local, self-hosted ThingSpeak-compatible ingestion server.
+
+Speaks the same write interface as api.thingspeak.com, so the ESP32 firmware
+(DAY_2/sketch.ino) only needs its `server` URL pointed here:
+
+    GET|POST /update?api_key=KEY&field1=..&field4=..[&created_at=ISO-8601]
+                                   -> entry_id as text ("0" = rejected)
+    POST /channels/<id>/bulk_update.json   (also /bulk_update.json)
+        {"write_api_key": KEY, "updates": [{"created_at": .., "field1": ..}, ...]}
+        an update may instead give "delta_t" = seconds after the previous update
+        of the batch (the first one is relative to the request time), and may
+        carry its own "api_key" so one gateway can forward many devices
+                                   -> {"success": true, "entries": n}
+    GET /metrics, GET /health
+
+Every write key is one channel. Readings are appended to
+INGEST_DIR/<key>.csv in the layout of a ThingSpeak CSV export
+(created_at, entry_id, then the FIELD_NAMES columns), like
+Day_3/datasets/sensed_data.csv, so the files feed straight into the rest of the
+pipeline. Files are never rewritten; lines are buffered and flushed every
+FLUSH_INTERVAL_S (and on shutdown). Field values are stored as the shortest
+repr of the parsed float, never as the client's text; non-finite values are
+rejected. A last line torn by a crash during a flush is cut off when the
+channel is next opened.
+
+Connections are HTTP/1.1 keep-alive and may pipeline requests; there is no
+per-device rate limit unless MIN_UPDATE_INTERVAL_S is set (ThingSpeak's free
+tier uses 15 s, useful when testing firmware against this stand-in).
+
+Run:  python ingestion_server.py
+"""
+import asyncio
+import json
+import math
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from urllib.parse import parse_qsl, urlsplit
+
+import pandas as pd
+
+HOST = "0.0.0.0"
+PORT = 8080
+INGEST_DIR = Path("ingest_store")
+FLUSH_INTERVAL_S = 0.5
+MIN_UPDATE_INTERVAL_S = 0       # 15 = emulate the ThingSpeak free-tier limit
+MAX_BULK_UPDATES = 960          # ThingSpeak's bulk_update limit per request
+
+# field1..field4 as sent by DAY_2/sketch.ino, named as in the ThingSpeak CSV export
+FIELD_NAMES = ("Temperature", "Humidity", "Soil Moisture", "Turbity percentage")
+CSV_HEADER = ",".join(("created_at", "entry_id") + FIELD_NAMES) + "\n"
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S UTC"
+
+API_KEY_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               429: "Too Many Requests"}
+
+
+class IngestError(ValueError):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+# -----------------------------
+# APPEND-ONLY STORE
+# -----------------------------
+class ChannelLog:
+    """One channel's CSV file: next entry_id, pending lines, last write time."""
+
+    def __init__(self, path):
+        self.path = path
+        self.pending = []
+        self.last_update = None
+        self.next_entry_id = self._last_entry_id() + 1
+
+    def _last_entry_id(self):
+        """entry_id of the last complete line; a torn last line (crash mid-flush) is truncated."""
+        if not self.path.exists():
+            return 0
+        with open(self.path, "r+b") as f:
+            end = f.seek(0, 2)
+            block = 4096
+            while True:
+                start = max(0, end - block)
+                f.seek(start)
+                lines = f.read(end - start).split(b"\n")
+                torn = lines.pop()          # after the last newline: b"" unless the line is torn
+                if not lines and start > 0:
+                    block *= 4              # no newline in this block yet
+                    continue
+                if torn:
+                    end -= len(torn)
+                    f.truncate(end)
+                    print(f"⚠  {self.path.name}: dropped a torn last line ({len(torn)} bytes)")
+                    continue
+                # The first line of a partial block may start mid-line
+                for line in reversed(lines if start == 0 else lines[1:]):
+                    entry_id = _entry_id(line)
+                    if entry_id is not None:
+                        return entry_id
+                if start == 0:
+                    return 0
+                block *= 4
+
+    def append(self, created_at, values):
+        entry_id = self.next_entry_id
+        self.next_entry_id += 1
+        self.pending.append(f"{created_at.strftime(TIMESTAMP_FORMAT)},{entry_id},{','.join(values)}\n")
+        return entry_id
+
+    def flush(self):
+        if not self.pending:
+            return 0
+        new_file = not self.path.exists() or self.path.stat().st_size == 0
+        with open(self.path, "a", newline="") as f:
+            if new_file:
+                f.write(CSV_HEADER)
+            f.writelines(self.pending)
+        n, self.pending = len(self.pending), []
+        return n
+
+
+def _entry_id(line):
+    try:
+        return int(line.split(b",")[1])
+    except (IndexError, ValueError):
+        return None
+
+
+class AppendOnlyStore:
+    def __init__(self, root=INGEST_DIR, min_interval_s=MIN_UPDATE_INTERVAL_S):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.min_interval_s = min_interval_s
+        self.channels = {}
+
+    def channel(self, api_key):
+        if not api_key or not API_KEY_PATTERN.match(api_key):
+            raise IngestError("missing or invalid api_key")
+        log = self.channels.get(api_key)
+        if log is None:
+            log = self.channels[api_key] = ChannelLog(self.root / f"{api_key}.csv")
+        return log
+
+    def append(self, api_key, values, created_at=None, rate_limited=True):
+        """values: from field_values(). Returns the new entry_id."""
+        log = self.channel(api_key)
+        now = time.monotonic()
+        if (rate_limited and self.min_interval_s and log.last_update is not None
+                and now - log.last_update < self.min_interval_s):
+            raise IngestError("update rate limit", status=429)
+
+        entry_id = log.append(created_at or datetime.now(timezone.utc), values)
+        log.last_update = now
+        return entry_id
+
+    def flush(self):
+        return sum(log.flush() for log in self.channels.values())
+
+
+def field_values(fields):
+    """{"field1": "25.7", ...} -> normalized value strings in FIELD_NAMES order ("" = not sent)."""
+    values = []
+    for i in range(1, len(FIELD_NAMES) + 1):
+        value = str(fields.get(f"field{i}", "")).strip()
+        if value:
+            number = float(value)       # ValueError -> rejected like a malformed update
+            if not math.isfinite(number):
+                raise IngestError(f"field{i} is not a finite number")
+            # Written as Python's shortest repr, not the client's text ("2_5", "+1E1", ...)
+            value = repr(number)
+        values.append(value)
+    if not any(values):
+        raise IngestError("no field values")
+    return values
+
+
+def parse_created_at(value):
+    """ISO-8601 (or 'YYYY-MM-DD HH:MM:SS[ UTC]') -> aware UTC datetime."""
+    value = str(value).strip().removesuffix(" UTC").replace("Z", "+00:00")
+    ts = datetime.fromisoformat(value)
+    return ts.replace(tzinfo=timezone.utc) if ts.tzinfo is None else ts.astimezone(timezone.utc)
+
+
+def read_channel(api_key, root=INGEST_DIR):
+    """A channel's readings as a DataFrame, in the ThingSpeak CSV export layout."""
+    return pd.read_csv(Path(root) / f"{api_key}.csv")
+
+
+# -----------------------------
+# HTTP
+# -----------------------------
+class IngestionServer:
+    def __init__(self, store, flush_interval_s=FLUSH_INTERVAL_S):
+        self.store = store
+        self.flush_interval_s = flush_interval_s
+        self.stats = {"requests": 0, "entries": 0, "rejected": 0, "flushed": 0}
+        self.started = time.time()
+
+    def update(self, params):
+        created_at = parse_created_at(params["created_at"]) if params.get("created_at") else None
+        return self.store.append(params.get("api_key"), field_values(params), created_at)
+
+    def bulk_update(self, payload):
+        if not isinstance(payload, dict) or not isinstance(payload.get("updates"), list):
+            raise IngestError("expected {'write_api_key': .., 'updates': [..]}")
+        updates = payload["updates"]
+        if len(updates) > MAX_BULK_UPDATES:
+            raise IngestError(f"at most {MAX_BULK_UPDATES} updates per request")
+
+        # Validate everything first so a bad batch writes nothing
+        base = datetime.now(timezone.utc)
+        rows = []
+        for update in updates:
+            api_key = update.get("api_key", payload.get("write_api_key"))
+            self.store.channel(api_key)
+            if update.get("created_at"):
+                created_at = parse_created_at(update["created_at"])
+            else:
+                created_at = base + timedelta(seconds=float(update.get("delta_t", 0)))
+            base = created_at
+            rows.append((api_key, field_values(update), created_at))
+        for api_key, values, created_at in rows:
+            self.store.append(api_key, values, created_at, rate_limited=False)
+        return len(rows)
+
+    async def route(self, method, target, body):
+        parts = urlsplit(target)
+        path = parts.path
+        if path == "/update":
+            if method not in ("GET", "POST"):
+                return 405, "0"
+            self.stats["requests"] += 1
+            params = dict(parse_qsl(parts.query))
+            try:
+                if method == "POST" and body:
+                    params.update(parse_qsl(body.decode()))     # not UTF-8 -> UnicodeDecodeError (a ValueError)
+                entry_id = self.update(params)
+            except (IngestError, ValueError) as e:
+                self.stats["rejected"] += 1
+                return getattr(e, "status", 400), "0"
+            self.stats["entries"] += 1
+            return 200, str(entry_id)
+        if path == "/bulk_update.json" or (path.startswith("/channels/") and path.endswith("/bulk_update.json")):
+            if method != "POST":
+                return 405, {"success": False, "error": "use POST"}
+            self.stats["requests"] += 1
+            try:
+                n = self.bulk_update(json.loads(body or b"null"))
+            except (IngestError, ValueError, TypeError, AttributeError) as e:
+                self.stats["rejected"] += 1
+                return getattr(e, "status", 400), {"success": False, "error": str(e)}
+            self.stats["entries"] += n
+            return 200, {"success": True, "entries": n}
+        if path == "/metrics":
+            uptime = time.time() - self.started
+            return 200, {**self.stats, "channels": len(self.store.channels),
+                         "entries_per_s": self.stats["entries"] / max(uptime, 1e-9), "uptime_s": uptime}
+        if path == "/health":
+            return 200, {"status": "ok", "store": str(self.store.root)}
+        return 404, {"error": f"unknown path {path}"}
+
+    async def handle_connection(self, reader, writer):
+        """HTTP/1.1 keep-alive; pipelined requests are answered in order."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                headers = {}
+                try:
+                    method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                    while True:
+                        line = await reader.readline()
+                        if line in (b"\r\n", b"\n", b""):
+                            break
+                        name, _, value = line.decode("latin-1").partition(":")
+                        headers[name.strip().lower()] = value.strip()
+                    length = int(headers.get("content-length", 0))
+                    if length < 0:
+                        raise ValueError("negative Content-Length")
+                except ValueError:
+                    # Malformed request line or Content-Length: the stream cannot be
+                    # re-synchronized, so answer like a rejected update and close
+                    self.stats["rejected"] += 1
+                    await self._respond(writer, 400, "0")
+                    break
+                body = await reader.readexactly(length)
+
+                status, payload = await self.route(method.upper(), target, body)
+                await self._respond(writer, status, payload)
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer, status, payload):
+        if isinstance(payload, str):
+            data, content_type = payload.encode(), "text/plain"
+        else:
+            data, content_type = json.dumps(payload).encode(), "application/json"
+        writer.write(
+            f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+            f"Content-Type: {content_type}\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data
+        )
+        await writer.drain()
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval_s)
+            self.stats["flushed"] += self.store.flush()
+
+    async def serve(self, host=HOST, port=PORT):
+        flusher = asyncio.create_task(self._flush_loop())
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"📡 ThingSpeak-compatible ingestion on http://{host}:{port}/update -> '{self.store.root}'")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            flusher.cancel()
+            self.store.flush()
+
+
+def run(host=HOST, port=PORT, root=INGEST_DIR, min_interval_s=MIN_UPDATE_INTERVAL_S):
+    server = IngestionServer(AppendOnlyStore(root, min_interval_s))
+    try:
+        asyncio.run(server.serve(host, port))
+    except KeyboardInterrupt:
+        print("\n👋 Ingestion server stopped")
+
+
+if __name__ == "__main__":
+    run()
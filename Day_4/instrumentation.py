@@ -0,0 +1,238 @@
+"""
+Lightweight run instrumentation: timed spans, counters and peak memory.
+
+    configure("run_trace.jsonl")          # or "run_trace.json" for a Chrome trace
+    stage("load")                         # linear scripts: each stage() ends the previous one
+    ...
+    with span("fit", tank_id=1):          # nested / per-item spans
+        ...
+    count("rows_loaded", len(df))
+    record_span("fit", started, seconds, pid=worker_pid)   # span timed in another process
+
+Nothing is recorded until configure() is called, so the hooks cost one
+attribute check when tracing is off. A background thread samples the process
+RSS every SAMPLE_INTERVAL_S; each span reports the peak seen while it was open,
+and the samples become an "rss_mb" counter track in the Chrome trace.
+
+Output (written by finish(), or at interpreter exit):
+    *.jsonl   one JSON object per span / counter
+    *.json    Chrome trace event format (open in chrome://tracing or Perfetto)
+
+profile_stage="<name>" runs that stage / span under cProfile and writes
+<trace file stem>.<name>.prof next to the trace (inspect with pstats or snakeviz).
+"""
+import atexit
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows: RSS comes from /proc only, which is not there either
+    resource = None
+
+SAMPLE_INTERVAL_S = 0.05
+
+
+def current_rss_mb():
+    """Resident set size now (Linux), else the peak so far; None where neither is available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+    except (OSError, ValueError, AttributeError):
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+
+class Tracer:
+    def __init__(self, path, profile_stage=None, sample_interval_s=SAMPLE_INTERVAL_S):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.profile_stage = profile_stage
+        self.sample_interval_s = sample_interval_s
+        self.pid = os.getpid()
+        self.spans = []
+        self.counters = {}
+        self.samples = []           # (time, rss_mb)
+        self._stage = None
+        self._profiler = None
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample_loop, name="rss-sampler", daemon=True)
+        self._sampler.start()
+        self.finished = False
+
+    # -- memory --
+    def _sample_loop(self):
+        while not self._stop.is_set():
+            rss = current_rss_mb()
+            if rss is not None:
+                self.samples.append((time.time(), rss))
+            self._stop.wait(self.sample_interval_s)
+
+    def _peak_between(self, start, end):
+        peak = current_rss_mb()
+        for t, rss in reversed(self.samples):
+            if t < start:
+                break
+            if t <= end:
+                peak = rss if peak is None else max(peak, rss)
+        return peak
+
+    # -- spans --
+    def record_span(self, name, started, seconds, pid=None, peak_rss_mb=None, **attrs):
+        self.spans.append({"name": name, "start": started, "seconds": seconds, "pid": pid or self.pid,
+                           "tid": threading.get_ident(), "peak_rss_mb": peak_rss_mb, **attrs})
+
+    def _begin(self, name):
+        if name == self.profile_stage and self._profiler is None:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        return time.time(), time.perf_counter()
+
+    def _end(self, name, begun, attrs):
+        started, t0 = begun
+        seconds = time.perf_counter() - t0
+        if name == self.profile_stage and self._profiler is not None:
+            self._profiler.disable()
+            self._profiler.dump_stats(self.path.with_suffix(f".{name}.prof"))
+            self._profiler = None
+        self.record_span(name, started, seconds, peak_rss_mb=self._peak_between(started, started + seconds),
+                         **attrs)
+
+    @contextmanager
+    def span(self, name, **attrs):
+        begun = self._begin(name)
+        try:
+            yield
+        finally:
+            self._end(name, begun, attrs)
+
+    def stage(self, name, **attrs):
+        """End the open stage (if any) and start the next one."""
+        self.end_stage()
+        self._stage = (name, self._begin(name), attrs)
+
+    def end_stage(self):
+        if self._stage is not None:
+            name, begun, attrs = self._stage
+            self._stage = None
+            self._end(name, begun, {"kind": "stage", **attrs})
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    # -- output --
+    def _events(self):
+        for s in self.spans:
+            yield {"type": "span", **s}
+        for name, value in self.counters.items():
+            yield {"type": "counter", "name": name, "value": value}
+
+    def _chrome_trace(self):
+        events = []
+        for s in self.spans:
+            args = {k: v for k, v in s.items() if k not in ("name", "start", "seconds", "pid", "tid")}
+            events.append({"name": s["name"], "ph": "X", "ts": s["start"] * 1e6, "dur": s["seconds"] * 1e6,
+                           "pid": s["pid"], "tid": s["tid"] if s["pid"] == self.pid else 0,
+                           "args": {k: v for k, v in args.items() if v is not None}})
+        for t, rss in self.samples:
+            events.append({"name": "rss_mb", "ph": "C", "ts": t * 1e6, "pid": self.pid, "args": {"rss_mb": rss}})
+        end = max([s["start"] + s["seconds"] for s in self.spans] + [t for t, _ in self.samples] + [time.time()])
+        for name, value in self.counters.items():
+            events.append({"name": name, "ph": "C", "ts": end * 1e6, "pid": self.pid, "args": {name: value}})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def finish(self):
+        """Close the open stage, stop sampling and write the trace file. Returns its path."""
+        if self.finished:
+            return self.path
+        self.finished = True
+        self.end_stage()
+        self._stop.set()
+        self._sampler.join()
+        if self.path.suffix == ".jsonl":
+            with open(self.path, "w") as f:
+                for event in self._events():
+                    f.write(json.dumps(event, default=str) + "\n")
+        else:
+            self.path.write_text(json.dumps(self._chrome_trace(), default=str))
+        return self.path
+
+    def summary(self):
+        """Stage / span totals as (name, calls, seconds, peak_rss_mb) rows, slowest first."""
+        totals = {}
+        for s in self.spans:
+            calls, seconds, peak = totals.get(s["name"], (0, 0.0, None))
+            rss = s.get("peak_rss_mb")
+            peak = rss if peak is None else max(peak, rss or 0)
+            totals[s["name"]] = (calls + 1, seconds + s["seconds"], peak)
+        return sorted(((n, *v) for n, v in totals.items()), key=lambda r: -r[2])
+
+
+# -----------------------------
+# MODULE-LEVEL HOOKS (no-ops until configure())
+# -----------------------------
+_tracer = None
+
+
+def configure(path, profile_stage=None, sample_interval_s=SAMPLE_INTERVAL_S):
+    """Start recording to path (.jsonl = JSON lines, otherwise Chrome trace). None = stay off."""
+    global _tracer
+    if path is None:
+        return None
+    if _tracer is not None:
+        _tracer.finish()
+    _tracer = Tracer(path, profile_stage, sample_interval_s)
+    atexit.register(_tracer.finish)
+    return _tracer
+
+
+def tracer():
+    return _tracer
+
+
+@contextmanager
+def span(name, **attrs):
+    if _tracer is None:
+        yield
+        return
+    with _tracer.span(name, **attrs):
+        yield
+
+
+def stage(name, **attrs):
+    if _tracer is not None:
+        _tracer.stage(name, **attrs)
+
+
+def count(name, value=1):
+    if _tracer is not None:
+        _tracer.count(name, value)
+
+
+def record_span(name, started, seconds, pid=None, **attrs):
+    if _tracer is not None:
+        _tracer.record_span(name, started, seconds, pid=pid, **attrs)
+
+
+def finish(print_summary=True):
+    """Write the trace (if tracing) and print the per-stage totals."""
+    if _tracer is None:
+        return None
+    path = _tracer.finish()
+    if print_summary:
+        print(f"\n⏱  Trace saved to '{path}'")
+        for name, calls, seconds, peak in _tracer.summary():
+            rss = f"{peak:8.0f} MB" if peak is not None else ""
+            print(f"   {name:<24} {calls:>6}x {seconds:10.3f} s {rss}")
+        for name, value in _tracer.counters.items():
+            print(f"   • {name}: {value}")
+    return path
@@ -0,0 +1,94 @@
+"""
+On-disk store for fitted ARIMA models.
+
+Each entry is keyed by tank, feature, model order and a fingerprint of the
+series the model has seen. On the next run, lookup() returns the stored model
+when the stored part of the history is unchanged, so only the new readings
+have to be appended to its state-space representation (results.append with
+refit=False). A full re-estimation happens only when it is due
+(FULL_REFIT_EVERY since the last one) or the stored history changed.
+"""
+import hashlib
+import json
+import pickle
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+STORE_DIR = Path("model_store")
+INDEX_FILE = "index.json"
+FULL_REFIT_EVERY = pd.Timedelta(days=1)
+
+
+def series_fingerprint(series):
+    """Hash of the timestamps and values of a series."""
+    h = hashlib.sha1()
+    h.update(np.ascontiguousarray(series.index.asi8).tobytes())
+    h.update(np.ascontiguousarray(series.to_numpy(dtype=float)).tobytes())
+    return h.hexdigest()
+
+
+def _order_tag(order):
+    return "".join(map(str, order))
+
+
+class ModelStore:
+    """Fitted models under STORE_DIR, one pickle per (tank, feature, order, fingerprint)."""
+
+    def __init__(self, root=STORE_DIR, full_refit_every=FULL_REFIT_EVERY):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.full_refit_every = pd.Timedelta(full_refit_every)
+        index_path = self.root / INDEX_FILE
+        self.index = json.loads(index_path.read_text()) if index_path.exists() else {}
+
+    @staticmethod
+    def _key(tank_id, feature, order):
+        return f"{tank_id}|{feature}|{_order_tag(order)}"
+
+    def lookup(self, tank_id, feature, order, series, now=None):
+        """
+        (model_fit, n_obs) when a stored model covers the first n_obs points of series
+        and no full refit is due; otherwise None.
+        """
+        entry = self.index.get(self._key(tank_id, feature, order))
+        if entry is None or entry["n_obs"] > len(series):
+            return None
+
+        now = now or datetime.now()
+        if now - pd.Timestamp(entry["last_full_fit"]) >= self.full_refit_every:
+            return None
+        if series_fingerprint(series.iloc[:entry["n_obs"]]) != entry["fingerprint"]:
+            return None
+
+        path = self.root / entry["file"]
+        if not path.exists():
+            return None
+        with open(path, "rb") as f:
+            return pickle.load(f), entry["n_obs"]
+
+    def save(self, tank_id, feature, order, series, model_fit, full_fit):
+        """Store model_fit as the model for series (all of it)."""
+        key = self._key(tank_id, feature, order)
+        old = self.index.get(key)
+        fingerprint = series_fingerprint(series)
+        filename = f"Tank{tank_id}_{feature}_ARIMA{_order_tag(order)}_{fingerprint[:16]}.pkl".replace(" ", "")
+
+        with open(self.root / filename, "wb") as f:
+            pickle.dump(model_fit, f, protocol=pickle.HIGHEST_PROTOCOL)
+        if old and old["file"] != filename:
+            (self.root / old["file"]).unlink(missing_ok=True)
+
+        self.index[key] = {
+            "file": filename,
+            "fingerprint": fingerprint,
+            "n_obs": len(series),
+            "last_time": str(series.index[-1]),
+            "last_full_fit": datetime.now().isoformat() if full_fit or old is None else old["last_full_fit"],
+            "appends_since_full_fit": 0 if full_fit or old is None else old["appends_since_full_fit"] + 1,
+        }
+
+    def flush(self):
+        (self.root / INDEX_FILE).write_text(json.dumps(self.index, indent=2))
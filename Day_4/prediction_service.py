@@ -0,0 +1,312 @@
+"""
+Local asyncio HTTP prediction service for the carp classifier.
+
+Replaces the one-reading-at-a-time input() loop of predict_from_input with a
+small HTTP/1.1 server (standard library only):
+
+    POST /predict   one JSON reading or a list of readings -> decoded labels
+    GET  /metrics   p50 / p99 latency, batch-size stats, request counts
+    GET  /health    artifact version
+
+Concurrent requests are coalesced by MicroBatcher into batches of at most
+MAX_BATCH_SIZE readings (or whatever arrived within MAX_WAIT_MS), and each
+batch is scored with one vectorized predict call - on the memory-mapped
+flat-array forest (flat_forest.py) when USE_FLAT_FOREST, else model.predict.
+
+Models trained with USE_TREND_FEATURES need a "Timestamp" in every reading:
+the service keeps each tank's recent readings in ring buffers
+(feature_pipeline.OnlineFeatures) and derives the lag / rolling features from
+them, exactly as training did. Readings of a tank must arrive in time order.
+
+Run:  python prediction_service.py   (after training with MODE = "train")
+"""
+import asyncio
+import json
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from classifier_artifacts import ARTIFACT_DIR, load_classifier, load_flat_forest
+from feature_pipeline import OnlineFeatures, parse_reading_time
+
+HOST = "127.0.0.1"
+PORT = 8008
+MAX_BATCH_SIZE = 64
+MAX_WAIT_MS = 5
+METRICS_WINDOW = 10_000
+USE_FLAT_FOREST = True      # score with the flat-array forest (flat_forest.py) instead of sklearn
+
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               500: "Internal Server Error"}
+
+
+class PredictionError(RuntimeError):
+    """Scoring a batch failed (model or label decoding) - a server error, not bad input."""
+
+
+# -----------------------------
+# MODEL WRAPPER
+# -----------------------------
+class CarpPredictor:
+    """Encodes readings, runs model.predict on a batch and decodes the labels."""
+
+    def __init__(self, artifact, flat_forest=None):
+        self.model = artifact["model"]
+        self.flat_forest = flat_forest
+        self.carp_encoder = artifact["carp_encoder"]
+        self.label_encoders = artifact["label_encoders"]
+        self.features = artifact["features"]
+        self.targets = artifact["targets"]
+        self.version = artifact["version"]
+        self._species_codes = {s: i for i, s in enumerate(self.carp_encoder.classes_)}
+        spec = artifact.get("feature_pipeline")
+        self.trend = OnlineFeatures(**spec) if spec else None
+        self._trend_names = set(self.trend.names) if self.trend is not None else set()
+
+    def encode(self, reading):
+        """One JSON reading -> feature vector. Raises ValueError on bad input."""
+        return self.encode_batch([reading])[0]
+
+    def encode_batch(self, readings):
+        """
+        JSON readings -> feature vectors. Every reading is validated before any of them
+        enters the tanks' trend history, so a rejected request leaves that history as it was.
+        """
+        parsed = [self._parse(r) for r in readings]
+        rows = [row for row, _ in parsed]
+        if self.trend is not None:
+            trends = self.trend.update_batch([trend_input for _, trend_input in parsed])
+            rows = [[trend[f] if v is None else v for f, v in zip(self.features, row)]
+                    for row, trend in zip(rows, trends)]
+        return rows
+
+    def _parse(self, reading):
+        """(feature row with None for trend features, (tank_id, time, channel values) or None); no state change."""
+        row = []
+        for feature in self.features:
+            if feature in self._trend_names:
+                row.append(None)
+                continue
+            if feature not in reading:
+                raise ValueError(f"missing field '{feature}'")
+            value = reading[feature]
+            if feature == "Carp_Species" and isinstance(value, str):
+                if value not in self._species_codes:
+                    raise ValueError(f"unknown Carp_Species '{value}' (expected one of {list(self._species_codes)})")
+                value = self._species_codes[value]
+            row.append(float(value))
+
+        if self.trend is None:
+            return row, None
+        for field in ("Timestamp", "Tank_ID", *self.trend.channels):
+            if field not in reading:
+                raise ValueError(f"missing field '{field}'")
+        return row, (int(reading["Tank_ID"]), parse_reading_time(reading["Timestamp"]),
+                     [float(reading[c]) for c in self.trend.channels])
+
+    def predict_batch(self, rows):
+        """List of feature vectors -> list of {target: decoded label}."""
+        if self.flat_forest is not None:
+            pred = self.flat_forest.predict(np.asarray(rows, dtype=float))
+        else:
+            pred = self.model.predict(pd.DataFrame(np.asarray(rows, dtype=float), columns=self.features))
+        decoded = {}
+        for i, target in enumerate(self.targets):
+            column = pred[:, i]
+            if target in self.label_encoders:
+                column = self.label_encoders[target].inverse_transform(column.astype(int))
+            decoded[target] = [v.item() if hasattr(v, "item") else v for v in column]
+        return [{t: decoded[t][j] for t in self.targets} for j in range(len(rows))]
+
+
+# -----------------------------
+# METRICS
+# -----------------------------
+class ServiceMetrics:
+    def __init__(self, window=METRICS_WINDOW):
+        self.latencies_ms = deque(maxlen=window)
+        self.batch_sizes = deque(maxlen=window)
+        self.requests = 0
+        self.readings = 0
+        self.errors = 0
+
+    def snapshot(self):
+        lat = np.asarray(self.latencies_ms) if self.latencies_ms else np.zeros(1)
+        sizes = np.asarray(self.batch_sizes) if self.batch_sizes else np.zeros(1)
+        return {
+            "requests": self.requests,
+            "readings": self.readings,
+            "errors": self.errors,
+            "latency_ms_p50": float(np.percentile(lat, 50)),
+            "latency_ms_p99": float(np.percentile(lat, 99)),
+            "batches": len(self.batch_sizes),
+            "batch_size_mean": float(sizes.mean()),
+            "batch_size_p50": float(np.percentile(sizes, 50)),
+            "batch_size_max": int(sizes.max()),
+        }
+
+
+# -----------------------------
+# MICRO-BATCHING
+# -----------------------------
+class MicroBatcher:
+    """Coalesces queued readings into batches for one predict call each."""
+
+    def __init__(self, predictor, metrics, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        self.predictor = predictor
+        self.metrics = metrics
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.queue = asyncio.Queue()
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+
+    async def submit(self, row):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((row, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            rows = [row for row, _ in batch]
+            self.metrics.batch_sizes.append(len(rows))
+            error = None
+            try:
+                # Off the event loop so new requests keep queueing during predict
+                results = await loop.run_in_executor(None, self.predictor.predict_batch, rows)
+                if len(results) != len(rows):
+                    raise RuntimeError(f"predict_batch returned {len(results)} results for {len(rows)} readings")
+            except Exception as e:
+                error = e
+            # A failed batch rejects every reading in it, so no request waits forever
+            for i, (_, future) in enumerate(batch):
+                if future.done():
+                    continue
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(results[i])
+
+
+# -----------------------------
+# HTTP
+# -----------------------------
+class PredictionService:
+    def __init__(self, predictor, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        self.predictor = predictor
+        self.metrics = ServiceMetrics()
+        self.batcher = MicroBatcher(predictor, self.metrics, max_batch_size, max_wait_ms)
+
+    async def predict(self, payload):
+        readings = payload if isinstance(payload, list) else [payload]
+        rows = self.predictor.encode_batch(readings)
+        # Every future is awaited (no unretrieved exceptions); the first failure is raised
+        results = await asyncio.gather(*(self.batcher.submit(row) for row in rows), return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                raise PredictionError(f"{type(result).__name__}: {result}") from result
+        self.metrics.readings += len(rows)
+        return results if isinstance(payload, list) else results[0]
+
+    async def route(self, method, path, body):
+        if path == "/predict":
+            if method != "POST":
+                return 405, {"error": "use POST"}
+            start = time.perf_counter()
+            self.metrics.requests += 1
+            try:
+                result = await self.predict(json.loads(body or b"null"))
+            except PredictionError as e:
+                self.metrics.errors += 1
+                return 500, {"error": f"prediction failed: {e}"}
+            except (ValueError, TypeError, AttributeError) as e:
+                self.metrics.errors += 1
+                return 400, {"error": str(e)}
+            except Exception as e:
+                # Anything else still gets an answer instead of a dropped connection
+                self.metrics.errors += 1
+                return 500, {"error": f"{type(e).__name__}: {e}"}
+            self.metrics.latencies_ms.append((time.perf_counter() - start) * 1000)
+            return 200, result
+        if path == "/metrics":
+            return 200, self.metrics.snapshot()
+        if path == "/health":
+            return 200, {"status": "ok", "model_version": self.predictor.version}
+        return 404, {"error": f"unknown path {path}"}
+
+    async def handle_connection(self, reader, writer):
+        """HTTP/1.1 with keep-alive: requests on one connection are served in order."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                status, payload = await self.route(method.upper(), target.split("?", 1)[0], body)
+                data = json.dumps(payload).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data
+                )
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host=HOST, port=PORT):
+        self.batcher.start()
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"🚀 Prediction service (model {self.predictor.version}) on http://{host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.batcher.stop()
+
+
+def run(host=HOST, port=PORT, artifact_dir=ARTIFACT_DIR, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS,
+        use_flat_forest=USE_FLAT_FOREST):
+    artifact = load_classifier(artifact_dir)
+    flat_forest = load_flat_forest(artifact_dir, artifact["version"]) if use_flat_forest else None
+    predictor = CarpPredictor(artifact, flat_forest)
+    service = PredictionService(predictor, max_batch_size, max_wait_ms)
+    try:
+        asyncio.run(service.serve(host, port))
+    except KeyboardInterrupt:
+        print("\n👋 Prediction service stopped")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,281 @@
+"""
+Budgeted hyperparameter search for the multi-output Random Forest.
+
+Successive halving over SEARCH_SPACE (n_estimators x max_depth x max_features):
+every candidate is trained on a small slice of the training rows, the best
+1/ETA advance to the next rung with ETA times more rows, and the last rung
+trains on all of them. Trials run in a process pool; the training and
+validation matrices are placed in shared memory once and every worker maps
+them, instead of each trial pickling its own copy.
+
+Candidates are ranked by a combined objective: a trial is feasible only if
+every target reaches its macro-F1 floor, and among feasible trials
+score = mean F1 - LATENCY_WEIGHT * latency_ms, where latency is the flat-array
+forest (flat_forest.py, the serving path) on a LATENCY_BATCH-row batch. So the
+search prefers the smallest forest that meets the floors, not the biggest.
+
+The floors come from the data, not from fixed numbers: the untuned forest
+(BASELINE_PARAMS, what MODE = "train" fits) is scored on the same validation
+split first, and each target's floor is its F1 minus F1_TOLERANCE. A tuned
+model may therefore be faster but never more than F1_TOLERANCE worse on any
+target than the baseline; explicit f1_floors replace the derived floor of
+their targets.
+
+strategy="shared" tunes one parameter set for all targets (one
+MultiOutputClassifier per trial); strategy="per_target" runs a separate search
+per target and assembles the winners into one MultiOutputClassifier.
+"""
+import itertools
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import f1_score
+from sklearn.model_selection import train_test_split
+from sklearn.multioutput import MultiOutputClassifier
+
+from flat_forest import FlatForest
+from forecast_engine import pool_context
+
+SEARCH_SPACE = {
+    "n_estimators": (25, 50, 100, 200),
+    "max_depth": (None, 8, 12, 16),
+    "max_features": ("sqrt", 0.5, None),
+}
+ETA = 3                     # keep the best 1/ETA of the candidates per rung
+MIN_ROWS = 500              # training rows of the first rung (at least)
+VALIDATION_SIZE = 0.25      # share of the training rows held out to score trials
+DEFAULT_F1_FLOOR = 0.90     # only without a baseline (baseline_params=None) or if it fails
+BASELINE_PARAMS = {"n_estimators": 100, "max_depth": None, "max_features": "sqrt"}
+F1_TOLERANCE = 0.02         # macro-F1 a tuned target may lose against the baseline forest
+LATENCY_WEIGHT = 0.01       # mean-F1 points given up per ms of batch latency
+LATENCY_BATCH = 64
+LATENCY_REPEATS = 5
+SEED = 42
+
+
+@dataclass
+class TrialResult:
+    params: dict
+    targets: list
+    rung: int
+    n_rows: int
+    f1: dict = field(default_factory=dict)
+    latency_ms: float = float("nan")
+    fit_seconds: float = float("nan")
+    error: str = None
+
+    def feasible(self, floors):
+        return self.error is None and all(self.f1[t] >= floors.get(t, DEFAULT_F1_FLOOR) for t in self.targets)
+
+    def score(self):
+        return float(np.mean(list(self.f1.values()))) - LATENCY_WEIGHT * self.latency_ms
+
+    def rank_key(self, floors):
+        """Higher is better: feasible first, then combined score; infeasible by worst F1 shortfall."""
+        if self.error is not None:
+            return (0, -math.inf)
+        if self.feasible(floors):
+            return (2, self.score())
+        return (1, min(self.f1[t] - floors.get(t, DEFAULT_F1_FLOOR) for t in self.targets))
+
+
+def candidate_grid(space=SEARCH_SPACE):
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*space.values())]
+
+
+def make_model(params, random_state=SEED):
+    return MultiOutputClassifier(RandomForestClassifier(**params, random_state=random_state, n_jobs=1))
+
+
+# -----------------------------
+# SHARED MEMORY
+# -----------------------------
+_SHARED = {}    # name -> ndarray view on a shared block (filled per worker by _attach)
+
+
+def _share(arrays):
+    """Copy arrays into new shared-memory blocks -> (blocks, specs passed to workers)."""
+    blocks, specs = [], {}
+    for name, arr in arrays.items():
+        arr = np.ascontiguousarray(arr)
+        block = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+        np.ndarray(arr.shape, arr.dtype, buffer=block.buf)[...] = arr
+        blocks.append(block)
+        specs[name] = (block.name, arr.shape, arr.dtype.str)
+    return blocks, specs
+
+
+def _attach(specs):
+    """Pool initializer: map the shared blocks as read-only arrays (no copy)."""
+    _SHARED.clear()
+    for name, (block_name, shape, dtype) in specs.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        arr = np.ndarray(shape, np.dtype(dtype), buffer=block.buf)
+        arr.flags.writeable = False
+        _SHARED[name] = arr
+        _SHARED.setdefault("_blocks", []).append(block)     # keep the mapping alive
+
+
+# -----------------------------
+# TRIALS
+# -----------------------------
+def _measure_latency(model, X):
+    flat = FlatForest.from_sklearn(model)
+    batch = X[:LATENCY_BATCH]
+    flat.predict(batch)
+    best = math.inf
+    for _ in range(LATENCY_REPEATS):
+        start = time.perf_counter()
+        flat.predict(batch)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def run_trial(params, target_idx, target_names, rung, n_rows):
+    """Fit on the first n_rows shared training rows, score on the shared validation rows. Never raises."""
+    result = TrialResult(params, list(target_names), rung, n_rows)
+    try:
+        X_train, y_train = _SHARED["X_train"][:n_rows], _SHARED["y_train"][:n_rows, target_idx]
+        X_val, y_val = _SHARED["X_val"], _SHARED["y_val"][:, target_idx]
+
+        start = time.perf_counter()
+        model = make_model(params).fit(X_train, y_train)
+        result.fit_seconds = time.perf_counter() - start
+
+        y_pred = model.predict(X_val)
+        result.f1 = {t: float(f1_score(y_val[:, i], y_pred[:, i], average="macro"))
+                     for i, t in enumerate(target_names)}
+        result.latency_ms = _measure_latency(model, X_val)
+    except Exception as e:
+        result.error = str(e)
+    return result
+
+
+def _rung_sizes(n_candidates, n_train, eta=ETA, min_rows=MIN_ROWS):
+    """Rows per rung: grows by eta, ends at n_train; no more rungs than halvings needed."""
+    by_candidates = math.ceil(math.log(max(n_candidates, 1), eta))
+    by_rows = int(math.log(max(n_train / min_rows, 1), eta))
+    n_rungs = min(by_candidates, by_rows) + 1
+    return [int(n_train / eta ** (n_rungs - 1 - r)) for r in range(n_rungs)]
+
+
+def successive_halving(candidates, target_idx, target_names, n_train, floors, pool, eta=ETA):
+    """All trials of every rung (list of TrialResult) and the winning one."""
+    trials = []
+    survivors = candidates
+    for rung, n_rows in enumerate(_rung_sizes(len(candidates), n_train, eta)):
+        args = [(p, target_idx, target_names, rung, n_rows) for p in survivors]
+        results = list(pool.map(run_trial, *zip(*args))) if pool else [run_trial(*a) for a in args]
+        trials.extend(results)
+        results.sort(key=lambda r: r.rank_key(floors), reverse=True)
+        survivors = [r.params for r in results[:max(1, math.ceil(len(results) / eta))]]
+    return trials, results[0]
+
+
+# -----------------------------
+# SEARCH
+# -----------------------------
+def baseline_floors(targets, n_train, pool, baseline_params=BASELINE_PARAMS, tolerance=F1_TOLERANCE,
+                    fixed=None):
+    """Per-target floors: the baseline forest's validation macro F1 minus tolerance (fixed floors win)."""
+    fixed = dict(fixed or {})
+    if baseline_params is None:
+        return fixed
+    args = (baseline_params, list(range(len(targets))), targets, -1, n_train)
+    baseline = pool.submit(run_trial, *args).result() if pool else run_trial(*args)
+    if baseline.error is not None:
+        print(f"⚠  Baseline forest failed ({baseline.error}) – using the fixed F1 floors.")
+        return fixed
+    floors = {t: baseline.f1[t] - tolerance for t in targets}
+    floors.update(fixed)
+    print(f"• F1 floors (baseline {baseline_params} - {tolerance}): "
+          + ", ".join(f"{t} {floors[t]:.3f}" for t in targets))
+    return floors
+
+
+def tune_random_forest(X, y, strategy="shared", f1_floors=None, space=SEARCH_SPACE, n_workers=None,
+                       eta=ETA, validation_size=VALIDATION_SIZE, random_state=SEED,
+                       baseline_params=BASELINE_PARAMS, f1_tolerance=F1_TOLERANCE):
+    """
+    Search on a train / validation split of (X, y), then refit the winners on all of X.
+    f1_floors: fixed floors for some targets; the others are derived from the baseline forest.
+    Returns (fitted MultiOutputClassifier, best params per target, DataFrame of all trials).
+    """
+    targets = list(y.columns)
+    X_fit, X_val, y_fit, y_val = train_test_split(X, y, test_size=validation_size, random_state=random_state)
+    # float32 is what the forest fits on anyway; labels are already integer-encoded
+    blocks, specs = _share({
+        "X_train": X_fit.to_numpy(np.float32), "y_train": y_fit.to_numpy(np.int64),
+        "X_val": X_val.to_numpy(np.float32), "y_val": y_val.to_numpy(np.int64),
+    })
+
+    groups = [list(range(len(targets)))] if strategy == "shared" else [[i] for i in range(len(targets))]
+    candidates = candidate_grid(space)
+    n_workers = n_workers or os.cpu_count() or 1
+    ctx = pool_context() if n_workers > 1 else None
+    pool = None
+    try:
+        if ctx is None:
+            _attach(specs)
+        else:
+            pool = ProcessPoolExecutor(max_workers=n_workers, mp_context=ctx,
+                                       initializer=_attach, initargs=(specs,))
+        floors = baseline_floors(targets, len(X_fit), pool, baseline_params, f1_tolerance, f1_floors)
+        trials, best = [], {}
+        for idx in groups:
+            names = [targets[i] for i in idx]
+            group_trials, winner = successive_halving(candidates, idx, names, len(X_fit), floors, pool, eta)
+            if not winner.feasible(floors):
+                print(f"⚠  No candidate met the F1 floors for {names} – using the closest one.")
+            trials.extend(group_trials)
+            best.update({t: winner.params for t in names})
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        _SHARED.clear()
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    model = assemble_model(X, y, best, targets, strategy, random_state)
+    return model, best, trials_frame(trials, floors)
+
+
+def assemble_model(X, y, best, targets, strategy="shared", random_state=SEED):
+    """Refit the chosen parameters on all of (X, y) as one MultiOutputClassifier."""
+    if strategy == "shared":
+        return make_model(best[targets[0]], random_state).fit(X, y)
+    # MultiOutputClassifier only holds the fitted per-target estimators, so each
+    # target can keep its own forest size
+    model = make_model(best[targets[0]], random_state)
+    model.estimators_ = [
+        RandomForestClassifier(**best[t], random_state=random_state, n_jobs=1).fit(X, y[t]) for t in targets
+    ]
+    model.n_features_in_ = X.shape[1]
+    if hasattr(X, "columns"):
+        model.feature_names_in_ = np.asarray(X.columns, dtype=object)
+    return model
+
+
+def trials_frame(trials, floors=None):
+    floors = floors or {}
+    rows = []
+    for r in trials:
+        rows.append({
+            "Targets": ",".join(r.targets), "Rung": r.rung, "Rows": r.n_rows,
+            **{k: ("None" if v is None else v) for k, v in r.params.items()},
+            "Min_F1": min(r.f1.values()) if r.f1 else np.nan,
+            "Mean_F1": float(np.mean(list(r.f1.values()))) if r.f1 else np.nan,
+            "Latency_ms": r.latency_ms, "Fit_s": r.fit_seconds,
+            "Feasible": r.feasible(floors), "Score": r.score() if r.f1 else np.nan,
+            "Error": r.error,
+        })
+    return pd.DataFrame(rows)
@@ -0,0 +1,269 @@
+"""
+One loader for every sensor CSV format, mapped into the Main_Dataset schema.
+
+Formats (detected from the header):
+    main_dataset : the generator's columns (Timestamp 'DD-MM-YYYY HH:MM')
+    kaggle       : Day_3/datasets/Kaggle_dataset.csv
+                   Station, Date 'DD-MM-YYYY HH:MM', NITRATE(PPM), PH, AMMONIA(mg/l),
+                   TEMP, DO, TURBIDITY, MANGANESE(mg/l)
+    thingspeak   : ThingSpeak CSV exports (sensed_data.csv, synthetic_hatchery_data.csv,
+                   ingestion_server.py channels): created_at 'YYYY-MM-DD HH:MM:SS[ UTC]',
+                   entry_id, Temperature, Humidity, Soil Moisture, Turbity percentage
+
+Every format comes out with CANONICAL_DTYPES (columns a source does not have
+are left empty; columns with no Main_Dataset counterpart - MANGANESE, Humidity -
+are dropped) and a naive Timestamp in the source's own clock (UTC for
+ThingSpeak). Kaggle stations become Tank_ID ('station2' -> 2); a ThingSpeak
+channel is one tank (tank_id argument). Labels a source does not provide are
+derived with threshold_rules.RULES from whatever inputs it has.
+
+Timestamps are parsed by fixed byte positions of the known format (NumPy on
+the raw characters), files are read in CHUNK_ROWS chunks with explicit dtypes,
+and the converted table is cached as Feather under CACHE_DIR, keyed by a hash
+of the source file, so a repeated load of an unchanged file does no parsing.
+"""
+import glob
+import hashlib
+import re
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from dataset_io import write_feather
+from threshold_rules import COLUMN_MAP, LABEL_INPUTS, RULES
+
+CACHE_DIR = Path(".canonical_cache")
+CHUNK_ROWS = 200_000
+ADAPTER_VERSION = "1"       # bump when a mapping changes so old cache entries are not reused
+
+CANONICAL_DTYPES = {
+    'Timestamp': 'datetime64[ns]',
+    'Entry_ID': 'int64',
+    'Tank_ID': 'int64',
+    'Carp_Species': 'object',
+    'Temperature_C': 'float64',
+    'Dissolved_Oxygen_mgL': 'float64',
+    'pH': 'float64',
+    'Ammonia_mgL': 'float64',
+    'Nitrate_mgL': 'float64',
+    'Turbidity_NTU': 'float64',
+    'Alkalinity_mgL': 'float64',
+    'Hardness_mgL': 'float64',
+    'Soil_Moisture': 'float64',
+    'Water_Flow_Lmin': 'float64',
+    'Feeding_Frequency': 'Int64',
+    'Tank_Leakage': 'Int64',
+    'Temperature_Status': 'object',
+    'Water_Quality_Index': 'object',
+    'DO_Status': 'object',
+    'Growth_Condition': 'object',
+}
+LABELS = ('Temperature_Status', 'Water_Quality_Index', 'DO_Status', 'Growth_Condition')
+
+
+@dataclass(frozen=True)
+class SourceFormat:
+    name: str
+    timestamp_col: str
+    timestamp_format: str
+    rename: dict            # source column -> canonical column
+    raw_dtypes: dict        # dtypes the CSV is read with (no inference)
+    tank_col: str = None    # source column holding the tank / station id
+
+
+MAIN_DATASET = SourceFormat(
+    "main_dataset", "Timestamp", "%d-%m-%Y %H:%M",
+    rename={c: c for c in CANONICAL_DTYPES if c != 'Timestamp'},
+    raw_dtypes={'Timestamp': 'object', 'Entry_ID': 'int64', 'Tank_ID': 'int64',
+                **{c: ('object' if t == 'object' else 'float64') for c, t in CANONICAL_DTYPES.items()
+                   if c not in ('Timestamp', 'Entry_ID', 'Tank_ID')}},
+    tank_col='Tank_ID',
+)
+KAGGLE = SourceFormat(
+    "kaggle", "Date", "%d-%m-%Y %H:%M",
+    rename={'NITRATE(PPM)': 'Nitrate_mgL', 'PH': 'pH', 'AMMONIA(mg/l)': 'Ammonia_mgL',
+            'TEMP': 'Temperature_C', 'DO': 'Dissolved_Oxygen_mgL', 'TURBIDITY': 'Turbidity_NTU'},
+    raw_dtypes={'Station': 'object', 'Date': 'object', 'NITRATE(PPM)': 'float64', 'PH': 'float64',
+                'AMMONIA(mg/l)': 'float64', 'TEMP': 'float64', 'DO': 'float64', 'TURBIDITY': 'float64'},
+    tank_col='Station',
+)
+THINGSPEAK = SourceFormat(
+    # created_at may carry a ' UTC' suffix (exports) or not (synthetic file); both are UTC
+    "thingspeak", "created_at", "%Y-%m-%d %H:%M:%S",
+    rename={'entry_id': 'Entry_ID', 'Temperature': 'Temperature_C', 'Soil Moisture': 'Soil_Moisture',
+            # Water-purity channel (field4), reported as a percentage rather than calibrated NTU
+            'Turbity percentage': 'Turbidity_NTU'},
+    raw_dtypes={'created_at': 'object', 'entry_id': 'int64', 'Temperature': 'float64',
+                'Soil Moisture': 'float64', 'Turbity percentage': 'float64'},
+)
+FORMATS = (MAIN_DATASET, KAGGLE, THINGSPEAK)
+
+
+def detect_format(columns):
+    columns = set(columns)
+    for fmt in FORMATS:
+        if set(fmt.raw_dtypes) <= columns:
+            return fmt
+    raise ValueError(f"Unrecognised sensor CSV columns: {sorted(columns)}")
+
+
+# -----------------------------
+# TIMESTAMPS
+# -----------------------------
+_FIELD_WIDTHS = {'Y': 4, 'm': 2, 'd': 2, 'H': 2, 'M': 2, 'S': 2}
+
+
+def _layout(fmt):
+    """strftime format -> (byte width, {field: slice}, {position: literal byte})."""
+    fields, literals, pos, i = {}, {}, 0, 0
+    while i < len(fmt):
+        if fmt[i] == '%':
+            code = fmt[i + 1]
+            fields[code] = slice(pos, pos + _FIELD_WIDTHS[code])
+            pos += _FIELD_WIDTHS[code]
+            i += 2
+        else:
+            literals[pos] = ord(fmt[i])
+            pos += 1
+            i += 1
+    return pos, fields, literals
+
+
+def parse_fixed_timestamps(values, fmt):
+    """
+    Fixed-width timestamps (zero-padded %Y %m %d %H %M %S) -> datetime64[ns] array,
+    decoded from the character codes with NumPy; characters after the format
+    (a ' UTC' suffix) are ignored. Anything that does not fit the layout goes
+    through pd.to_datetime, which reports the offending value.
+    """
+    width, fields, literals = _layout(fmt)
+    values = np.asarray(values, dtype=object)
+    try:
+        raw = np.asarray(values, dtype=f"S{width}")
+    except (UnicodeEncodeError, TypeError):
+        raw = None
+    if raw is not None and len(raw):
+        chars = raw.view(np.uint8).reshape(len(raw), width)
+        digits = chars.astype(np.int64) - ord('0')
+        digit_cols = np.concatenate([np.arange(s.start, s.stop) for s in fields.values()])
+        ok = ((digits[:, digit_cols] >= 0) & (digits[:, digit_cols] <= 9)).all()
+        ok &= all((chars[:, p] == c).all() for p, c in literals.items())
+        if ok:
+            def number(code, default):
+                if code not in fields:
+                    return np.full(len(raw), default, dtype=np.int64)
+                s = fields[code]
+                return digits[:, s] @ (10 ** np.arange(s.stop - s.start - 1, -1, -1))
+
+            year, month, day = number('Y', 1970), number('m', 1), number('d', 1)
+            hour, minute, second = number('H', 0), number('M', 0), number('S', 0)
+            months = ((year - 1970) * 12 + month - 1).astype('datetime64[M]')
+            month_start = months.astype('datetime64[D]').astype(np.int64)
+            month_days = (months + 1).astype('datetime64[D]').astype(np.int64) - month_start
+            valid = ((month >= 1) & (month <= 12) & (day >= 1) & (day <= month_days)
+                     & (hour < 24) & (minute < 60) & (second < 60))
+            if valid.all():
+                seconds = (((month_start + day - 1) * 24 + hour) * 60 + minute) * 60 + second
+                return (seconds * 1_000_000_000).view('datetime64[ns]')
+    stripped = pd.Series(values, dtype=object).astype(str).str.replace(r'\s*UTC$', '', regex=True)
+    return pd.to_datetime(stripped, format=fmt).to_numpy(dtype='datetime64[ns]')
+
+
+# -----------------------------
+# CONVERSION
+# -----------------------------
+def _tank_ids(values):
+    """'station2' -> 2 (trailing number); ids without a number are numbered in order of appearance."""
+    mapping = {}
+    for v in pd.unique(values):
+        m = re.search(r"(\d+)\s*$", str(v))
+        mapping[v] = int(m.group(1)) if m else None
+    fallback = iter(range(max([i for i in mapping.values() if i is not None], default=0) + 1, 1 << 31))
+    mapping = {k: v if v is not None else next(fallback) for k, v in mapping.items()}
+    return pd.Series(values).map(mapping).to_numpy(dtype=np.int64)
+
+
+def to_canonical(raw, fmt, tank_id=1, first_entry_id=1):
+    """One raw chunk of a source format -> Main_Dataset columns with CANONICAL_DTYPES."""
+    n = len(raw)
+    out = {'Timestamp': parse_fixed_timestamps(raw[fmt.timestamp_col].to_numpy(), fmt.timestamp_format)}
+    for src, dst in fmt.rename.items():
+        if src in raw.columns:
+            out[dst] = raw[src].to_numpy()
+    if fmt.tank_col is not None:
+        tanks = raw[fmt.tank_col].to_numpy()
+        out['Tank_ID'] = tanks if fmt is MAIN_DATASET else _tank_ids(tanks)
+    else:
+        out['Tank_ID'] = np.full(n, tank_id, dtype=np.int64)
+    if 'Entry_ID' not in out:
+        out['Entry_ID'] = np.arange(first_entry_id, first_entry_id + n)
+
+    df = pd.DataFrame(
+        {c: out[c] if c in out else pd.Series(np.nan if t != 'object' else None, index=range(n), dtype=t)
+         for c, t in CANONICAL_DTYPES.items()}
+    ).astype(CANONICAL_DTYPES)
+
+    # Labels the source does not carry, from the inputs it does have
+    provided = set(out)
+    missing = [label for label in LABELS if label not in provided]
+    if missing:
+        params = {p: col for p, col in COLUMN_MAP.items() if col in provided}
+        labels = RULES.label_frame(df, column_map=params)
+        for label in missing:
+            if label in labels:
+                inputs = [COLUMN_MAP[p] for p in LABEL_INPUTS[label]]
+                df[label] = labels[label].where(df[inputs].notna().all(axis=1), None).astype(object)
+    return df
+
+
+def iter_canonical_chunks(path, tank_id=1, chunk_rows=CHUNK_ROWS):
+    """Stream a sensor CSV as canonical DataFrame chunks of at most chunk_rows rows."""
+    header = pd.read_csv(path, nrows=0).columns
+    fmt = detect_format(header)
+    reader = pd.read_csv(path, usecols=list(fmt.raw_dtypes), dtype=fmt.raw_dtypes, chunksize=chunk_rows)
+    next_id = 1
+    for raw in reader:
+        chunk = to_canonical(raw, fmt, tank_id, next_id)
+        next_id += len(chunk)
+        yield chunk
+
+
+# -----------------------------
+# CACHED LOAD
+# -----------------------------
+def file_digest(path, block_size=1 << 20):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def load_canonical(path, tank_id=1, cache_dir=CACHE_DIR, chunk_rows=CHUNK_ROWS):
+    """
+    Whole sensor CSV in the canonical schema. The result is cached as
+    <cache_dir>/<name>.<source>-<hash>.feather (<source>: hash of the resolved
+    path, so equal file names in different folders keep separate entries); an
+    unchanged file is loaded from there. cache_dir=None disables the cache.
+    """
+    path = Path(path)
+    if cache_dir is None:
+        return pd.concat(iter_canonical_chunks(path, tank_id, chunk_rows), ignore_index=True)
+
+    key = hashlib.sha1(f"{file_digest(path)}|{tank_id}|{ADAPTER_VERSION}".encode()).hexdigest()[:16]
+    cache_dir = Path(cache_dir)
+    source = f"{path.name}.{hashlib.sha1(str(path.resolve()).encode()).hexdigest()[:8]}"
+    cached = cache_dir / f"{source}-{key}.feather"
+    if cached.exists():
+        return pd.read_feather(cached)
+
+    df = pd.concat(iter_canonical_chunks(path, tank_id, chunk_rows), ignore_index=True)
+    # Only this source's older entries: "a.csv.<source>-" never prefixes another file's entry
+    stale = re.compile(re.escape(source) + r"-[0-9a-f]{16}\.feather")
+    for old in cache_dir.glob(f"{glob.escape(source)}-*.feather"):
+        if stale.fullmatch(old.name):
+            old.unlink()
+    write_feather(df, cached)
+    return df
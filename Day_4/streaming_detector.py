@@ -0,0 +1,228 @@
+"""
+Online leak / anomaly detection on the live sensor stream.
+
+Keeps constant-size state per tank and channel (Soil_Moisture,
+Dissolved_Oxygen_mgL, Turbidity_NTU by default) and checks every reading as
+it arrives, instead of waiting for the next batch classification:
+
+    Welford   running mean / variance (the in-control baseline)
+    EWMA      exponentially weighted mean / variance (recent level)
+    CUSUM     two-sided, on the reading standardized by the Welford baseline
+
+Events (at most one per reading and channel, in this priority):
+    LEAK        Soil_Moisture reaches LEAK_THRESHOLD (the generator's
+                Tank_Leakage rule) or its upper CUSUM alarms
+    SHIFT_UP / SHIFT_DOWN   CUSUM alarm (sum of standardized deviations > CUSUM_H)
+    SPIKE       |reading - EWMA| > Z_LIMIT EWMA standard deviations
+
+Threshold and spike events are raised on the reading that causes them; CUSUM
+raises on the first reading where the accumulated evidence crosses CUSUM_H
+(the same reading for jumps of more than CUSUM_H + CUSUM_K standard
+deviations). Nothing but the first WARMUP readings of a channel is needed
+before the statistical checks start.
+
+The per-reading loop is compiled with numba when it is installed (optional,
+requirements-optional.txt); otherwise the same loop runs as plain Python. Only
+the plain-Python figure is guaranteed: ~30k readings/s per core, enough for a
+live farm but not for replaying long histories. The >= 1M readings/s target
+needs numba (~10M readings/s per core).
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    from numba import njit
+except ImportError:  # optional: plain-Python loop
+    njit = None
+
+CHANNELS = ("Soil_Moisture", "Dissolved_Oxygen_mgL", "Turbidity_NTU")
+LEAK_CHANNEL = "Soil_Moisture"
+LEAK_THRESHOLD = 4000.0
+EWMA_ALPHA = 0.1
+Z_LIMIT = 4.0
+CUSUM_K = 0.5           # allowance, in baseline standard deviations
+CUSUM_H = 8.0           # decision interval (in-control run length ~ thousands of readings)
+WARMUP = 20
+
+NONE, LEAK, SHIFT_UP, SHIFT_DOWN, SPIKE = 0, 1, 2, 3, 4
+EVENT_NAMES = {LEAK: "LEAK", SHIFT_UP: "SHIFT_UP", SHIFT_DOWN: "SHIFT_DOWN", SPIKE: "SPIKE"}
+
+
+def _detect_kernel(tank_idx, values, leak_col, leak_threshold, alpha, z_limit, k, h, warmup,
+                   count, mean, m2, ew_mean, ew_var, cusum_pos, cusum_neg, leaking, codes):
+    """Update the state with every reading in order and write one event code per (reading, channel)."""
+    n_rows, n_channels = values.shape
+    for r in range(n_rows):
+        t = tank_idx[r]
+        for c in range(n_channels):
+            x = values[r, c]
+            if x != x:          # NaN: channel not reported by this source
+                continue
+            code = NONE
+            if c == leak_col:
+                over = x >= leak_threshold
+                if over and not leaking[t]:
+                    code = LEAK
+                leaking[t] = over
+
+            n = count[t, c]
+            if n >= warmup:
+                var = m2[t, c] / (n - 1)
+                if var > 0.0:
+                    y = (x - mean[t, c]) / np.sqrt(var)
+                    cusum_pos[t, c] = max(0.0, cusum_pos[t, c] + y - k)
+                    cusum_neg[t, c] = max(0.0, cusum_neg[t, c] - y - k)
+                    if cusum_pos[t, c] > h:
+                        cusum_pos[t, c] = 0.0
+                        if code == NONE:
+                            code = LEAK if c == leak_col else SHIFT_UP
+                    elif cusum_neg[t, c] > h:
+                        cusum_neg[t, c] = 0.0
+                        if code == NONE:
+                            code = SHIFT_DOWN
+                if code == NONE and ew_var[t, c] > 0.0 and abs(x - ew_mean[t, c]) > z_limit * np.sqrt(ew_var[t, c]):
+                    code = SPIKE
+
+            # Welford
+            n += 1
+            count[t, c] = n
+            d = x - mean[t, c]
+            mean[t, c] += d / n
+            m2[t, c] += d * (x - mean[t, c])
+            # EWMA mean / variance
+            if n == 1:
+                ew_mean[t, c] = x
+                ew_var[t, c] = 0.0
+            else:
+                d = x - ew_mean[t, c]
+                ew_mean[t, c] += alpha * d
+                ew_var[t, c] = (1.0 - alpha) * (ew_var[t, c] + alpha * d * d)
+            codes[r, c] = code
+
+
+_compiled_detect = njit(cache=True, nogil=True)(_detect_kernel) if njit is not None else None
+
+
+class StreamingDetector:
+    """Per-(tank, channel) online statistics; feed readings with update() / update_frame()."""
+
+    def __init__(self, channels=CHANNELS, leak_channel=LEAK_CHANNEL, leak_threshold=LEAK_THRESHOLD,
+                 alpha=EWMA_ALPHA, z_limit=Z_LIMIT, cusum_k=CUSUM_K, cusum_h=CUSUM_H, warmup=WARMUP):
+        self.channels = list(channels)
+        self.leak_col = self.channels.index(leak_channel) if leak_channel in self.channels else -1
+        self.params = (float(leak_threshold), float(alpha), float(z_limit), float(cusum_k), float(cusum_h),
+                       int(warmup))
+        self.tank_ids = np.empty(0, dtype=np.int64)     # sorted; row i of the state arrays
+        n_ch = len(self.channels)
+        self.count = np.zeros((0, n_ch), dtype=np.int64)
+        self.mean, self.m2, self.ew_mean, self.ew_var, self.cusum_pos, self.cusum_neg = (
+            np.zeros((0, n_ch)) for _ in range(6))
+        self.leaking = np.zeros(0, dtype=np.bool_)
+
+    def _state_rows(self, tank_ids):
+        """Dense state row per reading, adding rows for tanks seen for the first time."""
+        tank_ids = np.asarray(tank_ids, dtype=np.int64)
+        new = np.setdiff1d(tank_ids, self.tank_ids)
+        if len(new):
+            merged = np.union1d(self.tank_ids, new)
+            pos = np.searchsorted(merged, self.tank_ids)
+
+            def grow(arr):
+                out = np.zeros((len(merged),) + arr.shape[1:], dtype=arr.dtype)
+                out[pos] = arr
+                return out
+
+            self.count, self.mean, self.m2, self.ew_mean, self.ew_var, self.cusum_pos, self.cusum_neg = (
+                grow(a) for a in (self.count, self.mean, self.m2, self.ew_mean, self.ew_var,
+                                  self.cusum_pos, self.cusum_neg))
+            self.leaking = grow(self.leaking)
+            self.tank_ids = merged
+        return np.searchsorted(self.tank_ids, tank_ids)
+
+    def update(self, tank_ids, values):
+        """
+        tank_ids: (n,) per reading; values: (n, len(channels)) in arrival order, NaN = not reported.
+        Returns (n, len(channels)) int8 event codes (0 = no event).
+        """
+        rows = self._state_rows(tank_ids)
+        values = np.ascontiguousarray(values, dtype=np.float64).reshape(len(rows), len(self.channels))
+        codes = np.zeros(values.shape, dtype=np.int8)
+        kernel = _compiled_detect if _compiled_detect is not None else _detect_kernel
+        kernel(rows, values, self.leak_col, *self.params, self.count, self.mean, self.m2, self.ew_mean,
+               self.ew_var, self.cusum_pos, self.cusum_neg, self.leaking, codes)
+        return codes
+
+    def update_frame(self, df, tank_col="Tank_ID", timestamp_col="Timestamp"):
+        """Feed a frame of readings (arrival order); returns its events as a DataFrame."""
+        codes = self.update(df[tank_col].to_numpy(), df[self.channels].to_numpy(dtype=float))
+        return self.events_frame(df, codes, tank_col, timestamp_col)
+
+    def events_frame(self, df, codes, tank_col="Tank_ID", timestamp_col="Timestamp"):
+        r, c = np.nonzero(codes)
+        out = {
+            "Row": df.index.to_numpy()[r],
+            tank_col: df[tank_col].to_numpy()[r],
+            "Channel": np.asarray(self.channels, dtype=object)[c],
+            "Event": pd.Series(codes[r, c]).map(EVENT_NAMES).to_numpy(),
+            "Value": df[self.channels].to_numpy(dtype=float)[r, c],
+        }
+        if timestamp_col in df.columns:
+            out = {timestamp_col: df[timestamp_col].to_numpy()[r], **out}
+        return pd.DataFrame(out)
+
+    def state(self, tank_id):
+        """Current statistics of one tank, per channel."""
+        i = int(np.searchsorted(self.tank_ids, tank_id))
+        if i >= len(self.tank_ids) or self.tank_ids[i] != tank_id:
+            raise KeyError(tank_id)
+        n = self.count[i]
+        return pd.DataFrame({
+            "count": n,
+            "mean": self.mean[i],
+            "std": np.sqrt(np.where(n > 1, self.m2[i] / np.maximum(n - 1, 1), 0.0)),
+            "ewma": self.ew_mean[i],
+            "ewma_std": np.sqrt(self.ew_var[i]),
+            "cusum_pos": self.cusum_pos[i],
+            "cusum_neg": self.cusum_neg[i],
+        }, index=self.channels)
+
+
+def warm_up(channels=CHANNELS):
+    """
+    Run the kernel once on a one-reading batch of a throwaway detector, so numba's
+    compile / cache load is not counted in the first timed batch (no-op cost without numba).
+    """
+    StreamingDetector(channels).update([0], np.zeros((1, len(channels))))
+
+
+def replay(path, detector=None, tank_id=1, chunk_rows=200_000):
+    """
+    Stream a sensor CSV (any sensor_schema.py format) through a detector.
+    Returns (events DataFrame, readings processed, seconds spent in the detector);
+    the kernel is warmed up first, so the time is steady-state throughput.
+    """
+    from sensor_schema import iter_canonical_chunks
+
+    detector = detector or StreamingDetector()
+    warm_up(detector.channels)
+    events, n, spent = [], 0, 0.0
+    for chunk in iter_canonical_chunks(path, tank_id, chunk_rows):
+        tanks, values = chunk["Tank_ID"].to_numpy(), chunk[detector.channels].to_numpy(dtype=float)
+        start = time.perf_counter()
+        codes = detector.update(tanks, values)
+        spent += time.perf_counter() - start
+        n += len(chunk)
+        events.append(detector.events_frame(chunk, codes))
+    return pd.concat(events, ignore_index=True), n, spent
+
+
+if __name__ == "__main__":
+    import sys
+
+    source = sys.argv[1] if len(sys.argv) > 1 else "../Day_3/datasets/synthetic_hatchery_data.csv"
+    events, n, spent = replay(source)
+    path = "numba" if _compiled_detect is not None else "plain Python, no numba"
+    print(f"• {n} readings in {spent * 1000:.1f} ms ({n / max(spent, 1e-9) / 1e6:.2f}M readings/s, {path})")
+    print(events["Event"].value_counts().to_string() if len(events) else "No events")
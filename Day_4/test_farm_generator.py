@@ -0,0 +1,27 @@
+"""
+Farm generator: output does not depend on worker count or shard size.
+
+Run:  python -m pytest test_farm_generator.py
+"""
+import pandas as pd
+import pytest
+
+from dataset_io import read_main_dataset
+from farm_generator import generate_farm
+
+N_TANKS = 12
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_bit_identical_across_workers_and_shards(tmp_path, compact):
+    frames = []
+    for n_workers, tanks_per_shard in ((1, 4), (4, 3), (2, 12)):
+        root = tmp_path / f"farm_{n_workers}x{tanks_per_shard}"
+        summary = generate_farm(root, n_tanks=N_TANKS, period_days=2, tanks_per_shard=tanks_per_shard,
+                                n_workers=n_workers, compact=compact)
+        assert len(summary) == -(-N_TANKS // tanks_per_shard)
+        frames.append(read_main_dataset(root).reset_index(drop=True))
+
+    assert frames[0]["Tank_ID"].nunique() == N_TANKS
+    for other in frames[1:]:
+        pd.testing.assert_frame_equal(frames[0], other, check_exact=True)
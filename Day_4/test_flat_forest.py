@@ -0,0 +1,65 @@
+"""
+Flat-array forest: exact equivalence with MultiOutputClassifier(RandomForestClassifier).
+
+Run:  python -m pytest test_flat_forest.py
+"""
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.multioutput import MultiOutputClassifier
+
+import flat_forest
+from flat_forest import FlatForest
+
+
+def _data(n=600, n_features=6, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, n_features))
+    y = np.column_stack([X[:, 0] > 0, (X[:, 1] + X[:, 2] > 0.5).astype(int) + (X[:, 3] > 1),
+                         rng.integers(0, 4, n)])
+    return X, y
+
+
+def _model(X, y):
+    return MultiOutputClassifier(RandomForestClassifier(n_estimators=15, max_depth=8, random_state=0)).fit(X, y)
+
+
+def _with_nan(X, share=0.2, seed=1):
+    X = X.copy()
+    X[np.random.default_rng(seed).random(X.shape) < share] = np.nan
+    return X
+
+
+@pytest.fixture(params=["numpy", "compiled"])
+def path(request, monkeypatch):
+    if request.param == "numpy":
+        monkeypatch.setattr(flat_forest, "_compiled_proba", None)
+    elif flat_forest._compiled_proba is None:
+        pytest.skip("numba not installed")
+    return request.param
+
+
+@pytest.mark.parametrize("train_nan", [False, True])
+def test_matches_sklearn(path, train_nan, tmp_path):
+    X, y = _data()
+    model = _model(_with_nan(X) if train_nan else X, y)
+    flat = FlatForest.from_sklearn(model)
+    flat.save(tmp_path)
+    flat = FlatForest.load(tmp_path)
+
+    X_test, _ = _data(n=300, seed=2)
+    for batch in (X_test, _with_nan(X_test), X_test[:1]):
+        np.testing.assert_array_equal(flat.predict(batch), model.predict(batch))
+        for ours, theirs in zip(flat.predict_proba(batch), model.predict_proba(batch)):
+            np.testing.assert_array_equal(ours, theirs)
+
+
+def test_export_without_nan_routing_rejects_nan(tmp_path):
+    X, y = _data()
+    model = _model(X, y)
+    FlatForest.from_sklearn(model).save(tmp_path)
+    (tmp_path / "missing_left.npy").unlink()
+    old = FlatForest.load(tmp_path)
+    np.testing.assert_array_equal(old.predict(X[:50]), model.predict(X[:50]))
+    with pytest.raises(ValueError):
+        old.predict(_with_nan(X[:50]))
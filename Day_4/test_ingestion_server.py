@@ -0,0 +1,88 @@
+"""
+Ingestion server: rejected / normalized field values, malformed requests and torn channel files.
+
+Run:  python -m pytest test_ingestion_server.py
+"""
+import asyncio
+from datetime import datetime
+
+from ingestion_server import CSV_HEADER, AppendOnlyStore, ChannelLog, IngestionServer
+from sensor_schema import load_canonical
+
+KEY = "TESTKEY"
+
+
+def _update(server, query):
+    return asyncio.run(server.route("GET", f"/update?api_key={KEY}&{query}", b""))
+
+
+def test_non_finite_values_rejected_and_channel_loads(tmp_path):
+    server = IngestionServer(AppendOnlyStore(tmp_path))
+    assert _update(server, "field1=25.7&field3=3800") == (200, "1")
+    for bad in ("inf", "-inf", "nan", "NaN", "1e400"):
+        assert _update(server, f"field1={bad}") == (400, "0")
+    assert _update(server, "field1=2_5&field2=+1E1") == (200, "2")
+    server.store.flush()
+
+    lines = (tmp_path / f"{KEY}.csv").read_text().splitlines()
+    assert lines[2].split(",")[2:4] == ["25.0", "10.0"]
+    df = load_canonical(tmp_path / f"{KEY}.csv", cache_dir=None)
+    assert len(df) == 2
+    assert df["Temperature_C"].tolist() == [25.7, 25.0]
+
+
+def test_torn_last_line_is_truncated(tmp_path):
+    path = tmp_path / f"{KEY}.csv"
+    path.write_text(CSV_HEADER + "2025-06-01 00:00:00 UTC,1,25.7,,,\n"
+                    "2025-06-01 00:00:15 UTC,2,25.8,,,\n" + "2025-06-01 00:0")
+    log = ChannelLog(path)
+    assert log.next_entry_id == 3
+    assert path.read_text().endswith(",2,25.8,,,\n")
+
+    log.append(datetime(2025, 6, 1, 0, 0, 30), ["25.9", "", "", ""])
+    log.flush()
+    assert len(load_canonical(path, cache_dir=None)) == 3
+
+
+def test_torn_header_starts_a_fresh_file(tmp_path):
+    path = tmp_path / f"{KEY}.csv"
+    path.write_text(CSV_HEADER[:10])
+    log = ChannelLog(path)
+    assert log.next_entry_id == 1
+    log.append(datetime(2025, 6, 1), ["25.7", "", "", ""])
+    log.flush()
+    assert path.read_text().startswith(CSV_HEADER)
+
+
+def test_undecodable_body_is_rejected(tmp_path):
+    server = IngestionServer(AppendOnlyStore(tmp_path))
+    body = f"api_key={KEY}&field1=25.7&note=".encode() + b"\xff\xfe"
+    assert asyncio.run(server.route("POST", "/update", body)) == (400, "0")
+    assert server.stats["rejected"] == 1
+
+
+def _exchange(server, raw):
+    """Send raw bytes to a live server; everything it answers before closing."""
+    async def main():
+        listener = await asyncio.start_server(server.handle_connection, "127.0.0.1", 0)
+        async with listener:
+            reader, writer = await asyncio.open_connection(*listener.sockets[0].getsockname()[:2])
+            writer.write(raw)
+            await writer.drain()
+            reply = await asyncio.wait_for(reader.read(), timeout=5)
+            writer.close()
+            return reply
+    return asyncio.run(main())
+
+
+def test_malformed_framing_gets_400_before_close(tmp_path):
+    server = IngestionServer(AppendOnlyStore(tmp_path))
+    for raw in (b"GARBAGE\r\n\r\n",
+                b"POST /update HTTP/1.1\r\nContent-Length: ten\r\n\r\n",
+                b"POST /update HTTP/1.1\r\nContent-Length: -5\r\n\r\n"):
+        reply = _exchange(server, raw)
+        assert reply.startswith(b"HTTP/1.1 400 Bad Request\r\n")
+        assert reply.endswith(b"\r\n\r\n0")
+
+    ok = _exchange(server, f"GET /update?api_key={KEY}&field1=25.7 HTTP/1.1\r\nConnection: close\r\n\r\n".encode())
+    assert ok.startswith(b"HTTP/1.1 200 OK\r\n") and ok.endswith(b"\r\n\r\n1")
@@ -0,0 +1,170 @@
+"""
+Vectorized THRESHOLDS classification engine.
+
+Compiles the Indian Major Carps THRESHOLDS dict into bin edges and score
+tables once, then labels whole NumPy arrays / DataFrames with np.searchsorted
+and np.take, so there is no Python-level branch per reading. The same engine
+is used by the dataset generator, by ingestion of real sensor CSVs and by
+live scoring of streamed readings.
+"""
+import numpy as np
+import pandas as pd
+
+# -----------------------------
+# CONFIGURATION
+# -----------------------------
+# Indian Major Carps Optimal Thresholds
+THRESHOLDS = {
+    'temperature': {'optimal': (26, 30), 'acceptable': (24, 32), 'critical': (22, 35)},
+    'dissolved_oxygen': {'optimal': (5, 8), 'acceptable': (4, 9), 'critical': (3, 12)},
+    'ph': {'optimal': (7.0, 8.5), 'acceptable': (6.5, 9.0), 'critical': (6.0, 9.5)},
+    'ammonia': {'optimal': (0, 0.1), 'acceptable': (0, 0.5), 'critical': (0, 1.0)},
+    'nitrate': {'optimal': (0, 10), 'acceptable': (0, 25), 'critical': (0, 40)},
+    'turbidity': {'optimal': (15, 40), 'acceptable': (10, 60), 'critical': (5, 80)},
+    'alkalinity': {'optimal': (80, 120), 'acceptable': (60, 150), 'critical': (40, 200)},
+    'hardness': {'optimal': (75, 150), 'acceptable': (50, 200), 'critical': (30, 250)}
+}
+
+# Rule parameter -> Main_Dataset column
+COLUMN_MAP = {
+    'temperature': 'Temperature_C',
+    'dissolved_oxygen': 'Dissolved_Oxygen_mgL',
+    'ph': 'pH',
+    'ammonia': 'Ammonia_mgL',
+    'nitrate': 'Nitrate_mgL',
+    'turbidity': 'Turbidity_NTU',
+}
+
+# Ammonia and nitrate only have an upper limit ("<= optimal max")
+UPPER_ONLY = ('ammonia', 'nitrate')
+
+# Band codes
+OPTIMAL, ACCEPTABLE, CRITICAL = 0, 1, 2
+STATUS_LABELS = np.array(["Optimal", "Acceptable", "Critical"], dtype=object)
+GRADE_LABELS = np.array(["Poor", "Fair", "Good", "Excellent"], dtype=object)
+
+# Points per band (Optimal, Acceptable, Critical)
+QUALITY_POINTS = {
+    'temperature': (4, 2, 0),
+    'dissolved_oxygen': (4, 2, 0),
+    'ph': (3, 1, 0),
+    'ammonia': (3, 1, 0),
+    'nitrate': (2, 1, 0),
+}
+QUALITY_EDGES = (6, 10, 14)     # Poor < 6 <= Fair < 10 <= Good < 14 <= Excellent
+
+GROWTH_STATUS_POINTS = (3, 1, 0)              # temperature and DO status
+GROWTH_QUALITY_POINTS = (0, 1, 2, 2)          # Poor, Fair, Good, Excellent
+GROWTH_TURBIDITY_POINTS = (1, 0, 0)           # only optimal turbidity counts
+GROWTH_EDGES = (4, 6, 8)
+
+LABEL_INPUTS = {
+    'Temperature_Status': ('temperature',),
+    'DO_Status': ('dissolved_oxygen',),
+    'Water_Quality_Index': tuple(QUALITY_POINTS),
+    'Growth_Condition': tuple(QUALITY_POINTS) + ('turbidity',),
+}
+
+
+class ThresholdRuleEngine:
+    """Status / grade rules compiled from a THRESHOLDS dict."""
+
+    def __init__(self, thresholds=THRESHOLDS):
+        self.thresholds = thresholds
+        self.lower_edges = {}
+        self.upper_edges = {}
+        for param, limits in thresholds.items():
+            opt_lo, opt_hi = limits['optimal']
+            acc_lo, acc_hi = limits['acceptable']
+            if param in UPPER_ONLY:
+                opt_lo = acc_lo = -np.inf
+            # x >= acc_lo and x >= opt_lo (closed lower bounds)
+            self.lower_edges[param] = np.array([acc_lo, opt_lo], dtype=float)
+            # x <= opt_hi and x <= acc_hi (closed upper bounds)
+            self.upper_edges[param] = np.array([opt_hi, acc_hi], dtype=float)
+
+        self.quality_points = {p: np.array(v) for p, v in QUALITY_POINTS.items()}
+        self.quality_edges = np.array(QUALITY_EDGES)
+        self.growth_status_points = np.array(GROWTH_STATUS_POINTS)
+        self.growth_quality_points = np.array(GROWTH_QUALITY_POINTS)
+        self.growth_turbidity_points = np.array(GROWTH_TURBIDITY_POINTS)
+        self.growth_edges = np.array(GROWTH_EDGES)
+
+    # -----------------------------
+    # BAND CODES
+    # -----------------------------
+    def band_codes(self, param, values):
+        """0 = Optimal, 1 = Acceptable, 2 = Critical for every value (NaN -> Critical)."""
+        values = np.asarray(values, dtype=float)
+        below = 2 - np.searchsorted(self.lower_edges[param], values, side='right')
+        above = np.searchsorted(self.upper_edges[param], values, side='left')
+        codes = np.maximum(below, above)
+        codes[np.isnan(values)] = CRITICAL
+        return codes.astype(np.int8)
+
+    def quality_grade_codes(self, bands):
+        """Water_Quality_Index code (0 Poor .. 3 Excellent) from per-parameter bands."""
+        score = sum(np.take(self.quality_points[p], bands[p]) for p in QUALITY_POINTS)
+        return np.searchsorted(self.quality_edges, score, side='right').astype(np.int8)
+
+    def growth_codes(self, bands, quality_codes):
+        """Growth_Condition code (0 Poor .. 3 Excellent)."""
+        factors = (
+            np.take(self.growth_status_points, bands['temperature'])
+            + np.take(self.growth_status_points, bands['dissolved_oxygen'])
+            + np.take(self.growth_quality_points, quality_codes)
+            + np.take(self.growth_turbidity_points, bands['turbidity'])
+        )
+        return np.searchsorted(self.growth_edges, factors, side='right').astype(np.int8)
+
+    # -----------------------------
+    # LABELLING
+    # -----------------------------
+    def label_arrays(self, as_codes=False, **params):
+        """
+        Label parameter arrays passed by keyword (temperature=..., ph=..., ...).
+        Labels whose inputs are missing are left out of the result.
+        """
+        bands = {p: self.band_codes(p, v) for p, v in params.items()
+                 if v is not None and p in self.thresholds}
+        codes = {}
+        if 'temperature' in bands:
+            codes['Temperature_Status'] = bands['temperature']
+        if all(p in bands for p in LABEL_INPUTS['Water_Quality_Index']):
+            codes['Water_Quality_Index'] = self.quality_grade_codes(bands)
+        if 'dissolved_oxygen' in bands:
+            codes['DO_Status'] = bands['dissolved_oxygen']
+        if all(p in bands for p in LABEL_INPUTS['Growth_Condition']):
+            codes['Growth_Condition'] = self.growth_codes(bands, codes['Water_Quality_Index'])
+
+        if as_codes:
+            return codes
+        return {label: self.decode(label, c) for label, c in codes.items()}
+
+    def label_frame(self, df, column_map=COLUMN_MAP, as_codes=False):
+        """Label every row of a DataFrame; column_map maps rule parameters to its columns."""
+        params = {p: df[col].to_numpy(dtype=float) for p, col in column_map.items() if col in df.columns}
+        return pd.DataFrame(self.label_arrays(as_codes=as_codes, **params), index=df.index)
+
+    def label_block(self, block, parameters=tuple(COLUMN_MAP), as_codes=False):
+        """Label a 2-D NumPy block of shape (n_readings, len(parameters))."""
+        block = np.asarray(block, dtype=float)
+        params = {p: block[:, i] for i, p in enumerate(parameters)}
+        return self.label_arrays(as_codes=as_codes, **params)
+
+    @staticmethod
+    def label_table(label):
+        """Label text of each code (code i -> table[i])."""
+        return STATUS_LABELS if label in ('Temperature_Status', 'DO_Status') else GRADE_LABELS
+
+    @staticmethod
+    def decode(label, codes):
+        return np.take(ThresholdRuleEngine.label_table(label), codes)
+
+
+# Shared default engine
+RULES = ThresholdRuleEngine()
+
+
+def label_frame(df, column_map=COLUMN_MAP, as_codes=False):
+    return RULES.label_frame(df, column_map=column_map, as_codes=as_codes)
@@ -0,0 +1,400 @@
+"""
+Append-only, memory-mapped time-series store: one columnar segment per tank.
+
+Layout under the store root:
+    store.json                      column order, dtypes, category lists
+    Tank_<id>/segment.json          allocated capacity (rows)
+    Tank_<id>/length.bin            committed row count (int64, updated in place after each append)
+    Tank_<id>/<column>.bin          one fixed-width array per column (Timestamp = int64 epoch ns)
+    Tank_<id>/agg_<window>/...      per-window aggregates, the same segment format
+
+Readings are appended in time order per tank (a batch or a single reading at
+a time); files grow by doubling and rows are never rewritten, so a reader maps them
+and range reads are np.searchsorted on the timestamp column plus slicing -
+zero-copy views, already sorted, no parsing and no groupby. Text columns
+(Carp_Species, the labels) are stored as int16 codes into store.json
+categories.
+
+For every numeric column, count / sum / min / max per 5 min, 1 h and 1 day
+bucket (WINDOWS) are updated on each append: only the last open bucket is
+touched, so the rollups never need a pass over the history. Trailing-window
+stats (window_stats) are assembled from those buckets, coarsest first, and
+only the partial buckets at the window edges are read as raw rows.
+"""
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+STORE_META = "store.json"
+SEGMENT_META = "segment.json"
+LENGTH_FILE = "length.bin"
+TIMESTAMP_COL = "Timestamp"
+TANK_COL = "Tank_ID"
+TIMESTAMP_FORMAT = "%d-%m-%Y %H:%M"
+INITIAL_CAPACITY = 4096
+CODE_DTYPE = "<i2"
+WINDOWS = {
+    "5min": pd.Timedelta(minutes=5),
+    "1h": pd.Timedelta(hours=1),
+    "1D": pd.Timedelta(days=1),
+}
+
+
+def is_timeseries_store(path):
+    return (Path(path) / STORE_META).exists()
+
+
+# -----------------------------
+# SEGMENT
+# -----------------------------
+class Segment:
+    """Fixed-width column files of equal length in one directory."""
+
+    def __init__(self, path, schema, readonly=False):
+        self.path = Path(path)
+        self.schema = dict(schema)          # name -> numpy dtype string
+        self.readonly = readonly
+        self._maps = {}
+        self._arrays = {}       # plain ndarray views of the maps (cheaper to index than np.memmap)
+        meta_path = self.path / SEGMENT_META
+        if meta_path.exists():
+            self.capacity = json.loads(meta_path.read_text())["capacity"]
+        elif readonly:
+            raise FileNotFoundError(f"No segment under '{self.path}'")
+        else:
+            self.path.mkdir(parents=True, exist_ok=True)
+            self.capacity = 0
+            (self.path / LENGTH_FILE).write_bytes(np.zeros(1, dtype="<i8").tobytes())
+            self._grow(INITIAL_CAPACITY)
+        self._length = np.memmap(self.path / LENGTH_FILE, dtype="<i8", mode="r" if readonly else "r+", shape=(1,))
+        # Readers see the rows committed when the segment was opened
+        self.length = int(self._length[0])
+
+    def __len__(self):
+        return self.length
+
+    def _file(self, name):
+        return self.path / f"{name}.bin"
+
+    def _grow(self, needed):
+        capacity = max(needed, 2 * self.capacity, INITIAL_CAPACITY)
+        for name, dtype in self.schema.items():
+            with open(self._file(name), "ab") as f:
+                f.truncate(capacity * np.dtype(dtype).itemsize)
+        self.capacity = capacity
+        self._maps.clear()
+        self._arrays.clear()
+        (self.path / SEGMENT_META).write_text(json.dumps({"capacity": self.capacity}))
+
+    def column(self, name):
+        """The whole allocated column, backed by the file map (valid rows: [:length])."""
+        arr = self._arrays.get(name)
+        if arr is None:
+            mm = np.memmap(self._file(name), dtype=self.schema[name], mode="r" if self.readonly else "r+",
+                           shape=(self.capacity,))
+            self._maps[name] = mm
+            arr = self._arrays[name] = np.asarray(mm)
+        return arr
+
+    def view(self, name, lo=0, hi=None):
+        """Zero-copy, read-only view of rows [lo, hi)."""
+        hi = self.length if hi is None else hi
+        arr = self.column(name)[lo:hi]
+        arr.flags.writeable = False
+        return arr
+
+    def append(self, arrays):
+        """arrays: name -> equal-length arrays (every schema column). Commits the new length."""
+        n = len(next(iter(arrays.values())))
+        if self.length + n > self.capacity:
+            self._grow(self.length + n)
+        for name in self.schema:
+            self.column(name)[self.length:self.length + n] = arrays[name]
+        self.length += n
+        self._length[0] = self.length
+
+    def set_last(self, values):
+        """Overwrite the last row (only used for the open aggregate bucket)."""
+        for name, value in values.items():
+            self.column(name)[self.length - 1] = value
+
+    def flush(self):
+        for mm in self._maps.values():
+            mm.flush()
+        self._length.flush()
+
+
+# -----------------------------
+# ROLLING AGGREGATES
+# -----------------------------
+class WindowAggregates:
+    """count / sum / min / max of each numeric column per fixed-width time bucket."""
+
+    def __init__(self, path, width, columns, readonly=False):
+        self.width = pd.Timedelta(width).value
+        self.columns = list(columns)
+        schema = {"bucket": "<i8", "count": "<i8"}
+        for c in self.columns:
+            schema.update({f"{c}__sum": "<f8", f"{c}__min": "<f8", f"{c}__max": "<f8"})
+        self.segment = Segment(path, schema, readonly)
+
+    def update(self, ts, values):
+        """ts: sorted int64 ns of the appended readings; values: column -> array."""
+        bucket = ts // self.width
+        starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+        new = {"bucket": bucket[starts] * self.width, "count": np.diff(np.r_[starts, len(ts)])}
+        for c in self.columns:
+            v = np.asarray(values[c], dtype=float)
+            new[f"{c}__sum"] = np.add.reduceat(v, starts)
+            new[f"{c}__min"] = np.minimum.reduceat(v, starts)
+            new[f"{c}__max"] = np.maximum.reduceat(v, starts)
+
+        seg = self.segment
+        if len(seg) and seg.column("bucket")[len(seg) - 1] == new["bucket"][0]:
+            # First group falls into the still-open last bucket: merge it in place
+            last = len(seg) - 1
+            merged = {"count": seg.column("count")[last] + new["count"][0]}
+            for c in self.columns:
+                merged[f"{c}__sum"] = seg.column(f"{c}__sum")[last] + new[f"{c}__sum"][0]
+                merged[f"{c}__min"] = min(seg.column(f"{c}__min")[last], new[f"{c}__min"][0])
+                merged[f"{c}__max"] = max(seg.column(f"{c}__max")[last], new[f"{c}__max"][0])
+            seg.set_last(merged)
+            new = {k: v[1:] for k, v in new.items()}
+        if len(new["bucket"]):
+            seg.append(new)
+
+    def frame(self, columns=None, start=None, end=None):
+        seg = self.segment
+        buckets = seg.view("bucket")
+        lo, hi = _time_bounds(buckets, start, end)
+        count = seg.view("count", lo, hi)
+        out = {"Count": count}
+        for c in columns or self.columns:
+            out[f"{c}_min"] = seg.view(f"{c}__min", lo, hi)
+            out[f"{c}_mean"] = seg.view(f"{c}__sum", lo, hi) / count
+            out[f"{c}_max"] = seg.view(f"{c}__max", lo, hi)
+        return pd.DataFrame(out, index=pd.DatetimeIndex(buckets[lo:hi].view("datetime64[ns]"), name="Bucket"))
+
+
+def _time_bounds(ts, start, end):
+    lo = 0 if start is None else int(np.searchsorted(ts, pd.Timestamp(start).value, side="left"))
+    hi = len(ts) if end is None else int(np.searchsorted(ts, pd.Timestamp(end).value, side="right"))
+    return lo, hi
+
+
+# -----------------------------
+# STORE
+# -----------------------------
+class TimeSeriesStore:
+    def __init__(self, root, readonly=False):
+        self.root = Path(root)
+        self.readonly = readonly
+        meta_path = self.root / STORE_META
+        meta = json.loads(meta_path.read_text()) if meta_path.exists() else {}
+        self.order = meta.get("order", [])            # column order of the source frame
+        self.schema = meta.get("schema", {})          # stored columns -> dtype
+        self.categories = meta.get("categories", {})  # text column -> category list
+        self._tanks = {}
+        self._aggregates = {}
+        self._codes = {name: {v: i for i, v in enumerate(cats)} for name, cats in self.categories.items()}
+
+    # ---- layout ----
+    def _write_meta(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        (self.root / STORE_META).write_text(json.dumps(
+            {"order": self.order, "schema": self.schema, "categories": self.categories}, indent=2))
+
+    def numeric_columns(self):
+        return [c for c in self.schema if c != TIMESTAMP_COL and c not in self.categories]
+
+    def tank_ids(self, tank_ids=None):
+        found = sorted(int(p.name.split("_", 1)[1]) for p in self.root.glob("Tank_*") if p.is_dir())
+        return [t for t in found if tank_ids is None or t in set(tank_ids)]
+
+    def segment(self, tank_id):
+        seg = self._tanks.get(tank_id)
+        if seg is None:
+            seg = self._tanks[tank_id] = Segment(self.root / f"Tank_{tank_id}", self.schema, self.readonly)
+        return seg
+
+    def aggregates(self, tank_id, window):
+        key = (tank_id, window)
+        agg = self._aggregates.get(key)
+        if agg is None:
+            agg = self._aggregates[key] = WindowAggregates(
+                self.root / f"Tank_{tank_id}" / f"agg_{window}", WINDOWS[window], self.numeric_columns(),
+                self.readonly)
+        return agg
+
+    # ---- write ----
+    def _init_schema(self, df, timestamp_col, tank_col):
+        self.order = [TIMESTAMP_COL if c == timestamp_col else TANK_COL if c == tank_col else c
+                      for c in df.columns]
+        self.schema = {TIMESTAMP_COL: "<i8"}
+        for c in df.columns:
+            if c in (timestamp_col, tank_col):
+                continue
+            if pd.api.types.is_numeric_dtype(df[c]):
+                self.schema[c] = np.dtype(df[c].dtype).newbyteorder("<").str
+            else:
+                self.schema[c] = CODE_DTYPE
+                self.categories[c] = []
+                self._codes[c] = {}
+        self._write_meta()
+
+    def _encode(self, name, values):
+        """Text -> int16 codes, extending the category list (persisted) for new values."""
+        cats, lookup = self.categories[name], self._codes[name]
+        added = [v for v in dict.fromkeys(values.tolist()) if v not in lookup]
+        if added:
+            for v in added:
+                lookup[v] = len(cats)
+                cats.append(v)
+            self._write_meta()
+        return np.array([lookup[v] for v in values.tolist()], dtype=CODE_DTYPE)
+
+    def append(self, tank_id, timestamps, columns):
+        """
+        Append readings of one tank. timestamps: datetime-like (or int64 ns), in order
+        and not before the last stored reading; columns: name -> values.
+        """
+        ts = np.asarray(timestamps)
+        if not np.issubdtype(ts.dtype, np.integer):
+            ts = pd.DatetimeIndex(timestamps).asi8
+        ts = np.asarray(ts, dtype=np.int64)
+        if len(ts) == 0:
+            return 0
+        seg = self.segment(tank_id)
+        if np.any(ts[1:] < ts[:-1]) or (len(seg) and ts[0] < seg.column(TIMESTAMP_COL)[len(seg) - 1]):
+            raise ValueError(f"Tank {tank_id}: readings must be appended in time order")
+
+        arrays = {TIMESTAMP_COL: ts}
+        for name in self.schema:
+            if name == TIMESTAMP_COL:
+                continue
+            values = np.asarray(columns[name])
+            arrays[name] = self._encode(name, values) if name in self.categories else values
+        seg.append(arrays)
+        for window in WINDOWS:
+            self.aggregates(tank_id, window).update(ts, {c: arrays[c] for c in self.numeric_columns()})
+        return len(ts)
+
+    def append_frame(self, df, timestamp_col=TIMESTAMP_COL, tank_col=TANK_COL, timestamp_format=TIMESTAMP_FORMAT):
+        """Append a Main_Dataset-style frame (any tank mix; sorted per tank here)."""
+        if not self.schema:
+            self._init_schema(df, timestamp_col, tank_col)
+        ts = df[timestamp_col]
+        if not pd.api.types.is_datetime64_any_dtype(ts):
+            ts = pd.to_datetime(ts, format=timestamp_format)
+        ts = ts.to_numpy(dtype="datetime64[ns]").view(np.int64)
+        tanks = df[tank_col].to_numpy()
+
+        rows = 0
+        for tank_id in pd.unique(tanks):
+            idx = np.flatnonzero(tanks == tank_id)
+            idx = idx[np.argsort(ts[idx], kind="stable")]
+            rows += self.append(int(tank_id), ts[idx],
+                                {c: df[c].to_numpy()[idx] for c in self.schema if c != TIMESTAMP_COL})
+        return rows
+
+    def flush(self):
+        for seg in self._tanks.values():
+            seg.flush()
+        for agg in self._aggregates.values():
+            agg.segment.flush()
+
+    # ---- read ----
+    def read(self, tank_id, columns=None, start=None, end=None):
+        """
+        name -> zero-copy read-only views for readings in [start, end].
+        Timestamp is a datetime64[ns] view; text columns are int16 codes
+        (see self.categories).
+        """
+        seg = self.segment(tank_id)
+        lo, hi = _time_bounds(seg.view(TIMESTAMP_COL), start, end)
+        out = {TIMESTAMP_COL: seg.view(TIMESTAMP_COL, lo, hi).view("datetime64[ns]")}
+        for name in columns or self.schema:
+            if name not in (TIMESTAMP_COL, TANK_COL):
+                out[name] = seg.view(name, lo, hi)
+        return out
+
+    def series(self, tank_id, column, start=None, end=None):
+        """One column of one tank as a time-indexed Series backed by the mapped arrays."""
+        views = self.read(tank_id, [column], start, end)
+        values = views[column]
+        if column in self.categories:
+            values = np.asarray(self.categories[column], dtype=object)[values]
+        return pd.Series(values, index=pd.DatetimeIndex(views[TIMESTAMP_COL], name=TIMESTAMP_COL),
+                         name=column, copy=False)
+
+    def read_frame(self, columns=None, tank_ids=None, start=None, end=None):
+        """
+        DataFrame in the source column order, tank by tank and time-ordered within a
+        tank. Timestamp is datetime64; text columns are decoded to strings.
+        """
+        columns = list(columns) if columns is not None else list(self.order)
+        frames = []
+        for tank_id in self.tank_ids(tank_ids):
+            views = self.read(tank_id, [c for c in columns if c in self.schema], start, end)
+            n = len(views[TIMESTAMP_COL])
+            data = {}
+            for c in columns:
+                if c == TANK_COL:
+                    data[c] = np.full(n, tank_id, dtype=np.int64)
+                elif c in self.categories:
+                    data[c] = np.asarray(self.categories[c], dtype=object)[views[c]]
+                else:
+                    data[c] = views[c]
+            frames.append(pd.DataFrame(data))
+        if not frames:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(frames, ignore_index=True)
+
+    def rolling(self, tank_id, window, columns=None, start=None, end=None):
+        """Per-bucket min / mean / max (and Count) for window in WINDOWS."""
+        return self.aggregates(tank_id, window).frame(columns, start, end)
+
+    def window_stats(self, tank_id, column, window, end=None):
+        """min / mean / max of `column` over the trailing `window` up to `end` (default: last reading)."""
+        ts = self.segment(tank_id).view(TIMESTAMP_COL)
+        if not len(ts):
+            return None
+        end_ns = int(ts[-1]) if end is None else pd.Timestamp(end).value
+        widths = sorted(WINDOWS, key=WINDOWS.get, reverse=True)
+        parts = self._window_parts(tank_id, column, end_ns - pd.Timedelta(window).value + 1, end_ns,
+                                   int(ts[-1]), widths)
+        count = sum(p[0] for p in parts)
+        if not count:
+            return None
+        return {"min": float(min(p[2] for p in parts)), "mean": float(sum(p[1] for p in parts) / count),
+                "max": float(max(p[3] for p in parts)), "count": int(count)}
+
+    def _window_parts(self, tank_id, column, lo, hi, last_ns, widths):
+        """
+        (count, sum, min, max) pieces covering readings in [lo, hi] ns: closed buckets
+        of widths[0] that fit inside, the remainder on each side by the next finer
+        width, raw rows once the widths run out.
+        """
+        if widths:
+            agg = self.aggregates(tank_id, widths[0])
+            seg, width = agg.segment, agg.width
+            buckets = seg.view("bucket")
+            # Whole bucket inside [lo, hi] and closed (a later reading exists); the last
+            # stored bucket may still be open, or newer than this reader's snapshot
+            i = int(np.searchsorted(buckets, lo, side="left"))
+            j = int(np.searchsorted(buckets, min(hi + 1, last_ns) - width, side="right"))
+            j = min(j, len(buckets) - 1)
+            if i >= j:
+                return self._window_parts(tank_id, column, lo, hi, last_ns, widths[1:])
+            inner = (int(seg.view("count", i, j).sum()), float(seg.view(f"{column}__sum", i, j).sum()),
+                     float(seg.view(f"{column}__min", i, j).min()), float(seg.view(f"{column}__max", i, j).max()))
+            return (self._window_parts(tank_id, column, lo, int(buckets[i]) - 1, last_ns, widths[1:]) + [inner]
+                    + self._window_parts(tank_id, column, int(buckets[j - 1]) + width, hi, last_ns, widths[1:]))
+        seg = self.segment(tank_id)
+        a, b = _time_bounds(seg.view(TIMESTAMP_COL), pd.Timestamp(lo), pd.Timestamp(hi))
+        values = np.asarray(seg.view(column, a, b), dtype=float)
+        if not len(values):
+            return []
+        return [(len(values), float(values.sum()), float(values.min()), float(values.max()))]